@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+analysis_workers.py
+
+Long-lived analysis worker processes.
+
+- A spawn-context process pool whose workers import batch_analysis (cv2, skimage,
+  scipy, pandas, plotly, matplotlib, trackpy) once at start-up instead of once per job.
+- Uploaded archives/videos are decoded in the worker as the job's first stage.
+- Jobs call batch_analysis.analyze_experiment (or reanalyze_experiment) in a worker; its
+  structured progress events are written to the job row, so any web process can report them.
+- The pool is started and pre-warmed by the job-claiming process as soon as it starts
+  claiming (job_queue.start_workers on_start hook), sized to the jobs it can run at
+  once; web processes that do not claim jobs never start one. A crashed worker (e.g.
+  out of memory) fails only the job it was running and the pool is rebuilt for the next one.
+"""
+import multiprocessing
+import threading
+import time
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_WRITE_INTERVAL_SEC = 0.5
+PROGRESS_DETAIL_KEYS = ('stage', 'frame', 'total_frames', 'fps', 'eta_sec')
+INGEST_WAIT_POLL_SEC = 1.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# ----------------- Worker process side -----------------
+def _warm_worker():
+    """Process initializer: pay the heavy imports once per worker."""
+    import batch_analysis  # noqa: F401
+    import cell_tracking  # noqa: F401
+    import optical_flow  # noqa: F401
+
+
+def _ping():
+    return True
+
+
+def _job_progress_writer(job_id: str):
+    """Progress callback that writes events to the job row, throttled except on stage changes."""
+    state = {'stage': None, 'last': 0.0}
+
+    def on_progress(event: dict):
+        now = time.monotonic()
+        if event.get('stage') == state['stage'] and now - state['last'] < PROGRESS_WRITE_INTERVAL_SEC:
+            return
+        state['stage'], state['last'] = event.get('stage'), now
+        detail = {k: event[k] for k in PROGRESS_DETAIL_KEYS if k in event}
+        database.update_job_progress(job_id, event.get('progress'), event.get('message'), detail)
+
+    return on_progress
+
+
+def _ingest(upload_id: str, progress) -> dict:
+    """
+    Decode an uploaded archive/video into frames, once per upload. Returns the upload row.
+    Ingestion is claimed atomically; a job that finds another worker decoding the same
+    upload waits for it (taking over if that worker stops refreshing the claim).
+    """
+    import batch_analysis
+    import uploads
+
+    waiting = False
+    while True:
+        upload = database.get_upload(upload_id)
+        if upload is None:
+            raise RuntimeError(f"unknown upload {upload_id}")
+        if upload['status'] == 'ingested':
+            return upload
+        if upload['status'] not in ('complete', 'ingesting'):
+            raise RuntimeError(f"upload {upload_id} is not complete (status: {upload['status']})")
+        if database.claim_upload_ingest(upload_id, Config.JOB_STALE_SEC):
+            break
+        if not waiting:
+            waiting = True
+            batch_analysis.report_progress(progress, 'ingest', 0.0, f"Waiting for {upload['filename']} to be decoded")
+        time.sleep(INGEST_WAIT_POLL_SEC)
+
+    batch_analysis.report_progress(progress, 'ingest', 0.0, f"Decoding {upload['filename']}")
+    stop = threading.Event()
+
+    def keep_claim():
+        while not stop.wait(Config.JOB_HEARTBEAT_SEC):
+            database.touch_upload(upload_id)
+
+    threading.Thread(target=keep_claim, daemon=True).start()
+    try:
+        uploads.ingest_upload(upload, on_frame=batch_analysis.FrameProgress(progress, 'ingest', 'Decoding upload'))
+    except Exception as e:
+        database.set_upload_status(upload_id, 'failed', error=str(e))
+        raise
+    finally:
+        stop.set()
+    database.set_upload_status(upload_id, 'ingested')
+    return database.get_upload(upload_id)
+
+
+def _run_analysis_job(job_id: str, kwargs: dict, upload_id: Optional[str] = None,
+                      cache_params: Optional[dict] = None) -> dict:
+    """
+    Worker entry point. Ingests the upload, answers from the result cache when the same
+    bytes were already analyzed with the same parameters, and otherwise runs the pipeline.
+    """
+    import batch_analysis
+    import result_cache
+    import uploads
+
+    progress = _job_progress_writer(job_id)
+    input_sha256 = None
+    if upload_id:
+        upload = _ingest(upload_id, progress)
+        input_sha256 = upload['content_sha256']
+        if cache_params is not None:
+            cached = result_cache.lookup(input_sha256, cache_params)
+            if cached:
+                batch_analysis.report_progress(progress, 'saving', 1.0, 'Reusing cached result')
+                return {'cached_result_id': cached, 'input_sha256': input_sha256}
+        if upload['source_upload_id']:
+            kwargs = dict(kwargs, input_dir=uploads.upload_dir(upload['source_upload_id']))
+
+    outcome = batch_analysis.analyze_experiment(progress=progress, **kwargs)
+    outcome['input_sha256'] = input_sha256
+    return outcome
+
+
+def _run_reanalysis_job(job_id: str, kwargs: dict) -> dict:
+    """Worker entry point for re-analysis of an existing result with new parameters."""
+    import batch_analysis
+
+    return batch_analysis.reanalyze_experiment(progress=_job_progress_writer(job_id), **kwargs)
+
+
+# ----------------- Web process side -----------------
+def get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """The shared pool, created (and pre-warmed) on first use if start_pool() did not run."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=_warm_worker)
+            for _ in range(max_workers):
+                _pool.submit(_ping)
+            logger.info(f"Started analysis process pool with {max_workers} worker(s)")
+        return _pool
+
+
+def start_pool(max_workers: int):
+    """Start and pre-warm the pool ahead of the first job."""
+    get_pool(max_workers)
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_in_worker(job_id: str, max_workers: int, upload_id: Optional[str] = None,
+                      cache_params: Optional[dict] = None, **kwargs) -> dict:
+    """
+    Run batch_analysis.analyze_experiment(**kwargs) in a pool worker and wait for it,
+    first ingesting upload `upload_id` if it has not been decoded yet. With cache_params,
+    a cached result for the same input bytes is returned as {'cached_result_id': ...}.
+    Progress is recorded on job `job_id`. Raises whatever the analysis raised.
+    """
+    return _run_in_pool(max_workers, _run_analysis_job, job_id, kwargs, upload_id, cache_params)
+
+
+def reanalyze_in_worker(job_id: str, max_workers: int, **kwargs) -> dict:
+    """
+    Run batch_analysis.reanalyze_experiment(**kwargs) in a pool worker and wait for it.
+    Progress is recorded on job `job_id`. Raises whatever the re-analysis raised.
+    """
+    return _run_in_pool(max_workers, _run_reanalysis_job, job_id, kwargs)
+
+
+def submit(max_workers: int, fn, *args) -> Future:
+    """Run fn(*args) in the pool without waiting (e.g. a report render after a job)."""
+    pool = get_pool(max_workers)
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return get_pool(max_workers).submit(fn, *args)
+
+
+def _run_in_pool(max_workers: int, fn, *args):
+    pool = get_pool(max_workers)
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise RuntimeError('analysis worker process exited unexpectedly')
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+analytics_store.py
+
+Append-only columnar copy of every experiment's results for study-wide analysis, as
+Parquet datasets under ANALYTICS_FOLDER partitioned by condition (hive layout):
+
+  analytics/experiments/condition=DA3_Control/part-<time>-<uuid>.parquet   one row per run
+  analytics/timeseries/...                                                 one row per frame
+  analytics/tracks/...                                                     one row per track
+  analytics/track_points/...                                               one row per position
+
+- append() writes one new file per dataset and condition; nothing is rewritten, so a
+  finished run (and each results-importer batch) costs a few small writes.
+- Every row carries the `ingested_at` of its append. A re-analysed experiment is simply
+  appended again; query() keeps, per experiment, only the rows of its latest append
+  (looked up in the small `experiments` dataset).
+- remove() appends a tombstone (an experiments row with deleted=True) for deleted
+  experiments; an experiment whose latest append is a tombstone is hidden from query().
+- compact() merges each partition into one file sorted by experiment, dropping superseded
+  versions, deleted experiments and, with keep_ids, experiments that no longer exist.
+- query() returns a pandas DataFrame; condition filters prune partitions and the other
+  predicates are pushed down to Parquet row-group statistics.
+
+pyarrow is optional: without it the store is disabled and AVAILABLE is False.
+
+Usage:
+  python analytics_store.py compact [--prune]   # merge files; --prune drops ids not in the catalog
+  python analytics_store.py info                # files and rows per dataset
+"""
+import argparse
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote
+
+import numpy as np
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Optional pyarrow support
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    AVAILABLE = True
+except Exception:
+    AVAILABLE = False
+
+# Summary fields stored in the experiments dataset (float64; missing -> null)
+SUMMARY_METRICS = (
+    'initial_area_px', 'final_area_px', 'initial_area_um2', 'final_area_um2', 'final_closure_pct',
+    'healing_rate_um2_per_hr', 'r_squared', 'time_to_50_closure_hr', 'num_timepoints', 'area_mean_px',
+    'area_std_px', 'healing_rate_mean_px_per_hr', 'pixel_scale_um_per_px', 'processing_time_sec',
+    'num_cells_tracked', 'mean_velocity_um_min', 'migration_efficiency_mean', 'mean_directionality',
+    'msd_alpha', 'mean_persistence_time_min', 'front_velocity_um_min',
+)
+DATASETS = ('experiments', 'timeseries', 'tracks', 'track_points')
+# Sort order of rows within a compacted file
+SORT_KEYS = {
+    'experiments': ('id',),
+    'timeseries': ('id', 'frame'),
+    'tracks': ('id', 'track_id'),
+    'track_points': ('id', 'track_id', 'frame'),
+}
+INT_COLUMNS = {'frame', 'track_id', 'n_points', 'start_frame', 'end_frame'}
+BOOL_COLUMNS = {'persistence_censored'}
+
+
+def _schemas() -> Dict[str, 'pa.Schema']:
+    """Per-dataset file schemas (the `condition` partition column is not stored in files)."""
+    common = [('id', pa.string()), ('ingested_at', pa.timestamp('us', tz='UTC'))]
+
+    def numeric(columns):
+        return [(col, pa.int32() if col in INT_COLUMNS else pa.bool_() if col in BOOL_COLUMNS else pa.float64())
+                for col in columns]
+
+    return {
+        'experiments': pa.schema(common + [('deleted', pa.bool_()), ('experiment_name', pa.string())]
+                                 + numeric(SUMMARY_METRICS)),
+        'timeseries': pa.schema(common + numeric(database.TIMESERIES_COLUMNS)),
+        'tracks': pa.schema(common + numeric(database.TRACK_COLUMNS)),
+        'track_points': pa.schema(common + [('track_id', pa.int32()), ('frame', pa.int32()),
+                                            ('x_px', pa.float32()), ('y_px', pa.float32())]),
+    }
+
+
+SCHEMAS = _schemas() if AVAILABLE else {}
+
+
+def _root(root: Optional[str] = None) -> str:
+    return os.path.abspath(root or Config.ANALYTICS_FOLDER)
+
+
+def _partition_dir(root: str, dataset: str, condition: str) -> str:
+    return os.path.join(root, dataset, f"condition={quote(condition or 'Unknown', safe='')}")
+
+
+def _write_file(directory: str, table: 'pa.Table', tag: str = '') -> str:
+    """Write a Parquet file under a hidden temporary name, then move it into place."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{time.strftime('%Y%m%dT%H%M%S')}{tag}-{uuid.uuid4().hex[:12]}.parquet"
+    tmp = os.path.join(directory, '.' + name + '.tmp')  # dot-files are ignored by readers
+    pq.write_table(table, tmp, compression='zstd')
+    path = os.path.join(directory, name)
+    os.replace(tmp, path)
+    return path
+
+
+def _float_or_none(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def _tables_for(records: Sequence[Dict], ingested_at: datetime) -> Dict[str, 'pa.Table']:
+    """Arrow tables of one condition's records (importer layout: entry/experiment/series)."""
+    columns = {name: defaultdict(list) for name in DATASETS}
+
+    exp = columns['experiments']
+    for record in records:
+        entry = record['entry']
+        summary = entry.get('raw_summary') or {}
+        exp['id'].append(entry['id'])
+        exp['experiment_name'].append(entry.get('experiment_name'))
+        for metric in SUMMARY_METRICS:
+            exp[metric].append(_float_or_none(summary.get(metric)))
+
+    for record in records:
+        result_id = record['entry']['id']
+        timeseries_rows, track_rows = record['series']
+        if timeseries_rows:
+            values = np.array(timeseries_rows, dtype=np.float64)  # None -> NaN
+            ts = columns['timeseries']
+            ts['id'].extend([result_id] * len(values))
+            for k, col in enumerate(database.TIMESERIES_COLUMNS):
+                ts[col].append(values[:, k])
+        if track_rows:
+            tr = columns['tracks']
+            tr['id'].extend([result_id] * len(track_rows))
+            values = np.array([row[:-1] for row in track_rows], dtype=np.float64)
+            for k, col in enumerate(database.TRACK_COLUMNS):
+                tr[col].append(values[:, k])
+            tp = columns['track_points']
+            for row in track_rows:
+                if not row[-1]:
+                    continue
+                points = np.frombuffer(row[-1], dtype=database.TRACK_POINTS_DTYPE)
+                tp['id'].extend([result_id] * len(points))
+                tp['track_id'].append(np.full(len(points), row[0], dtype=np.int32))
+                for name in database.TRACK_POINTS_DTYPE.names:
+                    tp[name].append(points[name])
+
+    tables = {}
+    for name, data in columns.items():
+        if not data.get('id'):
+            continue
+        schema = SCHEMAS[name]
+        n = len(data['id'])
+        arrays = []
+        for field in schema:
+            if field.name == 'ingested_at':
+                arrays.append(pa.array(np.full(n, np.datetime64(ingested_at.replace(tzinfo=None), 'us')),
+                                       type=field.type))
+            elif field.name == 'deleted':
+                arrays.append(pa.array(np.zeros(n, dtype=bool), type=field.type))
+            elif field.name in ('id', 'experiment_name'):
+                arrays.append(pa.array(data[field.name], type=field.type))
+            else:
+                parts = data[field.name]
+                if parts and isinstance(parts[0], np.ndarray):
+                    values = np.concatenate(parts)
+                    mask = np.isnan(values) if values.dtype.kind == 'f' else None
+                    if pa.types.is_integer(field.type):
+                        arrays.append(pa.array(np.nan_to_num(values).astype(np.int32), type=field.type, mask=mask))
+                    elif pa.types.is_boolean(field.type):
+                        arrays.append(pa.array(values == 1, type=field.type, mask=mask))
+                    else:
+                        arrays.append(pa.array(values, type=field.type, mask=mask))
+                else:
+                    arrays.append(pa.array(parts, type=field.type))
+        tables[name] = pa.Table.from_arrays(arrays, schema=schema)
+    return tables
+
+
+def append(records: Iterable[Dict], root: Optional[str] = None) -> int:
+    """
+    Append finished experiments to the store. records: dicts with 'entry' (catalog entry:
+    id, experiment_name, condition, raw_summary) and 'series' ((timeseries_rows,
+    track_rows) as read by results_catalog.read_experiment_series). Records without
+    series are skipped, so the store never holds a version without its per-frame data.
+    Returns the number of experiments appended.
+    """
+    if not AVAILABLE or not Config.ANALYTICS_STORE:
+        return 0
+    by_condition = defaultdict(list)
+    for record in records:
+        if record.get('series') is not None:
+            by_condition[record['entry'].get('condition') or 'Unknown'].append(record)
+    if not by_condition:
+        return 0
+
+    root = _root(root)
+    ingested_at = datetime.now(timezone.utc)
+    appended = 0
+    for condition, group in by_condition.items():
+        try:
+            tables = _tables_for(group, ingested_at)
+            # experiments last: a version becomes visible to query() once its other rows exist
+            for name in ('timeseries', 'tracks', 'track_points', 'experiments'):
+                if name in tables:
+                    _write_file(_partition_dir(root, name, condition), tables[name])
+            appended += len(group)
+        except Exception as e:
+            logger.error(f"Could not append {len(group)} experiments of '{condition}' to the analytics store: {e}")
+    return appended
+
+
+def remove(ids: Iterable[str], root: Optional[str] = None) -> int:
+    """
+    Mark experiments as deleted by appending a tombstone row for each one that the store
+    holds a live version of, in the partition of that version. Returns the number marked.
+    """
+    if not AVAILABLE or not Config.ANALYTICS_STORE:
+        return 0
+    ids = list(ids)
+    root = _root(root)
+    experiments = _dataset('experiments', root) if ids else None
+    if experiments is None:
+        return 0
+    live = _latest_versions(root, ids)
+    if not live.num_rows:
+        return 0
+    rows = experiments.to_table(columns=['id', 'condition'],
+                                filter=ds.field('id').isin(live['id'].to_pylist()))
+    by_condition = defaultdict(set)
+    for result_id, condition in zip(rows['id'].to_pylist(), rows['condition'].to_pylist()):
+        by_condition[condition].add(result_id)
+
+    schema = SCHEMAS['experiments']
+    ingested_at = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), 'us')
+    removed = 0
+    for condition, group in by_condition.items():
+        n = len(group)
+        arrays = []
+        for field in schema:
+            if field.name == 'id':
+                arrays.append(pa.array(sorted(group), type=field.type))
+            elif field.name == 'ingested_at':
+                arrays.append(pa.array(np.full(n, ingested_at), type=field.type))
+            elif field.name == 'deleted':
+                arrays.append(pa.array(np.ones(n, dtype=bool), type=field.type))
+            else:
+                arrays.append(pa.nulls(n, type=field.type))
+        try:
+            _write_file(_partition_dir(root, 'experiments', condition), pa.Table.from_arrays(arrays, schema=schema))
+            removed += n
+        except Exception as e:
+            logger.error(f"Could not mark {n} experiments of '{condition}' deleted in the analytics store: {e}")
+    return removed
+
+
+def _dataset(name: str, root: str, files: Optional[List[str]] = None) -> Optional['ds.Dataset']:
+    path = os.path.join(root, name)
+    if files is None and not os.path.isdir(path):
+        return None
+    partition = pa.schema([('condition', pa.string())])
+    return ds.dataset(files or path, schema=pa.unify_schemas([SCHEMAS[name], partition]), format='parquet',
+                      partitioning=ds.partitioning(partition, flavor='hive'), partition_base_dir=path)
+
+
+def _versions(root: str, ids=None) -> Optional['pa.Table']:
+    """(id, ingested_at, deleted) of the latest append of each experiment; deleted if it is a tombstone."""
+    experiments = _dataset('experiments', root)
+    if experiments is None:
+        return None
+    expr = ds.field('id').isin(list(ids)) if ids is not None else None
+    table = experiments.to_table(columns=['id', 'ingested_at', 'deleted'], filter=expr)
+    # Files written before tombstones existed have no `deleted` column (null)
+    tombstone_at = pc.if_else(pc.fill_null(table['deleted'], False), table['ingested_at'],
+                              pa.scalar(None, table.schema.field('ingested_at').type))
+    grouped = pa.table({'id': table['id'], 'ingested_at': table['ingested_at'], 'tombstone_at': tombstone_at}) \
+        .group_by('id').aggregate([('ingested_at', 'max'), ('tombstone_at', 'max')])
+    deleted = pc.fill_null(pc.greater_equal(grouped['tombstone_at_max'], grouped['ingested_at_max']), False)
+    return pa.table({'id': grouped['id'], 'ingested_at': grouped['ingested_at_max'], 'deleted': deleted})
+
+
+def _latest_versions(root: str, ids=None) -> Optional['pa.Table']:
+    """(id, ingested_at) of the latest append of each experiment that is not deleted."""
+    versions = _versions(root, ids)
+    if versions is None:
+        return None
+    return versions.filter(pc.invert(versions['deleted'])).select(['id', 'ingested_at'])
+
+
+def _latest_of_rows(table: 'pa.Table', latest: 'pa.Table') -> 'pa.ChunkedArray':
+    """Per row of table, the ingested_at of its experiment's latest append (null if unknown)."""
+    return pc.take(latest['ingested_at'], pc.index_in(table['id'], value_set=latest['id']))
+
+
+def query(dataset: str, columns: Optional[Sequence[str]] = None, conditions: Optional[Sequence[str]] = None,
+          ids: Optional[Sequence[str]] = None, filters=None, latest_only: bool = True,
+          root: Optional[str] = None):
+    """
+    Rows of one dataset as a pandas DataFrame.
+
+    conditions / ids restrict by partition / experiment; filters is a pyarrow expression or
+    pandas-style tuples, e.g. [('closure_pct', '>=', 50), ('time_hr', '<', 24)], evaluated
+    against Parquet statistics before any data is decoded. With latest_only, rows of
+    superseded appends of an experiment are dropped.
+    """
+    import pandas as pd
+
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'; expected one of {DATASETS}")
+    if not AVAILABLE:
+        raise RuntimeError("pyarrow is required for the analytics store")
+    root = _root(root)
+    data = _dataset(dataset, root)
+    wanted = list(columns) if columns else SCHEMAS[dataset].names + ['condition']
+    if data is None:
+        return pd.DataFrame(columns=wanted)
+
+    expr = None
+    parts = []
+    if conditions:
+        parts.append(ds.field('condition').isin(list(conditions)))
+    if ids is not None:
+        parts.append(ds.field('id').isin(list(ids)))
+    if filters is not None:
+        parts.append(filters if isinstance(filters, ds.Expression) else pq.filters_to_expression(filters))
+    for part in parts:
+        expr = part if expr is None else expr & part
+
+    read_columns = list(dict.fromkeys(wanted + (['id', 'ingested_at'] if latest_only else [])))
+    table = data.to_table(columns=read_columns, filter=expr)
+    if latest_only and table.num_rows:
+        latest = _latest_versions(root, ids)
+        if latest is None:  # no experiments rows yet: nothing is complete
+            table = table.slice(0, 0)
+        else:
+            table = table.filter(pc.equal(table['ingested_at'], _latest_of_rows(table, latest)))
+    return table.select(wanted).to_pandas()
+
+
+def _sorted(table: 'pa.Table', dataset: str) -> 'pa.Table':
+    return table.sort_by([(key, 'ascending') for key in SORT_KEYS[dataset]])
+
+
+def compact(root: Optional[str] = None, keep_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Merge every partition's files into one sorted file, keeping only the latest append of
+    each experiment that is not deleted (and, if keep_ids is given, only those experiments).
+    Rows newer than the latest versions seen when compaction started (appends in progress)
+    are kept, and files appended while compacting are left alone. Returns {dataset:
+    {'files_before', 'files_after', 'rows_before', 'rows_after'}}. Run one compaction at a time.
+    """
+    if not AVAILABLE:
+        raise RuntimeError("pyarrow is required for the analytics store")
+    root = _root(root)
+    latest = _versions(root)
+    keep = pa.array(list(keep_ids), pa.string()) if keep_ids is not None else None
+
+    report = {}
+    for name in DATASETS:
+        counts = {'files_before': 0, 'files_after': 0, 'rows_before': 0, 'rows_after': 0}
+        base = os.path.join(root, name)
+        partitions = sorted(d for d in os.listdir(base) if d.startswith('condition=')) if os.path.isdir(base) else []
+        for partition in partitions:
+            directory = os.path.join(base, partition)
+            files = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                           if f.endswith('.parquet') and not f.startswith('.'))
+            if not files:
+                continue
+            table = _dataset(name, root, files).to_table(columns=SCHEMAS[name].names)
+            counts['files_before'] += len(files)
+            counts['rows_before'] += table.num_rows
+            mask = None
+            if latest is not None:
+                latest_at = _latest_of_rows(table, latest)
+                deleted = pc.take(latest['deleted'], pc.index_in(table['id'], value_set=latest['id']))
+                current = pc.and_kleene(pc.equal(table['ingested_at'], latest_at), pc.invert(deleted))
+                mask = pc.or_kleene(pc.or_kleene(pc.is_null(latest_at), pc.greater(table['ingested_at'], latest_at)),
+                                    current)
+            if keep is not None:
+                in_keep = pc.is_in(table['id'], value_set=keep)
+                mask = in_keep if mask is None else pc.and_kleene(mask, in_keep)
+            kept = table.filter(mask) if mask is not None else table
+            if kept.num_rows:
+                _write_file(directory, _sorted(kept, name), tag='-compacted')
+                counts['files_after'] += 1
+                counts['rows_after'] += kept.num_rows
+            for path in files:
+                os.remove(path)
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        report[name] = counts
+        logger.info(f"Compacted {name}: {counts['files_before']} -> {counts['files_after']} files, "
+                    f"{counts['rows_before']} -> {counts['rows_after']} rows.")
+    return report
+
+
+def info(root: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Files and rows per dataset (from Parquet footers)."""
+    if not AVAILABLE:
+        raise RuntimeError("pyarrow is required for the analytics store")
+    root = _root(root)
+    out = {}
+    for name in DATASETS:
+        data = _dataset(name, root)
+        files = data.files if data is not None else []
+        out[name] = {'files': len(files), 'rows': sum(pq.ParquetFile(f).metadata.num_rows for f in files)}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the Parquet analytics store")
+    parser.add_argument('command', choices=('compact', 'info'))
+    parser.add_argument('--root', type=str, default=None, help='Store root (default: Config.ANALYTICS_FOLDER)')
+    parser.add_argument('--prune', action='store_true',
+                        help='When compacting, drop experiments that are no longer in the results catalog')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not AVAILABLE:
+        raise SystemExit("pyarrow is not installed; the analytics store is disabled.")
+    if args.command == 'compact':
+        keep_ids = database.get_catalog_ids() if args.prune else None
+        for name, counts in compact(args.root, keep_ids).items():
+            print(f"{name:13s} files {counts['files_before']} -> {counts['files_after']}  "
+                  f"rows {counts['rows_before']} -> {counts['rows_after']}")
+    else:
+        for name, counts in info(args.root).items():
+            print(f"{name:13s} files {counts['files']}  rows {counts['rows']}")
+
+
+if __name__ == '__main__':
+    main()
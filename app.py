@@ -3,26 +3,33 @@ import matplotlib
 
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, abort
+from flask import Flask, render_template, request, jsonify, send_file, abort, Response, stream_with_context
 from flask_cors import CORS
-import os, glob, json, subprocess, threading, base64, pandas as pd, cv2, numpy as np, posixpath, shutil
+import os, json, pandas as pd, shutil
 from scipy import stats
-import io, zipfile, uuid, logging
-from PIL import Image, ImageSequence
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+import uuid, logging, time, tempfile, zipfile, base64, functools
+from datetime import datetime, timedelta, timezone
 from werkzeug.utils import secure_filename
 
 # NEW: Import Plotly for backend plot generation
 import plotly.graph_objects as go
 import plotly.express as px
-import plotly.io as pio
 
 from config import Config
 import database  # --- Import database module ---
+import results_catalog
+import analytics_store
+import job_queue
+import analysis_workers
+import uploads
+import result_cache
+import intermediates
+import result_files
+import reports
+import stats_cache
+import curves
+import figures
+from results_catalog import CONDITION_NAMES
 from typing import List, Dict, Optional
 
 # Setup logging
@@ -35,8 +42,8 @@ CORS(app)
 
 # Ensure results dir exists (upload dir is handled by Config)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
+database.create_table()
 
-analysis_state = {'running': False, 'progress': 0, 'status': 'Idle', 'current': ''}
 
 # METRIC NAMES WITH DESCRIPTIONS
 METRIC_INFO = {
@@ -59,128 +66,67 @@ METRIC_INFO = {
     'mean_velocity_um_min': {'name': 'Mean Cell Velocity', 'unit': 'µm/min'},
     'migration_efficiency_mean': {'name': 'Migration Efficiency', 'unit': ''},
     'mean_directionality': {'name': 'Mean Directionality', 'unit': ''},
+    'msd_alpha': {'name': 'MSD Diffusion Exponent (α)', 'unit': ''},
+    'mean_persistence_time_min': {'name': 'Mean Persistence Time', 'unit': 'min'},
+    'front_velocity_um_min': {'name': 'Wound Front Velocity', 'unit': 'µm/min'},
     "initial_area_um2": {"name": "Starting Wound Size", "unit": "µm²"},
     "final_area_um2": {"name": "Final Wound Size", "unit": "µm²"},
     "healing_rate_um2_per_hr": {"name": "Healing Speed", "unit": "µm²/hr"},
     "pixel_scale_um_per_px": {"name": "Pixel Scale", "unit": "µm/px"}
 }
 
-CONDITION_NAMES = {
-    'MDCK_Control': ('🧬 Epithelial Cells (Baseline)', 'Normal epithelial cells - baseline'),
-    'MDCK_HGF': ('⚡ Epithelial + Growth Factor', 'Epithelial cells treated with HGF/SF'),
-    'DA3_Control': ('🔬 Cancer Cells (Baseline)', 'Cancer cells - baseline'),
-    'DA3_PHA': ('💊 Cancer + Immune Activation', 'Cancer cells with immune activation'),
-    'DA3_HGF': ('🔥 Cancer + Growth Factor', 'Cancer cells with growth factor'),
-    'Uploaded Data': ('📤 Uploaded Data', 'User-uploaded dataset')
-}
+# --- REMOVED: get_available_datasets() function is no longer needed ---
 
 
-# --- REMOVED: get_available_datasets() function is no longer needed ---
+# ----------------- Results catalog lookups -----------------
+_catalog_bootstrapped = False
+
+
+def _ensure_catalog():
+    """Populate an empty catalog once per process from an existing results tree."""
+    global _catalog_bootstrapped
+    if _catalog_bootstrapped:
+        return
+    _catalog_bootstrapped = True
+    if not database.get_catalog_ids():
+        results_catalog.reconcile(app.config['RESULTS_FOLDER'])
+
+
+def catalog_entry_to_result(entry: Dict) -> Dict:
+    """Add the URL fields the routes/template expect to a catalog entry."""
+    gallery_files = entry.get('gallery') or []
+    condition = entry.get('condition') or 'Unknown'
+    version = result_files.version_token(entry.get('summary_mtime'))
+    entry.update({
+        'asset_version': version,
+        'plot_url': path_to_url_for_result(entry.get('plot_path'), version),
+        'interactive_plot_url': path_to_url_for_result(entry.get('interactive_plot_path'), version),
+        'gallery_thumbs': [u for u in (path_to_url_for_result(p, version) for p in gallery_files) if u],
+        'video_url': path_to_url_for_result(entry.get('video_path'), version),
+        'condition_name': CONDITION_NAMES.get(condition, (condition, ''))[0],
+    })
+    return entry
 
 
-# ----------------- Robust results discovery -----------------
 def get_all_results():
     """
-    Find *_summary.json files under RESULTS_FOLDER and create a list of result dicts.
+    List all results from the SQLite catalog, newest first.
     """
-    results = []
-    base = os.path.abspath(app.config['RESULTS_FOLDER'])
-    if not os.path.exists(base):
-        return results
+    _ensure_catalog()
+    return [catalog_entry_to_result(e) for e in database.get_catalog_entries()]
 
-    pattern = os.path.join(base, '**', '*_summary.json')
-    summary_files = glob.glob(pattern, recursive=True)
 
-    for sfile in sorted(summary_files, key=os.path.getmtime, reverse=True):
-        try:
-            with open(sfile, 'r', encoding='utf-8') as f:
-                raw = json.load(f)
-        except Exception:
-            raw = None
-
-        rel = os.path.relpath(sfile, base).replace(os.sep, '/')
-        parts = rel.split('/')
-        if parts[0] == 'uploads' and len(parts) >= 3:
-            result_id = posixpath.join('uploads', parts[1])  # e.g., uploads/uuid
-            condition = 'Uploaded Data'
-            experiment_name = raw.get('experiment', os.path.splitext(parts[-1])[0].replace('_summary', ''))
-            base_result_dir = os.path.join(base, 'uploads', parts[1])
-        else:
-            if len(parts) >= 3:  # e.g., DA3_Control/CIL_43406/csv/DA3_Control_CIL_43406_summary.json
-                condition = parts[0]
-                experiment_name = parts[1]
-                base_result_dir = os.path.join(base, parts[0], experiment_name)
-                result_id = posixpath.join(parts[0], experiment_name)
-            else:
-                condition = 'Unknown'
-                experiment_name = raw.get('experiment', os.path.splitext(parts[-1])[0].replace('_summary', ''))
-                base_result_dir = os.path.dirname(sfile)
-                result_id = experiment_name
-
-        base_name = raw.get('experiment', os.path.splitext(os.path.basename(sfile))[0].replace('_summary', ''))
+def get_result(exp_id: str) -> Optional[Dict]:
+    """
+    Look one result up by id in the SQLite catalog.
+    """
+    _ensure_catalog()
+    entry = database.get_catalog_entry(exp_id)
+    return catalog_entry_to_result(entry) if entry else None
 
-        plot_candidates = [
-            os.path.join(base_result_dir, 'plots', f'{base_name}_analysis.png'),
-            os.path.join(base_result_dir, 'plots', f'{base_name}.png'),
-            os.path.join(base_result_dir, f'{base_name}.png'),
-        ]
-        csv_candidates = [
-            os.path.join(base_result_dir, 'csv', f'{base_name}_timeseries.csv'),
-            os.path.join(base_result_dir, f'{base_name}.csv'),
-        ]
-        video_candidates = [
-            os.path.join(base_result_dir, 'video', f'{base_name}_analysis_video.mp4'),
-            os.path.join(base_result_dir, 'video', f'{base_name}.mp4'),
-        ]
 
-        def pick_first_existing(cands):
-            for c in cands:
-                if c and os.path.exists(c):
-                    return c
-            return None
-
-        plot_path = pick_first_existing(plot_candidates)
-        csv_path = pick_first_existing(csv_candidates)
-        video_path = pick_first_existing(video_candidates)
-
-        gallery_dir = os.path.join(base_result_dir, 'gallery')
-        gallery_files = []
-        if os.path.isdir(gallery_dir):
-            for ext in ('*.png', '*.jpg', '*.jpeg'):
-                gallery_files.extend(sorted(glob.glob(os.path.join(gallery_dir, ext))))
-        gallery_urls = [path_to_url_for_result(p) for p in gallery_files if path_to_url_for_result(p)]
-
-        interactive_json_path = os.path.join(base_result_dir, 'plots', f'{base_name}_analysis_interactive.json')
-        if not os.path.exists(interactive_json_path):
-            interactive_json_path = None
-
-        cond_name = CONDITION_NAMES.get(condition, (condition, ''))[0]
-
-        results.append({
-            'id': result_id,
-            'rel_summary_path': rel,
-            'summary_path': sfile,
-            'raw_summary': raw,
-            'csv_path': csv_path,
-            'plot_path': plot_path,
-            'plot_url': path_to_url_for_result(plot_path),
-            'interactive_plot_path': interactive_json_path,
-            'interactive_plot_url': path_to_url_for_result(interactive_json_path),
-            'gallery': gallery_files,
-            'gallery_thumbs': gallery_urls,
-            'video_path': video_path,
-            'video_url': path_to_url_for_result(video_path),
-            'condition': condition,
-            'condition_name': cond_name,
-            'experiment_name': experiment_name
-        })
-
-    results.sort(key=lambda r: os.path.getmtime(r['summary_path']) if os.path.exists(r['summary_path']) else 0,
-                 reverse=True)
-    return results
-
-
-def path_to_url_for_result(fs_path: Optional[str]) -> Optional[str]:
+def path_to_url_for_result(fs_path: Optional[str], version: Optional[str] = None) -> Optional[str]:
+    """URL under /results_data for a results file; `version` makes it an immutable, cacheable URL."""
     if not fs_path:
         return None
     base = os.path.abspath(app.config['RESULTS_FOLDER'])
@@ -192,7 +138,7 @@ def path_to_url_for_result(fs_path: Optional[str]) -> Optional[str]:
     if rel.startswith('..'):
         return None
     rel_url = rel.replace(os.sep, '/').lstrip('./')
-    return f'/results_data/{rel_url}'
+    return f'/results_data/{rel_url}?v={version}' if version else f'/results_data/{rel_url}'
 
 
 # ----------------- Statistics & helpers -----------------
@@ -224,7 +170,7 @@ def create_correlation_heatmap_json(df: pd.DataFrame) -> str:
             xaxis_showgrid=False, yaxis_showgrid=False,
             yaxis_autorange='reversed'
         )
-        return pio.to_json(fig)
+        return figures.to_slim_json(fig)
     except Exception as e:
         logger.error(f"Error creating correlation heatmap: {e}")
         return "{}"
@@ -263,178 +209,210 @@ def create_stats_box_plots_json(df: pd.DataFrame) -> str:
         # Clean up facet labels
         fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[1]))
 
-        return pio.to_json(fig)
+        return figures.to_slim_json(fig)
     except Exception as e:
         logger.error(f"Error creating box plots: {e}")
         return "{}"
 
 
+def _build_stats_page() -> dict:
+    """Aggregates, p-values and figure JSON for the statistics tab (see stats_cache)."""
+    metrics_df = database.get_all_metrics_for_plots()
+    return {
+        'cond_stats': database.get_stats_by_condition(),
+        'pvalues': database.calculate_all_pvalues(),
+        'correlation_json': create_correlation_heatmap_json(metrics_df),
+        'box_plots_json': create_stats_box_plots_json(metrics_df),
+    }
+
+
+stats_cache.register('stats_page', _build_stats_page)
+
+
 # ----------------- Analysis runner -----------------
-def run_analysis(input_dir, output_dir, disk_size, time_interval, pixel_scale, analysis_id, sample_id=None):
-    global analysis_state
+def _analysis_cache_params(params: dict, upload: dict) -> dict:
+    return result_cache.cache_params(dict(params, frame_interval=upload['frame_interval'], track_cells=True,
+                                          visualize=True), upload['filename'])
+
+
+def run_analysis(params: dict, report, job_id: str) -> str:
+    """
+    Job handler for 'analysis' jobs: runs batch_analysis.analyze_experiment on an uploaded
+    dataset in a pre-warmed worker process and records the result. Returns the result id;
+    raises on failure.
+    """
+    analysis_id = params['analysis_id']
+    sample_id = params.get('sample_id')
+    input_dir = os.path.join(app.config['UPLOAD_FOLDER'], analysis_id)
+    output_dir = os.path.join(app.config['RESULTS_FOLDER'], 'uploads', analysis_id)  # created by the analysis
+
+    safe_sample_id = secure_filename(sample_id) if sample_id else secure_filename(analysis_id)
+    report(0, f'Starting analysis for {analysis_id}')
+
+    upload = database.get_upload(analysis_id)  # None for uploads decoded in-request by older versions
+    cache_params = _analysis_cache_params(params, upload) if upload else None
+    outcome = analysis_workers.analyze_in_worker(
+        job_id, app.config['ANALYSIS_WORKERS'], upload_id=upload and upload['id'], cache_params=cache_params,
+        input_dir=input_dir, output_dir=output_dir, disk_size=params.get('disk_size', 0),
+        time_interval=params.get('time_interval', 0.25), pixel_scale=params.get('pixel_scale', 1.0),
+        experiment_name=safe_sample_id, visualize=True, track_cells=True)
+    if outcome.get('cached_result_id'):
+        report(100, '✅ Reused cached result')
+        return outcome['cached_result_id']
+
+    base_results_dir = os.path.abspath(app.config['RESULTS_FOLDER'])
+    result_id = os.path.relpath(output_dir, base_results_dir).replace(os.sep, '/')
+    _record_result(result_id, output_dir, outcome['summary_path'], safe_sample_id)
+    result_cache.store(outcome.get('input_sha256'), cache_params, result_id, output_dir)
+    return result_id
+
+
+def _record_result(result_id: str, output_dir: str, summary_path: str, experiment_name: str):
+    """Upsert a finished analysis into the experiments table and the results catalog."""
     try:
-        analysis_state['running'] = True
-        analysis_state['progress'] = 0
-        analysis_state['status'] = f'Starting analysis for {analysis_id}'
-        analysis_state['current'] = analysis_id
-        os.makedirs(output_dir, exist_ok=True)
-
-        safe_sample_id = secure_filename(sample_id) if sample_id else secure_filename(analysis_id)
-
-        cmd = ['python', 'batch_analysis.py', '--input', input_dir, '--output', output_dir,
-               '--disk-size', str(disk_size), '--time-interval', str(time_interval),
-               '--pixel-scale', str(pixel_scale), '--visualize', '--track-cells',
-               '--experiment-name', safe_sample_id]
-
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
-                                   universal_newlines=True)
-        for line in iter(process.stdout.readline, ''):
-            logger.info(line.rstrip())
-            if "Auto-selected best disk size" in line:
-                analysis_state['status'] = f'Auto-selected parameters... {line.split(":")[-1].strip()}'
-            elif "Analyzing" in line:
-                analysis_state['status'] = f'Processing frames for {safe_sample_id}...'
-            elif "Creating overlay gallery" in line:
-                analysis_state['status'] = f'Creating gallery for {safe_sample_id}...'
-                analysis_state['progress'] = 50
-            elif "Creating animation" in line:
-                analysis_state['status'] = f'Creating video for {safe_sample_id}...'
-                analysis_state['progress'] = 75
-
-        _, stderr = process.communicate()
-        if process.returncode == 0:
-            analysis_state['progress'] = 100
-            analysis_state['status'] = f'✅ Complete: {safe_sample_id}'
-
-            try:
-                summary_path = os.path.join(output_dir, 'csv', f'{safe_sample_id}_summary.json')
-                if os.path.exists(summary_path):
-                    with open(summary_path, 'r') as f:
-                        summary_data = json.load(f)
-
-                    base_results_dir = os.path.abspath(app.config['RESULTS_FOLDER'])
-                    rel_output_dir = os.path.relpath(output_dir, base_results_dir)
-                    result_id = rel_output_dir.replace(os.sep, '/')
-
-                    summary_data['experiment_name'] = safe_sample_id
-                    if 'uploads' in result_id:
-                        summary_data['condition_name'] = 'Uploaded Data'
-                    else:
-                        condition_key = result_id.split('/')[0]
-                        summary_data['condition_name'] = CONDITION_NAMES.get(condition_key, (condition_key,))[0]
-
-                    database.upsert_experiment(summary_data, result_id)
-                else:
-                    logger.error(f"Could not find summary file to save to DB: {summary_path}")
-            except Exception as e:
-                logger.error(f"Failed to save result to database: {e}", exc_info=True)
+        with open(summary_path, 'r') as f:
+            summary_data = json.load(f)
 
+        summary_data['experiment_name'] = experiment_name
+        if 'uploads' in result_id:
+            summary_data['condition_name'] = 'Uploaded Data'
         else:
-            error_message = stderr[-200:] if stderr else "Unknown error"
-            analysis_state['status'] = f'❌ Error running analysis for {safe_sample_id}: {error_message}'
-            logger.error(f"Analysis Error: {stderr}")
+            condition_key = result_id.split('/')[0]
+            summary_data['condition_name'] = CONDITION_NAMES.get(condition_key, (condition_key,))[0]
+
+        database.upsert_experiment(summary_data, result_id)
+        stats_cache.refresh()
+        results_catalog.register_output_dir(output_dir, app.config['RESULTS_FOLDER'])
+        if app.config['PRECOMPRESS_RESULTS']:
+            result_files.precompress_tree(output_dir)
+        result = get_result(result_id)
+        if result:
+            # Rendered on the analysis pool: no second process pool in the job-claiming process
+            reports.schedule(reports.report_info(result),
+                             submit=functools.partial(analysis_workers.submit, app.config['ANALYSIS_WORKERS']))
     except Exception as e:
-        analysis_state['status'] = f'❌ Error: {str(e)}'
-        logger.exception(f"Exception in run_analysis: {e}")
-    finally:
-        analysis_state['running'] = False
+        logger.error(f"Failed to save result to database: {e}", exc_info=True)
 
 
-# ----------------- Routes -----------------
-@app.route('/')
-def index():
-    """Main route that renders the HTML page (enriches results to match template expectations)."""
-    results = get_all_results()
+def _result_output_dir(result_id: str) -> Optional[str]:
+    """Results directory of a result id, or None if it would fall outside RESULTS_FOLDER."""
+    base = os.path.abspath(app.config['RESULTS_FOLDER'])
+    path = os.path.abspath(os.path.join(base, result_id))
+    return path if path.startswith(base + os.sep) else None
 
-    for r in results:
-        r['data'] = r.get('raw_summary') or {}
-        if 'condition_name' not in r or not r['condition_name']:
-            cond = r.get('condition', 'Unknown')
-            r['condition_name'] = CONDITION_NAMES.get(cond, (cond.replace('_', ' ').title(), ''))[0]
 
-        r['plot_b64'] = None
-        plot_path = r.get('plot_path')
-        try:
-            if plot_path and os.path.exists(plot_path):
-                with open(plot_path, 'rb') as pf:
-                    r['plot_b64'] = base64.b64encode(pf.read()).decode()
-        except Exception as e:
-            logger.warning(f"Warning reading plot for {r.get('id')}: {e}")
-            r['plot_b64'] = None
-
-        r['csv_b64'] = ""
-        csv_path = r.get('csv_path')
-        try:
-            if csv_path and os.path.exists(csv_path):
-                with open(csv_path, 'r', encoding='utf-8') as cf:
-                    r['csv_b64'] = base64.b64encode(cf.read().encode()).decode()
-        except Exception as e:
-            logger.warning(f"Warning reading csv for {r.get('id')}: {e}")
-            r['csv_b64'] = ""
-
-        gallery_list = r.get('gallery') or []
-        thumbs = []
-        if gallery_list:
-            picks = [gallery_list[0]]
-            if len(gallery_list) > 2:
-                picks.append(gallery_list[len(gallery_list) // 2])
-            if len(gallery_list) > 1:
-                picks.append(gallery_list[-1])
-            for p in sorted(list(dict.fromkeys(picks))):
-                url = path_to_url_for_result(p)
-                if url:
-                    thumbs.append(url)
-        r['gallery_thumbs'] = thumbs
-
-        vpath = r.get('video_path')
-        if vpath and os.path.exists(vpath):
-            r['video_path'] = path_to_url_for_result(vpath)
-        else:
-            r['video_path'] = path_to_url_for_result(vpath) if vpath else None
+def run_reanalysis(params: dict, report, job_id: str) -> str:
+    """
+    Job handler for 'reanalysis' jobs: re-runs an existing result in place with new
+    pixel_scale / time_interval / disk_size from its cached intermediates. Returns the
+    result id; raises on failure.
+    """
+    result_id = params['result_id']
+    output_dir = _result_output_dir(result_id)
+    report(0, f'Re-analyzing {result_id}')
+    outcome = analysis_workers.reanalyze_in_worker(
+        job_id, app.config['ANALYSIS_WORKERS'], output_dir=output_dir,
+        time_interval=params.get('time_interval'), pixel_scale=params.get('pixel_scale'),
+        disk_size=params.get('disk_size'))
+
+    _record_result(result_id, output_dir, outcome['summary_path'], outcome['experiment_name'])
+    # Cache entries for this result describe its old parameters
+    database.delete_cached_results(result_id=result_id)
+    upload = database.get_upload(result_id.split('/', 1)[1]) if result_id.startswith('uploads/') else None
+    state = intermediates.load_run_state(output_dir)
+    if upload and upload['content_sha256'] and state:
+        effective = {k: state[k] for k in ('disk_size', 'time_interval', 'pixel_scale')}
+        result_cache.store(upload['content_sha256'], _analysis_cache_params(effective, upload), result_id, output_dir)
+    report(100, f"✅ Re-analysis complete ({', '.join(outcome['stages']) or 'metrics only'})")
+    return result_id
+
+
+job_queue.register_handler('analysis', run_analysis)
+job_queue.register_handler('reanalysis', run_reanalysis)
+job_queue.start_workers(app.config['ANALYSIS_WORKERS'], on_start=analysis_workers.start_pool)
 
-    # Page-level aggregates
-    # --- REMOVED: available_datasets ---
-    total_exp = len(results)
-    total_cond = len(set(r.get('condition', 'Unknown') for r in results))
-    total_frames = sum(int((r.get('data') or {}).get('num_timepoints', 0)) for r in results)
-    total_time = sum((r.get('data') or {}).get('processing_time_sec', 0) for r in results) / 60.0
 
-    # --- NEW: Get stats from database ---
-    cond_stats = database.get_stats_by_condition()
-    pvalues = database.calculate_all_pvalues()
+# ----------------- Routes -----------------
+@app.route('/')
+def index():
+    """Main route: renders the page shell; experiment cards are loaded lazily from /api/results."""
+    _ensure_catalog()
+    totals = database.get_catalog_totals()
 
-    # --- NEW: Generate plots for Stats page ---
-    metrics_df = database.get_all_metrics_for_plots()
-    correlation_json = create_correlation_heatmap_json(metrics_df)
-    box_plots_json = create_stats_box_plots_json(metrics_df)
+    # Stats tab: rebuilt in the background after the experiments table changes
+    stats_page = stats_cache.get('stats_page')
 
-    all_conditions = sorted(
-        set(r.get('condition', 'Unknown') for r in results if r.get('condition', 'Unknown') != 'Uploaded Data'))
+    all_conditions = [c for c in totals['conditions'] if c != 'Uploaded Data']
 
     condition_names_safe = dict(CONDITION_NAMES)
-    for cond in sorted(set(r.get('condition', 'Unknown') for r in results)):
+    for cond in totals['conditions']:
         if cond not in condition_names_safe:
             condition_names_safe[cond] = (cond.replace('_', ' ').title(), '')
 
     return render_template('index.html',
-                           results=results,
-                           total_exp=total_exp,
-                           total_cond=total_cond,
-                           total_frames=total_frames,
-                           total_time=total_time,
-                           # --- REMOVED: available_datasets ---
-                           cond_stats=cond_stats,
-                           pvalues=pvalues,
+                           total_exp=totals['total_exp'],
+                           total_cond=totals['total_cond'],
+                           total_frames=totals['total_frames'],
+                           total_time=totals['total_time_sec'] / 60.0,
+                           cond_stats=stats_page['cond_stats'],
+                           pvalues=stats_page['pvalues'],
                            all_conditions=all_conditions,
                            condition_names=condition_names_safe,
                            metric_info=METRIC_INFO,
-                           correlation_json=correlation_json,  # NEW
-                           box_plots_json=box_plots_json  # NEW
+                           correlation_json=stats_page['correlation_json'],
+                           box_plots_json=stats_page['box_plots_json'],
+                           plotly_template_version=figures.TEMPLATE_VERSION
                            )
 
 
+CARD_METRIC_KEYS = ('final_closure_pct', 'healing_rate_um2_per_hr', 'healing_rate_mean_px_per_hr',
+                    'r_squared', 'pixel_scale_um_per_px')
+
+
+def result_to_card(r: Dict) -> Dict:
+    """Compact JSON for one dashboard card: metrics plus asset URLs (nothing inlined)."""
+    data = r.get('raw_summary') or {}
+    return {
+        'id': r['id'],
+        'experiment_name': r.get('experiment_name'),
+        'condition': r.get('condition'),
+        'condition_name': r.get('condition_name'),
+        'plot_url': r.get('plot_url'),
+        'csv_url': path_to_url_for_result(r.get('csv_path'), r.get('asset_version')),
+        'video_url': r.get('video_url'),
+        'metrics': {k: data[k] for k in CARD_METRIC_KEYS if k in data},
+    }
+
+
+@app.route('/api/results')
+def api_results():
+    """Paginated, filterable experiment listing for the dashboard."""
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(100, max(1, int(request.args.get('per_page', 24))))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    condition = request.args.get('condition') or None
+    if condition == 'all':
+        condition = None
+    search = (request.args.get('q') or '').strip() or None
+
+    _ensure_catalog()
+    entries, total = database.query_catalog(condition=condition, search=search,
+                                            limit=per_page, offset=(page - 1) * per_page)
+    cards = [result_to_card(catalog_entry_to_result(e)) for e in entries]
+    return jsonify({
+        'results': cards,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'has_more': page * per_page < total,
+    })
+
+
 @app.route('/api/upload', methods=['POST'])
 def api_upload():
+    """Single-request upload (small files). Decoding happens in the analysis job."""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file part'}), 400
@@ -449,43 +427,76 @@ def api_upload():
         input_dir = os.path.join(app.config['UPLOAD_FOLDER'], analysis_id)
         os.makedirs(input_dir, exist_ok=True)
         save_path = os.path.join(input_dir, filename)
-        file.save(save_path)
-
-        if filename.lower().endswith('.zip'):
-            with zipfile.ZipFile(save_path, 'r') as zip_ref:
-                zip_ref.extractall(input_dir)
-            os.remove(save_path)
-        elif filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-            vidcap = cv2.VideoCapture(save_path)
-            success, image = vidcap.read()
-            count, frame_num = 0, 0
-            while success:
-                if count % frame_interval == 0:
-                    cv2.imwrite(os.path.join(input_dir, f"frame_{frame_num:04d}.png"), image)
-                    frame_num += 1
-                success, image = vidcap.read()
-                count += 1
-            os.remove(save_path)
-        elif filename.lower().endswith(('.tif', '.tiff', '.gif')):
-            img = Image.open(save_path)
-            for i, page in enumerate(ImageSequence.Iterator(img)):
-                page.convert('L').save(os.path.join(input_dir, f"frame_{i:04d}.png"))
-            os.remove(save_path)
-
-        extracted_items = os.listdir(input_dir)
-        if len(extracted_items) == 1 and os.path.isdir(os.path.join(input_dir, extracted_items[0])):
-            if extracted_items[0] != "__MACOSX":
-                sub_dir = os.path.join(input_dir, extracted_items[0])
-                for item in os.listdir(sub_dir):
-                    shutil.move(os.path.join(sub_dir, item), input_dir)
-                os.rmdir(sub_dir)
+        content_sha256 = uploads.save_stream(file.stream, save_path)
 
+        database.create_upload(analysis_id, filename, os.path.getsize(save_path), frame_interval, status='complete')
+        database.set_upload_content(analysis_id, content_sha256)
         return jsonify({'status': 'uploaded', 'analysis_id': analysis_id})
     except Exception as e:
         logger.exception(f"Unhandled error in /api/upload: {e}")
         return jsonify({'error': f'An internal server error occurred: {e}'}), 500
 
 
+def _upload_error(e: uploads.UploadError):
+    resp = jsonify({'error': str(e), 'offset': e.offset})
+    resp.status_code = e.status_code
+    if e.offset is not None:
+        resp.headers['Upload-Offset'] = str(e.offset)
+    return resp
+
+
+@app.route('/api/uploads', methods=['POST'])
+def api_create_upload():
+    """Start a chunked upload: {filename, size, sha256?, frame_interval?}."""
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = uploads.create_session(str(uuid.uuid4()), data.get('filename'), int(data.get('size') or 0),
+                                        frame_interval=int(data.get('frame_interval') or 5),
+                                        sha256=data.get('sha256'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size and frame_interval must be integers'}), 400
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return jsonify({'upload_id': upload['id'], 'analysis_id': upload['id'], 'offset': 0,
+                    'size': upload['size'], 'chunk_size': app.config['UPLOAD_CHUNK_SIZE']}), 201
+
+
+@app.route('/api/uploads/<upload_id>', methods=['HEAD', 'GET'])
+def api_upload_status(upload_id):
+    upload = database.get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    offset = uploads.current_offset(upload)
+    resp = jsonify({'upload_id': upload_id, 'offset': offset, 'size': upload['size'], 'status': upload['status'],
+                    'error': upload['error']})
+    resp.headers['Upload-Offset'] = str(offset)
+    resp.headers['Upload-Length'] = str(upload['size'])
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def api_upload_chunk(upload_id):
+    """Append one chunk at Upload-Offset; optional Upload-Checksum: sha256 <hex>."""
+    upload = database.get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    try:
+        new_offset = uploads.append_chunk(upload, offset, request.stream, request.content_length,
+                                          request.headers.get('Upload-Checksum'))
+    except uploads.UploadError as e:
+        return _upload_error(e)
+
+    complete = new_offset == upload['size']
+    resp = jsonify({'upload_id': upload_id, 'offset': new_offset, 'complete': complete})
+    resp.headers['Upload-Offset'] = str(new_offset)
+    return resp
+
+
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     try:
@@ -499,37 +510,246 @@ def api_analyze():
         pixel_scale = float(data.get('pixel_scale', 1.0))
         sample_id = data.get('sample_id') or None
 
-        input_dir = os.path.join(app.config['UPLOAD_FOLDER'], analysis_id)
-        output_dir = os.path.join(app.config['RESULTS_FOLDER'], 'uploads', analysis_id)
-
-        thread_args = (input_dir, output_dir, disk_size, time_interval, pixel_scale, analysis_id, sample_id)
-        thread = threading.Thread(target=run_analysis, args=thread_args)
-        thread.daemon = True
-        thread.start()
-        return jsonify({'status': 'started', 'analysis_id': analysis_id})
+        if not os.path.isdir(os.path.join(app.config['UPLOAD_FOLDER'], analysis_id)):
+            return jsonify({'error': f'Unknown analysis_id: {analysis_id}'}), 404
+        upload = database.get_upload(analysis_id)
+        if upload and upload['status'] in ('uploading', 'failed'):
+            return jsonify({'error': f"Upload is not ready for analysis (status: {upload['status']})"}), 409
+
+        params = {'analysis_id': analysis_id, 'disk_size': disk_size, 'time_interval': time_interval,
+                  'pixel_scale': pixel_scale, 'sample_id': sample_id}
+        if upload and upload['content_sha256']:
+            cached = result_cache.lookup(upload['content_sha256'], _analysis_cache_params(params, upload))
+            job = job_queue.record_finished('analysis', params, cached, '✅ Reused cached result') if cached else None
+            if job:
+                return jsonify({'status': 'started', 'analysis_id': analysis_id, 'job_id': job['id'],
+                                'cached': True, 'result_id': cached})
+
+        job = job_queue.submit('analysis', params)
+        if job is None:
+            return jsonify({'error': 'Could not queue analysis job'}), 500
+        return jsonify({'status': 'started', 'analysis_id': analysis_id, 'job_id': job['id']})
     except Exception as e:
         logger.exception(f"Unhandled error in /api/analyze: {e}")
         return jsonify({'error': f'An internal server error occurred: {e}'}), 500
 
 
+@app.route('/api/reanalyze', methods=['POST'])
+def api_reanalyze():
+    """
+    Re-run an existing result with new parameters, reusing its cached intermediates.
+    Body: {result_id, pixel_scale?, time_interval?, disk_size?}; omitted values are kept.
+    """
+    try:
+        data = request.json or {}
+        result_id = data.get('result_id')
+        if not result_id:
+            return jsonify({'error': 'No result_id provided'}), 400
+        if get_result(result_id) is None:
+            return jsonify({'error': f'Unknown result_id: {result_id}'}), 404
+        output_dir = _result_output_dir(result_id)
+        if output_dir is None or intermediates.load_run_state(output_dir) is None:
+            return jsonify({'error': 'This result has no cached intermediates; run a new analysis instead.'}), 409
+
+        params = {'result_id': result_id}
+        for key, cast in (('pixel_scale', float), ('time_interval', float), ('disk_size', int)):
+            if data.get(key) not in (None, ''):
+                params[key] = cast(data[key])
+                if params[key] <= 0:
+                    return jsonify({'error': f'{key} must be positive'}), 400
+
+        job = job_queue.submit('reanalysis', params)
+        if job is None:
+            return jsonify({'error': 'Could not queue re-analysis job'}), 500
+        return jsonify({'status': 'started', 'result_id': result_id, 'job_id': job['id']})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    except Exception as e:
+        logger.exception(f"Unhandled error in /api/reanalyze: {e}")
+        return jsonify({'error': f'An internal server error occurred: {e}'}), 500
+
+
 # --- REMOVED: /api/analyze_existing route ---
 
 
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    job = database.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_queue.job_to_json(job))
+
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """
+    Server-Sent Events stream of one job's progress. Emits a 'progress' event whenever the
+    job row changes (stage, frame i/N, fps, ETA) and a final 'done' or 'failed' event.
+    Jobs running in this process push their changes (job_queue.notify); others are polled
+    every JOB_EVENTS_REMOTE_POLL_SEC. Each open stream holds one server thread.
+    """
+    if not database.get_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    remote_poll = app.config['JOB_EVENTS_REMOTE_POLL_SEC']
+    keepalive = app.config['JOB_EVENTS_KEEPALIVE_SEC']
+
+    def generate():
+        last, last_sent, version = None, time.monotonic(), 0
+        job_queue.subscribe(job_id)
+        try:
+            yield 'retry: 2000\n\n'
+            while True:
+                job = database.get_job(job_id)
+                if job is None:
+                    yield 'event: failed\ndata: {"message": "Job was removed"}\n\n'
+                    return
+                payload = job_queue.job_to_json(job)
+                state = (payload['status'], payload['progress'], payload['message'], payload['frame'],
+                         payload['stage'])
+                if state != last:
+                    last, last_sent = state, time.monotonic()
+                    event = payload['status'] if payload['status'] in ('done', 'failed') else 'progress'
+                    yield f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+                    if event != 'progress':
+                        return
+                elif time.monotonic() - last_sent >= keepalive:
+                    last_sent = time.monotonic()
+                    yield ': keepalive\n\n'
+                timeout = keepalive if job_queue.runs_here(job_id) else remote_poll
+                version = job_queue.wait_for_event(job_id, version, timeout)
+        finally:
+            job_queue.unsubscribe(job_id)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/jobs')
+def api_jobs():
+    limit = min(100, max(1, request.args.get('limit', 20, type=int)))
+    return jsonify({'jobs': [job_queue.job_to_json(j) for j in database.get_recent_jobs(limit)]})
+
+
 @app.route('/api/status')
 def api_status():
-    return jsonify(analysis_state)
+    """Legacy single-slot status: reports the most recently submitted job."""
+    jobs = database.get_recent_jobs(1)
+    if not jobs:
+        return jsonify({'running': False, 'progress': 0, 'status': 'Idle', 'current': ''})
+    job = jobs[0]
+    return jsonify({'running': job['status'] in database.JOB_ACTIVE_STATUSES, 'progress': job['progress'],
+                    'status': job['message'], 'current': job['params'].get('analysis_id', ''),
+                    'job_id': job['id']})
+
+
+COMPARISON_MAX_LIMIT = 1000
+
+
+def _parse_timestamp_arg(name: str, end_of_day: bool = False) -> Optional[str]:
+    """ISO date/datetime query arg -> 'YYYY-MM-DD HH:MM:SS' (UTC, as stored); a bare date
+    given as an upper bound covers that whole day."""
+    value = (request.args.get(name) or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _encode_cursor(key) -> Optional[str]:
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(token: str):
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return value, str(last_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 
 @app.route('/api/comparison_data')
 def api_comparison_data():
+    """
+    Experiments for the comparison tab, filtered and paginated in SQL.
+
+    Query parameters (all optional):
+      condition   condition name; repeat for several
+      id          experiment id; repeat for several
+      since/until ISO date or datetime (until is exclusive; a bare date includes that day)
+      fields      comma-separated columns to return (id is always included)
+      sort        column, '-' prefix for descending (default -timestamp)
+      limit       page size (default 100, max 1000)
+      offset      rows to skip, or
+      cursor      next_cursor of the previous page (keyset pagination; offset is ignored)
+      mode        'aggregate' for per-condition n/mean/std of the requested fields
+    """
+    args = request.args
+    try:
+        fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()] or None
+        unknown = [f for f in fields or () if f not in database.EXPERIMENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        conditions = args.getlist('condition') or None
+        since = _parse_timestamp_arg('since')
+        until = _parse_timestamp_arg('until', end_of_day=True)
+
+        if args.get('mode') == 'aggregate':
+            return jsonify({'conditions': database.aggregate_experiments(fields, conditions, since, until)})
+
+        ids = args.getlist('id') or None
+        limit = min(COMPARISON_MAX_LIMIT, max(1, int(args.get('limit', 100))))
+        offset = max(0, int(args.get('offset', 0)))
+        after = _decode_cursor(args['cursor']) if args.get('cursor') else None
+        sort = args.get('sort') or '-timestamp'
+        if sort.lstrip('-') not in database.EXPERIMENT_COLUMNS:
+            raise ValueError(f"Unknown sort column '{sort.lstrip('-')}'")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        experiments = database.get_all_experiments_for_comparison()
-        return jsonify(experiments)
+        rows, total, last_key = database.query_experiments(fields, conditions, since, until, ids, sort,
+                                                           limit, offset, after)
+        return jsonify({'experiments': rows, 'total': total, 'limit': limit,
+                        'offset': None if after else offset, 'next_cursor': _encode_cursor(last_key)})
     except Exception as e:
         logger.error(f"Error fetching comparison data: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/curves', methods=['POST'])
+def api_curves():
+    """
+    Timeseries of several experiments for an overlay chart, each curve downsampled with
+    LTTB to `points` points. Body: {result_ids: [...], metrics: ['closure_pct', 'area_um2',
+    'area_px'], points: 500}. Ids without a stored timeseries are listed in 'missing'.
+    """
+    data = request.json or {}
+    result_ids = list(dict.fromkeys(str(rid) for rid in data.get('result_ids') or []))
+    if not result_ids:
+        return jsonify({'error': 'No result_ids provided'}), 400
+    if len(result_ids) > curves.MAX_EXPERIMENTS:
+        return jsonify({'error': f"At most {curves.MAX_EXPERIMENTS} experiments per request"}), 400
+    metrics = data.get('metrics') or ['closure_pct']
+    unknown = [m for m in metrics if m not in curves.CURVE_METRICS]
+    if unknown:
+        return jsonify({'error': f"Unknown metrics: {', '.join(map(str, unknown))}"}), 400
+    try:
+        points = min(curves.MAX_POINTS, max(curves.MIN_POINTS, int(data.get('points') or curves.DEFAULT_POINTS)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'points must be an integer'}), 400
+    return jsonify(curves.overlay(result_ids, metrics, points))
+
+
 # --- NEW: Delete Experiment Endpoint ---
 @app.route('/api/delete_experiment', methods=['POST'])
 def api_delete_experiment():
@@ -541,6 +761,11 @@ def api_delete_experiment():
     try:
         # 1. Delete from database
         db_deleted = database.delete_experiment(result_id)
+        db_deleted = database.delete_catalog_entry(result_id) or db_deleted
+        database.delete_cached_results(result_id=result_id)
+        analytics_store.remove([result_id])
+        if db_deleted:
+            stats_cache.refresh()
 
         # 2. Delete from file system
         # Sanitize the result_id to prevent path traversal
@@ -579,50 +804,39 @@ def api_delete_experiment():
 
 @app.route('/results_json/<path:exp_id>')
 def get_result_json(exp_id):
-    results = get_all_results()
-    target_result = next((res for res in results if res['id'] == exp_id), None)
+    target_result = get_result(exp_id)
     if not target_result:
         return jsonify({'error': 'Result not found'}), 404
 
     data = dict(target_result.get('raw_summary') or {})
 
     data['plot_url'] = target_result.get('plot_url')
-    data['plot_b64'] = None
-    if target_result.get('plot_path') and os.path.exists(target_result['plot_path']):
-        try:
-            with open(target_result['plot_path'], 'rb') as pf:
-                data['plot_b64'] = base64.b64encode(pf.read()).decode()
-        except Exception:
-            pass
-
     data['interactive_plot_url'] = target_result.get('interactive_plot_url')
     data['video_url'] = target_result.get('video_url')
     data['gallery_thumbs'] = target_result.get('gallery_thumbs', [])
     data['condition_name'] = target_result.get('condition_name')
     data['experiment_name'] = target_result.get('experiment_name')
+    data['csv_url'] = path_to_url_for_result(target_result.get('csv_path'), target_result.get('asset_version'))
+    # The figure itself is fetched from interactive_plot_url as its own (cached, precompressed) document
 
-    if target_result.get('csv_path') and os.path.exists(target_result['csv_path']):
-        try:
-            with open(target_result['csv_path'], 'r', encoding='utf-8') as cf:
-                data['csv_b64'] = base64.b64encode(cf.read().encode()).decode()
-            data['csv_url'] = path_to_url_for_result(target_result['csv_path'])
-        except Exception:
-            data['csv_b64'] = ""
-            data['csv_url'] = None
-    else:
-        data['csv_b64'] = ""
-        data['csv_url'] = None
+    return jsonify(data)
 
-    if target_result.get('interactive_plot_path') and os.path.exists(target_result['interactive_plot_path']):
-        try:
-            with open(target_result['interactive_plot_path'], 'r', encoding='utf-8') as f:
-                data['plot_json'] = f.read()
-        except Exception:
-            data['plot_json'] = None
-    else:
-        data['plot_json'] = None
 
-    return jsonify(data)
+@app.route('/plotly_template/<name>')
+def get_plotly_template(name):
+    """A named Plotly template for slim figures; immutable for a given ?v= (plotly version)."""
+    payload = figures.template_json(name)
+    if payload is None:
+        return jsonify({'error': 'Unknown template'}), 404
+    rv = Response(payload, mimetype='application/json')
+    rv.set_etag(f'{name}-{figures.TEMPLATE_VERSION}')
+    if request.args.get('v') == figures.TEMPLATE_VERSION:
+        rv.cache_control.public = True
+        rv.cache_control.max_age = result_files.IMMUTABLE_MAX_AGE
+        rv.cache_control.immutable = True
+    else:
+        rv.cache_control.no_cache = True
+    return rv.make_conditional(request)
 
 
 @app.route('/results_data/<path:filename>')
@@ -632,125 +846,73 @@ def send_result_file(filename):
     abs_path = os.path.abspath(os.path.join(base_dir, safe_rel))
     if not abs_path.startswith(base_dir):
         abort(404)
-    if not os.path.exists(abs_path):
+    # Run intermediates (preprocessed frames etc.) are private to re-analysis
+    if intermediates.CACHE_DIR in os.path.relpath(abs_path, base_dir).split(os.sep):
         abort(404)
-    rel_for_send = os.path.relpath(abs_path, base_dir)
-    return send_from_directory(base_dir, rel_for_send, as_attachment=False)
+    if not os.path.isfile(abs_path):
+        abort(404)
+    return result_files.send_result(abs_path, accept_encoding=request.headers.get('Accept-Encoding', ''),
+                                    versioned='v' in request.args)
 
 
 @app.route('/download-pdf/<path:exp_id>')
 def download_pdf(exp_id):
-    results = get_all_results()
-    result = next((res for res in results if res['id'] == exp_id), None)
+    """The experiment's PDF report, rendered once per summary version and then served from disk."""
+    result = get_result(exp_id)
     if not result:
         return jsonify({'error': 'Not found'}), 404
+    try:
+        pdf_path = reports.ensure_report(reports.report_info(result))
+    except Exception as e:
+        logger.error(f"Failed to render report for {exp_id}: {e}", exc_info=True)
+        return jsonify({'error': f'Could not render report: {e}'}), 500
+    return send_file(pdf_path, mimetype='application/pdf', download_name=f"{result['experiment_name']}_report.pdf",
+                     as_attachment=True, conditional=True)
 
-    data = result['raw_summary'] or {}
-    exp_name = result['experiment_name']
-    pdf_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
-    story = []
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
-                                 textColor=colors.HexColor('#008B8B'), spaceAfter=30, alignment=1)
-    h3_style = ParagraphStyle('CustomH3', parent=styles['Heading3'], fontSize=14, textColor=colors.HexColor('#333333'),
-                              spaceAfter=10, spaceBefore=10)
-    story.append(Paragraph(f'Wound Healing Analysis Report', title_style))
-    story.append(Paragraph(f'<b>Experiment:</b> {exp_name}', styles['Normal']))
-    story.append(Paragraph(f'<b>Condition:</b> {result.get("condition_name")}', styles['Normal']))
-    story.append(Spacer(1, 0.3 * inch))
-    story.append(Paragraph('Wound Area Analysis', h3_style))
-    time_50_val = data.get('time_to_50_closure_hr')
-    time_50_str = f"{time_50_val:.1f}" if time_50_val is not None else "N/A"
-    pixel_scale = data.get('pixel_scale_um_per_px', 1.0)
-    area_unit = "µm²" if pixel_scale != 1.0 else "pixels"
-    speed_unit = "µm²/hr" if pixel_scale != 1.0 else "px/hr"
-    initial_area_display = data.get('initial_area_um2', data.get('initial_area_px', 0))
-    final_area_display = data.get('final_area_um2', data.get('final_area_px', 0))
-    healing_rate_display = abs(data.get('healing_rate_um2_per_hr', data.get('healing_rate_mean_px_per_hr', 0)))
-    mean_area_display = np.mean(data.get('areas_um2', data.get('areas_px', [0])))
-    std_area_display = np.std(data.get('areas_um2', data.get('areas_px', [0])))
-    table_data = [
-        ['Metric', 'Value', 'Unit'],
-        ['Starting Wound Size', f"{initial_area_display:.0f}", area_unit],
-        ['Final Wound Size', f"{final_area_display:.0f}", area_unit],
-        ['Wound Closure', f"{data.get('final_closure_pct', 0):.1f}", '%'],
-        ['Healing Speed (Slope)', f"{healing_rate_display:.2f}", speed_unit],
-        ['Healing Consistency (R²)', f"{data.get('r_squared', 0):.3f}", ''],
-        ['Time to 50% Closure', time_50_str, 'hours'],
-        ['Mean Wound Area', f"{mean_area_display:.0f}", area_unit],
-        ['Area Variability (SD)', f"± {std_area_display:.0f}", area_unit],
-        ['Total Frames', f"{data.get('num_timepoints', 0)}", ''],
-    ]
-    style_commands = [('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#008B8B')),
-                      ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                      ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                      ('FONTSIZE', (0, 0), (-1, 0), 12), ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                      ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DDDDDD')),
-                      ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F4F4F4'), colors.white])]
-    cell_count = data.get('num_cells_tracked', data.get('num_cells', 0))
-    story.append(Table(table_data, colWidths=[2.5 * inch, 1.5 * inch, 1 * inch], style=style_commands))
-
-    if cell_count > 0:
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph('Cell Migration Analysis', h3_style))
-        mean_vel_val = data.get('mean_velocity_um_min', data.get('mean_velocity'))
-        mean_vel_str = f"{mean_vel_val:.2f}" if mean_vel_val is not None else "N/A"
-        mig_eff_val = data.get('migration_efficiency_mean', data.get('migration_efficiency'))
-        mig_eff_str = f"{mig_eff_val:.3f}" if mig_eff_val is not None else "N/A"
-        mean_disp_val = data.get('mean_displacement_um', data.get('mean_displacement'))
-        mean_disp_str = f"{mean_disp_val:.2f}" if mean_disp_val is not None else "N/A"
-        mean_path_val = data.get('mean_path_length_um', data.get('mean_path_length'))
-        mean_path_str = f"{mean_path_val:.2f}" if mean_path_val is not None else "N/A"
-        directionality_val = data.get('mean_directionality')
-        directionality_str = f"{directionality_val:.3f}" if directionality_val is not None else "N/A"
-
-        tracking_table_data = [
-            ['Metric', 'Value', 'Unit'],
-            ['Cells Tracked', f"{cell_count}", ''],
-            ['Mean Velocity', mean_vel_str, 'μm/min'],
-            ['Migration Efficiency', mig_eff_str, ''],
-            ['Mean Directionality', directionality_str, ''],
-            ['Mean Displacement', mean_disp_str, 'μm'],
-            ['Mean Path Length', mean_path_str, 'μm']
-        ]
-        tracking_style_commands = style_commands.copy()
-        tracking_style_commands[0] = ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078D4'))
-        story.append(
-            Table(tracking_table_data, colWidths=[2.5 * inch, 1.5 * inch, 1 * inch], style=tracking_style_commands))
-
-    story.append(PageBreak())
-    story.append(Paragraph('Analysis Plot', h3_style))
-    if result.get('plot_path') and os.path.exists(result['plot_path']):
-        try:
-            with open(result['plot_path'], 'rb') as pf:
-                plot_data = pf.read()
-            plot_img = RLImage(io.BytesIO(plot_data), width=6 * inch, height=4.5 * inch)
-            plot_img.hAlign = 'CENTER'
-            story.append(plot_img)
-        except Exception as e:
-            logger.warning(f"Error adding plot to PDF: {e}")
-    tracking_plot_file = data.get('trajectory_plot', data.get('trajectories_plot'))
-    if tracking_plot_file and os.path.exists(tracking_plot_file):
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph('Cell Trajectories', h3_style))
-        try:
-            with open(tracking_plot_file, 'rb') as f:
-                traj_data = f.read()
-            traj_img = RLImage(io.BytesIO(traj_data), width=6 * inch, height=4.5 * inch)
-            traj_img.hAlign = 'CENTER'
-            story.append(traj_img)
-        except Exception as e:
-            logger.warning(f"Error adding trajectory plot to PDF: {e}")
 
-    doc.build(story)
-    pdf_buffer.seek(0)
-    return send_file(pdf_buffer, mimetype='application/pdf', download_name=f'{exp_name}_report.pdf', as_attachment=True)
+@app.route('/api/reports/batch', methods=['POST'])
+def api_reports_batch():
+    """
+    PDF reports for several experiments in one ZIP. Body: {result_ids: [...]}.
+    Missing reports are rendered in parallel; cached ones are reused.
+    """
+    data = request.json or {}
+    result_ids = list(dict.fromkeys(data.get('result_ids') or []))
+    if not result_ids:
+        return jsonify({'error': 'No result_ids provided'}), 400
+    if len(result_ids) > app.config['REPORT_BATCH_MAX']:
+        return jsonify({'error': f"At most {app.config['REPORT_BATCH_MAX']} reports per batch"}), 400
+
+    results = [get_result(rid) for rid in result_ids]
+    missing = [rid for rid, r in zip(result_ids, results) if r is None]
+    if missing:
+        return jsonify({'error': 'Unknown result ids', 'missing': missing}), 404
+
+    infos = [reports.report_info(r) for r in results]
+    paths = reports.render_many(infos, timeout=app.config['REPORT_BATCH_TIMEOUT_SEC'])
+    failed = [info['id'] for info, path in zip(infos, paths) if path is None]
+    if len(failed) == len(infos):
+        return jsonify({'error': 'Could not render any report', 'failed': failed}), 500
+
+    archive = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    used_names = set()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:  # PDFs are already compressed
+        for info, path in zip(infos, paths):
+            if path is None:
+                continue
+            name = f"{secure_filename(info['experiment_name'] or '') or 'experiment'}_report.pdf"
+            if name in used_names:
+                name = f"{secure_filename(info['id'].replace('/', '_'))}_report.pdf"
+            used_names.add(name)
+            zf.write(path, name)
+        if failed:
+            zf.writestr('FAILED.txt', 'Reports could not be rendered for:\n' + '\n'.join(failed) + '\n')
+    archive.seek(0)
+    return send_file(archive, mimetype='application/zip', download_name='wound_healing_reports.zip',
+                     as_attachment=True)
 
 
 if __name__ == '__main__':
-    database.create_table()
-
     logger.info("\n" + "=" * 70)
     logger.info("🔬 WOUNDTRACK AI ANALYSIS SERVER (V4 - AUTO-SEGMENT)")
     logger.info("=" * 70)
@@ -18,27 +18,106 @@ logger = logging.getLogger(__name__)
 
 try:
     from preprocessing import load_and_preprocess_image, normalize_intensity
-    from segmentation import segment_wound_from_array, detect_wound_contours
+    from segmentation import (segment_wound_from_array, segment_wound_from_preprocessed,
+                              preprocess_for_segmentation, detect_wound_contours)
     from quantification import calculate_wound_closure_percentage
     import cell_tracking
+    import optical_flow
+    import intermediates
+    import figures
+    from video_utils import fps_for_interval, open_video_writer
 except ImportError as e:
     logger.error(f"Failed to import a required module: {e}")
     sys.exit(1)
 
 
+class AnalysisError(Exception):
+    """Raised when an experiment cannot be analyzed (e.g. too few readable frames)."""
+
+
+# Share of overall progress (percent) covered by each pipeline stage
+PROGRESS_STAGES = {
+    'ingest': (0, 5),
+    'setup': (5, 8),
+    'segmentation': (8, 50),
+    'tracking': (50, 70),
+    'gallery': (70, 80),
+    'video': (80, 90),
+    'saving': (90, 100),
+}
+
+
+def report_progress(progress, stage, fraction=0.0, message=None, **extra):
+    """
+    Send a structured progress event to the `progress` callback (if any):
+    {'stage', 'progress' (overall percent), 'message', **extra}.
+    """
+    if progress is None:
+        return
+    lo, hi = PROGRESS_STAGES[stage]
+    event = {'stage': stage, 'progress': lo + (hi - lo) * min(max(fraction, 0.0), 1.0), 'message': message}
+    event.update(extra)
+    try:
+        progress(event)
+    except Exception as e:
+        logger.warning(f"Progress callback failed: {e}")
+
+
+class FrameProgress:
+    """
+    Per-frame progress for one stage. Call it with (frames_done, total) after each frame;
+    it reports frame i/N, throughput in frames/s and the stage ETA via report_progress.
+    """
+
+    def __init__(self, progress, stage, label):
+        self.progress, self.stage, self.label = progress, stage, label
+        self.started = time.monotonic()
+
+    def __call__(self, done, total):
+        if self.progress is None:
+            return
+        elapsed = time.monotonic() - self.started
+        fps = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / fps if fps > 0 else None
+        report_progress(self.progress, self.stage, done / total if total else 1.0,
+                        f'{self.label}: frame {done}/{total}', frame=done, total_frames=total,
+                        fps=round(fps, 2), eta_sec=round(eta, 1) if eta is not None else None)
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Batch analysis of scratch assay images')
-    parser.add_argument('--input', '-i', type=str, required=True, help='Input directory')
+    parser.add_argument('--input', '-i', type=str, default=None, help='Input directory')
     parser.add_argument('--output', '-o', type=str, default='results', help='Output directory')
-    parser.add_argument('--disk-size', '-d', type=int, default=0, help='Disk size (0 = auto-select)')
-    parser.add_argument('--time-interval', '-t', type=float, default=0.25, help='Time interval (hours/frame)')
+    parser.add_argument('--reanalyze', type=str, default=None, metavar='OUTPUT_DIR',
+                        help='Re-run a previous analysis in OUTPUT_DIR with the given --time-interval, '
+                             '--pixel-scale and/or --disk-size, reusing its cached intermediates')
+    parser.add_argument('--disk-size', '-d', type=int, default=None, help='Disk size (0 = auto-select, default)')
+    parser.add_argument('--time-interval', '-t', type=float, default=None,
+                        help='Time interval (hours/frame, default 0.25)')
     parser.add_argument('--visualize', action='store_true', help='Generate plots')
     parser.add_argument('--track-cells', action='store_true', help='Run cell tracking')
     parser.add_argument('--save-masks', action='store_true', help='Save masks')
-    parser.add_argument('--pixel-scale', '-p', type=float, default=1.0, help='Pixel scale (e.g., 0.65 um/pixel)')
+    parser.add_argument('--pixel-scale', '-p', type=float, default=None,
+                        help='Pixel scale (e.g., 0.65 um/pixel, default 1.0)')
+    parser.add_argument('--front-band-um', type=float, default=0.0,
+                        help='Only track cells within this distance (um) of the wound front (0 = whole image)')
+    parser.add_argument('--migration-mode', choices=['tracking', 'flow'], default='tracking',
+                        help='Cell migration engine: per-cell tracking or dense optical flow (confluent monolayers)')
+    parser.add_argument('--flow-downsample', type=float, default=0.5,
+                        help='Resize factor applied to frames before computing optical flow')
+    parser.add_argument('--trajectory-format', choices=['npy', 'csv', 'both'], default='npy',
+                        help='Trajectory storage: binary .npy (memory-mappable), CSV export, or both')
+    parser.add_argument('--trajectory-video', action='store_true',
+                        help='Write a per-frame trajectory-tail overlay video (tracking mode)')
+    parser.add_argument('--workers', type=int, default=0, help='Parallel workers for optical flow (0 = CPU count)')
     parser.add_argument('--experiment-name', type=str, default=None,
                         help='Specific name for the experiment output files (Sample ID)')
-    return parser.parse_args()
+    parser.add_argument('--no-intermediates', action='store_true',
+                        help='Do not keep cache/ (preprocessed frames, areas) for later re-analysis')
+    args = parser.parse_args()
+    if not args.input and not args.reanalyze:
+        parser.error('one of --input or --reanalyze is required')
+    return args
 
 
 def get_image_files(input_dir):
@@ -132,12 +211,17 @@ def auto_select_disk_size(first_image_path, last_image_path, sizes_to_try=[7, 10
         return 10
 
 
-def process_timeseries(image_files, disk_size, time_interval, save_masks, output_dir, pixel_scale):
+def process_timeseries(image_files, disk_size, time_interval, save_masks, output_dir, pixel_scale, on_frame=None,
+                       frame_cache=None):
+    """
+    Segment every frame and compute the wound-area metrics.
+    frame_cache: optional intermediates.FrameStackWriter receiving each preprocessed frame.
+    """
     if not image_files:
         logger.warning("No images found to process.")
         return None
 
-    timepoints, areas_px, masks = [], [], []
+    frame_index, areas_px, masks = [], [], []
     logger.info(f"Processing {len(image_files)} images...")
     for idx, img_path in enumerate(tqdm(image_files, desc="Analyzing Frames")):
         try:
@@ -145,24 +229,45 @@ def process_timeseries(image_files, disk_size, time_interval, save_masks, output
             if image is None:
                 logger.warning(f"Could not read image {img_path}; skipping.")
                 continue
-            image_norm = normalize_intensity(image)
-            wound_mask, wound_area_px = segment_wound_from_array(image_norm, disk_size=disk_size)
-            timepoints.append(idx * time_interval)
+            preprocessed = preprocess_for_segmentation(normalize_intensity(image))
+            if frame_cache is not None:
+                frame_cache.add(idx, preprocessed)
+            wound_mask, wound_area_px = segment_wound_from_preprocessed(preprocessed, disk_size=disk_size)
+            frame_index.append(idx)
             areas_px.append(float(wound_area_px))
             masks.append(wound_mask) # <-- This is the WOUND MASK (gap)
             if save_masks:
-                mask_dir = os.path.join(output_dir, 'masks')
-                os.makedirs(mask_dir, exist_ok=True)
-                cv2.imwrite(os.path.join(mask_dir, f"mask_{idx:04d}.png"), (wound_mask * 255).astype(np.uint8))
+                save_mask(wound_mask, idx, output_dir)
         except Exception as e:
             logger.error(f"Error processing image {img_path}: {e}", exc_info=True)
             continue
+        finally:
+            if on_frame is not None:
+                on_frame(idx + 1, len(image_files))
 
     if len(areas_px) < 2:
         logger.error("Processing failed: Not enough images were successfully processed.")
         return None
 
+    results = compute_area_metrics(frame_index, areas_px, time_interval, pixel_scale)
+    results['masks'] = masks # <-- This is the list of wound_mask arrays
+    return results
+
+
+def save_mask(wound_mask, idx, output_dir):
+    mask_dir = os.path.join(output_dir, 'masks')
+    os.makedirs(mask_dir, exist_ok=True)
+    cv2.imwrite(os.path.join(mask_dir, f"mask_{idx:04d}.png"), (wound_mask * 255).astype(np.uint8))
+
+
+def compute_area_metrics(frame_index, areas_px, time_interval, pixel_scale):
+    """
+    Wound-area metrics from per-frame areas in px. frame_index holds the position of each
+    area in the input sequence (unreadable frames are skipped), so timepoints keep their gaps.
+    """
     logger.info("Calculating metrics...")
+    timepoints = [idx * time_interval for idx in frame_index]
+    areas_px = [float(a) for a in areas_px]
     areas_um2 = [a * (pixel_scale ** 2) for a in areas_px]
     initial_area_px, final_area_px = areas_px[0], areas_px[-1]
     initial_area_um2, final_area_um2 = areas_um2[0], areas_um2[-1]
@@ -205,7 +310,7 @@ def process_timeseries(image_files, disk_size, time_interval, save_masks, output
         'areas_px': areas_px,
         'areas_um2': areas_um2,
         'closure_percentages': closure_percentages,
-        'masks': masks, # <-- This is the list of wound_mask arrays
+        'frame_index': list(frame_index),
         'pixel_scale_um_per_px': float(pixel_scale),
         'initial_area_px': float(initial_area_px),
         'final_area_px': float(final_area_px),
@@ -224,12 +329,29 @@ def process_timeseries(image_files, disk_size, time_interval, save_masks, output
     }
 
 
-def run_cell_tracking(image_files, masks, time_interval, pixel_scale, output_dir):
+def run_cell_tracking(image_files, masks, time_interval, pixel_scale, output_dir, front_band_um=0.0,
+                      migration_mode='tracking', flow_downsample=0.5, workers=0, trajectory_format='npy',
+                      trajectory_video=False, on_frame=None):
     try:
         logger.info(f"🔬 Starting Cell Tracking (output to {output_dir})...")
         os.makedirs(output_dir, exist_ok=True)
+        front_band_px = front_band_um / pixel_scale if front_band_um and front_band_um > 0 else None
+        if migration_mode == 'flow':
+            logger.info(f"Using dense optical flow (downsample={flow_downsample})...")
+            tracking_results = optical_flow.flow_migration_in_timeseries(
+                image_files, masks, time_interval, pixel_scale, output_dir,
+                downsample=flow_downsample, front_band_px=front_band_px, workers=workers or None,
+                on_frame=on_frame)
+            logger.info("✓ Optical Flow Migration Analysis Complete")
+            return tracking_results
+        if front_band_px:
+            logger.info(f"Restricting detection to a {front_band_px:.1f} px band along the wound front.")
         # This call now correctly passes the image files and the WOUND masks
-        tracking_results = cell_tracking.track_cells_in_timeseries(image_files, masks, time_interval, pixel_scale, output_dir)
+        tracking_results = cell_tracking.track_cells_in_timeseries(image_files, masks, time_interval, pixel_scale,
+                                                                   output_dir, front_band_px=front_band_px,
+                                                                   trajectory_format=trajectory_format,
+                                                                   trajectory_video=trajectory_video,
+                                                                   on_frame=on_frame)
         logger.info("✓ Cell Tracking Complete")
         return tracking_results
     except Exception as e:
@@ -237,7 +359,7 @@ def run_cell_tracking(image_files, masks, time_interval, pixel_scale, output_dir
         return {}
 
 
-def create_overlay_gallery(image_files, masks, output_dir, experiment_name):
+def create_overlay_gallery(image_files, masks, output_dir, experiment_name, on_frame=None):
     """
     Create overlay images with wound contours drawn and save them into output_dir.
     Returns a list of created overlay file paths.
@@ -262,22 +384,26 @@ def create_overlay_gallery(image_files, masks, output_dir, experiment_name):
             overlay_paths.append(overlay_path)
         except Exception as e:
             logger.warning(f"Could not create overlay for frame {idx}: {e}", exc_info=True)
+        if on_frame is not None:
+            on_frame(idx + 1, min(len(image_files), len(masks)))
     return overlay_paths
 
 
-def create_animation(overlay_paths, output_dir, experiment_name, time_interval):
+def create_animation(overlay_paths, output_dir, experiment_name, time_interval, on_frame=None):
     if not overlay_paths:
         logger.warning("No overlay images found to create animation.")
         return None
     video_path = os.path.join(output_dir, f'{experiment_name}_analysis_video.mp4')
     # time_interval is hours/frame -> fps = frames per second; choose reasonable mapping:
-    fps = max(1, min(30, int(round(1.0 / max(time_interval, 1e-3)))))
+    fps = fps_for_interval(time_interval)
     logger.info(f"Creating MP4 animation at {video_path} (FPS={fps})...")
     try:
-        with imageio.get_writer(video_path, fps=fps, codec='libx264', quality=8) as writer:
-            for img_path in tqdm(overlay_paths, desc="Animating MP4"):
+        with open_video_writer(video_path, fps) as writer:
+            for idx, img_path in enumerate(tqdm(overlay_paths, desc="Animating MP4")):
                 frame = imageio.imread(img_path)
                 writer.append_data(frame)
+                if on_frame is not None:
+                    on_frame(idx + 1, len(overlay_paths))
         logger.info(f"✓ Animation saved: {video_path}")
         return video_path
     except Exception as e:
@@ -301,7 +427,8 @@ def save_results(results, output_dir, experiment_name):
     logger.info(f"Saved timeseries data to: {csv_path}")
 
     # Compose summary
-    summary = {k: v for k, v in results.items() if k not in ['masks', 'timepoints', 'areas_px', 'areas_um2', 'closure_percentages']}
+    summary = {k: v for k, v in results.items()
+               if k not in ['masks', 'frame_index', 'timepoints', 'areas_px', 'areas_um2', 'closure_percentages']}
     summary['experiment'] = experiment_name
     # merge tracking results if present
     summary.update(results.get('tracking_results', {}))
@@ -367,38 +494,39 @@ def create_interactive_plot(csv_path, output_json_path):
         fig.update_yaxes(title_text="Closure (%)", secondary_y=True, range=[0, 105])
         fig.update_xaxes(title_text="Time (hours)")
 
-        fig.write_json(output_json_path)
+        figures.write_slim_json(fig, output_json_path)  # template applied client-side
         logger.info(f"Saved interactive plot to: {output_json_path}")
     except Exception as e:
         logger.error(f"Failed to create interactive plot: {e}", exc_info=True)
 
 
-def main():
-    args = parse_arguments()
+def analyze_experiment(input_dir, output_dir, disk_size=0, time_interval=0.25, pixel_scale=1.0,
+                       experiment_name=None, visualize=True, track_cells=True, save_masks=False,
+                       front_band_um=0.0, migration_mode='tracking', flow_downsample=0.5, workers=0,
+                       trajectory_format='npy', trajectory_video=False, keep_intermediates=True, progress=None):
+    """
+    Run the full pipeline on one folder of frames and write csv/, plots/, gallery/,
+    video/ and tracking/ under output_dir.
+
+    keep_intermediates: also write cache/ (preprocessed frames, areas, run parameters)
+    so reanalyze_experiment can change parameters without starting over.
+    progress: optional callable receiving dict events (see report_progress).
+    Returns a dict with the summary ('results', without masks) and the written paths.
+    Raises AnalysisError if the experiment cannot be analyzed.
+    """
     start_time = time.time()
+    report_progress(progress, 'setup', 0.0, 'Reading input frames')
 
-    logger.info("=" * 70)
-    logger.info("🔬 WOUND HEALING BATCH ANALYSIS (REFACTORED & FIXED)")
-    logger.info("=" * 70)
-    logger.info(f"Input Directory: {args.input}")
-    logger.info(f"Output Directory: {args.output}")
-    logger.info(f"Disk Size: {'Auto-select' if args.disk_size == 0 else args.disk_size}")
-    logger.info(f"Time Interval: {args.time_interval} hours/frame")
-    logger.info(f"Pixel Scale: {args.pixel_scale} µm/px")
-    logger.info(f"Cell Tracking Enabled: {args.track_cells}")
-    logger.info("=" * 70)
-
-    image_files = get_image_files(args.input)
+    image_files = get_image_files(input_dir)
     if len(image_files) < 2:
-        logger.error(f"Not enough images found in {args.input} (found {len(image_files)}). Aborting.")
-        sys.exit(1)
+        raise AnalysisError(f"Not enough images found in {input_dir} (found {len(image_files)}).")
     logger.info(f"✓ Found {len(image_files)} images to analyze.")
 
-    csv_dir = os.path.join(args.output, 'csv')
-    plots_dir = os.path.join(args.output, 'plots')
-    gallery_dir = os.path.join(args.output, 'gallery')
-    video_dir = os.path.join(args.output, 'video')
-    tracking_dir = os.path.join(args.output, 'tracking')
+    csv_dir = os.path.join(output_dir, 'csv')
+    plots_dir = os.path.join(output_dir, 'plots')
+    gallery_dir = os.path.join(output_dir, 'gallery')
+    video_dir = os.path.join(output_dir, 'video')
+    tracking_dir = os.path.join(output_dir, 'tracking')
 
     os.makedirs(csv_dir, exist_ok=True)
     os.makedirs(plots_dir, exist_ok=True)
@@ -406,37 +534,303 @@ def main():
     os.makedirs(video_dir, exist_ok=True)
     os.makedirs(tracking_dir, exist_ok=True)
 
-    selected_disk_size = auto_select_disk_size(image_files[0], image_files[-1]) if args.disk_size == 0 else args.disk_size
+    if disk_size == 0:
+        report_progress(progress, 'setup', 0.5, 'Auto-selecting segmentation parameters')
+        selected_disk_size = auto_select_disk_size(image_files[0], image_files[-1])
+    else:
+        selected_disk_size = disk_size
     logger.info(f"Using Disk Size: {selected_disk_size}")
 
-    experiment_name = secure_filename(args.experiment_name) if args.experiment_name else os.path.basename(os.path.normpath(args.input))
+    experiment_name = secure_filename(experiment_name) if experiment_name else os.path.basename(os.path.normpath(input_dir))
     logger.info(f"Using Experiment Name: {experiment_name}")
 
-    results = process_timeseries(image_files, selected_disk_size, args.time_interval, args.save_masks, args.output, args.pixel_scale)
+    report_progress(progress, 'segmentation', 0.0, f'Processing {len(image_files)} frames (disk size {selected_disk_size})')
+    frame_cache = intermediates.FrameStackWriter(output_dir, len(image_files)) if keep_intermediates else None
+    results = process_timeseries(image_files, selected_disk_size, time_interval, save_masks, output_dir, pixel_scale,
+                                 on_frame=FrameProgress(progress, 'segmentation', 'Segmenting'),
+                                 frame_cache=frame_cache)
+    frames_cached = frame_cache.close() if frame_cache is not None else False
     if results is None:
-        logger.error("Time-series processing failed. Aborting.")
-        sys.exit(1)
+        raise AnalysisError("Time-series processing failed.")
+    if keep_intermediates:
+        intermediates.save_areas(output_dir, results['frame_index'], results['areas_px'],
+                                 cell_tracking.get_wound_centers(results['masks']))
 
-    if args.track_cells:
+    if track_cells:
+        report_progress(progress, 'tracking', 0.0, 'Measuring cell migration')
         # This now passes results['masks'] (the WOUND masks) to the tracking function
-        results['tracking_results'] = run_cell_tracking(image_files, results['masks'], args.time_interval, args.pixel_scale, tracking_dir)
-
-    overlay_paths = create_overlay_gallery(image_files, results['masks'], gallery_dir, experiment_name)
-    create_animation(overlay_paths, video_dir, experiment_name, args.time_interval)
+        results['tracking_results'] = run_cell_tracking(image_files, results['masks'], time_interval, pixel_scale,
+                                                        tracking_dir, front_band_um=front_band_um,
+                                                        migration_mode=migration_mode,
+                                                        flow_downsample=flow_downsample, workers=workers,
+                                                        trajectory_format=trajectory_format,
+                                                        trajectory_video=trajectory_video,
+                                                        on_frame=FrameProgress(progress, 'tracking', 'Tracking'))
+
+    report_progress(progress, 'gallery', 0.0, 'Creating overlay gallery')
+    overlay_paths = create_overlay_gallery(image_files, results['masks'], gallery_dir, experiment_name,
+                                           on_frame=FrameProgress(progress, 'gallery', 'Overlays'))
+    report_progress(progress, 'video', 0.0, 'Encoding video')
+    video_path = create_animation(overlay_paths, video_dir, experiment_name, time_interval,
+                                  on_frame=FrameProgress(progress, 'video', 'Encoding video'))
 
     processing_time = time.time() - start_time
     results['processing_time_sec'] = processing_time
 
+    report_progress(progress, 'saving', 0.0, 'Saving results and plots')
     csv_path, json_path = save_results(results, csv_dir, experiment_name)
     plot_path = create_visualization(results, plots_dir, experiment_name)
 
-    if args.visualize:
+    interactive_plot_path = None
+    if visualize:
+        interactive_plot_path = os.path.join(plots_dir, f'{experiment_name}_analysis_interactive.json')
+        create_interactive_plot(csv_path, interactive_plot_path)
+
+    if keep_intermediates:
+        intermediates.save_run_state(output_dir, {
+            'input_dir': os.path.abspath(input_dir),
+            'image_files': [os.path.abspath(p) for p in image_files],
+            'experiment_name': experiment_name,
+            'disk_size': int(selected_disk_size),
+            'time_interval': float(time_interval),
+            'pixel_scale': float(pixel_scale),
+            'visualize': bool(visualize),
+            'track_cells': bool(track_cells),
+            'save_masks': bool(save_masks),
+            'front_band_um': float(front_band_um or 0.0),
+            'migration_mode': migration_mode,
+            'flow_downsample': flow_downsample,
+            'workers': workers,
+            'trajectory_format': trajectory_format,
+            'trajectory_video': bool(trajectory_video),
+            'frames_cached': frames_cached,
+            'tracking_results': results.get('tracking_results', {}),
+            'video_path': video_path,
+        })
+
+    report_progress(progress, 'saving', 1.0, 'Analysis complete')
+    results.pop('masks', None)
+    return {
+        'experiment_name': experiment_name,
+        'output_dir': output_dir,
+        'results': results,
+        'csv_path': csv_path,
+        'summary_path': json_path,
+        'plot_path': plot_path,
+        'interactive_plot_path': interactive_plot_path,
+        'video_path': video_path,
+        'processing_time_sec': processing_time,
+    }
+
+
+def _resegment(state, output_dir, disk_size, on_frame=None):
+    """
+    Segment again at a new disk size. Starts from the cached preprocessed frames when the
+    run kept them, otherwise from the original image files.
+    Returns (frame_index, areas_px, masks).
+    """
+    frames = intermediates.load_frames(output_dir) if state.get('frames_cached') else None
+    if frames is None:
+        image_files = state['image_files']
+        if not all(os.path.exists(p) for p in image_files):
+            raise AnalysisError("The cached frames and the original images are no longer available; "
+                                "run a full analysis.")
+        logger.info("No cached frames; segmenting from the original images.")
+        results = process_timeseries(image_files, disk_size, state['time_interval'], state.get('save_masks'),
+                                     output_dir, state['pixel_scale'], on_frame=on_frame)
+        if results is None:
+            raise AnalysisError("Time-series processing failed.")
+        return results['frame_index'], results['areas_px'], results['masks']
+
+    frame_index, _, _ = intermediates.load_areas(output_dir)
+    areas_px, masks = [], []
+    for n, idx in enumerate(frame_index):
+        wound_mask, wound_area_px = segment_wound_from_preprocessed(np.array(frames[idx]), disk_size=disk_size)
+        areas_px.append(float(wound_area_px))
+        masks.append(wound_mask)
+        if state.get('save_masks'):
+            save_mask(wound_mask, idx, output_dir)
+        if on_frame is not None:
+            on_frame(n + 1, len(frame_index))
+    return frame_index, areas_px, masks
+
+
+def reanalyze_experiment(output_dir, time_interval=None, pixel_scale=None, disk_size=None, progress=None):
+    """
+    Re-run a finished analysis in output_dir with new parameters (None keeps the old value),
+    reusing the intermediates it kept instead of starting from the raw frames:
+
+    - time_interval / pixel_scale only: metrics are recomputed from the stored wound areas
+      and trajectories (flow metrics are converted); the video is re-encoded only if its
+      frame rate changes.
+    - disk_size: segmentation restarts from the cached normalized + blurred frames, then
+      tracking, gallery and video are redone since they depend on the wound masks.
+
+    A pixel-scale change also re-tracks when tracking was limited to a wound-front band
+    (the band width is given in um). Returns the same dict as analyze_experiment plus
+    'stages', the stages that were recomputed. Raises AnalysisError if output_dir has no
+    reusable intermediates.
+    """
+    start_time = time.time()
+    state = intermediates.load_run_state(output_dir)
+    if state is None:
+        raise AnalysisError(f"No reusable intermediates in {output_dir}; run a full analysis.")
+    report_progress(progress, 'setup', 0.0, 'Loading intermediates')
+
+    old_interval, old_scale, old_disk = state['time_interval'], state['pixel_scale'], state['disk_size']
+    time_interval = old_interval if time_interval is None else float(time_interval)
+    pixel_scale = old_scale if pixel_scale is None else float(pixel_scale)
+    disk_size = int(disk_size) if disk_size else old_disk
+    if time_interval <= 0 or pixel_scale <= 0:
+        raise AnalysisError("time_interval and pixel_scale must be positive.")
+
+    experiment_name = state['experiment_name']
+    image_files = state['image_files']
+    csv_dir = os.path.join(output_dir, 'csv')
+    plots_dir = os.path.join(output_dir, 'plots')
+    gallery_dir = os.path.join(output_dir, 'gallery')
+    video_dir = os.path.join(output_dir, 'video')
+    tracking_dir = os.path.join(output_dir, 'tracking')
+
+    resegment = disk_size != old_disk
+    retrack = state['track_cells'] and (resegment or (state['front_band_um'] > 0 and pixel_scale != old_scale))
+    rescale = time_interval != old_interval or pixel_scale != old_scale
+    stages = []
+
+    masks = None
+    if resegment or retrack:
+        report_progress(progress, 'segmentation', 0.0, f'Segmenting cached frames (disk size {disk_size})')
+        frame_index, areas_px, masks = _resegment(state, output_dir, disk_size,
+                                                  on_frame=FrameProgress(progress, 'segmentation', 'Segmenting'))
+        wound_centers = cell_tracking.get_wound_centers(masks)
+        intermediates.save_areas(output_dir, frame_index, areas_px, wound_centers)
+        stages.append('segmentation')
+    else:
+        frame_index, areas_px, wound_centers = intermediates.load_areas(output_dir)
+    results = compute_area_metrics(frame_index, areas_px, time_interval, pixel_scale)
+
+    tracking_results = state.get('tracking_results') or {}
+    if retrack:
+        report_progress(progress, 'tracking', 0.0, 'Measuring cell migration')
+        tracking_results = run_cell_tracking(image_files, masks, time_interval, pixel_scale, tracking_dir,
+                                             front_band_um=state['front_band_um'],
+                                             migration_mode=state['migration_mode'],
+                                             flow_downsample=state['flow_downsample'], workers=state['workers'],
+                                             trajectory_format=state['trajectory_format'],
+                                             trajectory_video=state['trajectory_video'],
+                                             on_frame=FrameProgress(progress, 'tracking', 'Tracking'))
+        stages.append('tracking')
+    elif state['track_cells'] and rescale and tracking_results:
+        report_progress(progress, 'tracking', 0.0, 'Rescaling migration metrics')
+        if tracking_results.get('migration_mode') == 'flow':
+            tracking_results = optical_flow.rescale_flow_metrics(tracking_results, time_interval, pixel_scale,
+                                                                 old_interval, old_scale)
+        else:
+            tracking_results = cell_tracking.rescale_tracking_results(
+                tracking_results, wound_centers, time_interval, pixel_scale, tracking_dir,
+                previous_time_interval=old_interval, image_files=image_files)
+        stages.append('tracking_metrics')
+    results['tracking_results'] = tracking_results
+
+    video_path = state.get('video_path')
+    if resegment:
+        report_progress(progress, 'gallery', 0.0, 'Creating overlay gallery')
+        overlay_paths = create_overlay_gallery(image_files, masks, gallery_dir, experiment_name,
+                                               on_frame=FrameProgress(progress, 'gallery', 'Overlays'))
+        stages.append('gallery')
+    else:
+        overlay_paths = sorted(glob.glob(os.path.join(gallery_dir, f'{experiment_name}_frame_*.jpg')))
+    if resegment or fps_for_interval(time_interval) != fps_for_interval(old_interval) \
+            or not (video_path and os.path.exists(video_path)):
+        report_progress(progress, 'video', 0.0, 'Encoding video')
+        video_path = create_animation(overlay_paths, video_dir, experiment_name, time_interval,
+                                      on_frame=FrameProgress(progress, 'video', 'Encoding video'))
+        stages.append('video')
+
+    processing_time = time.time() - start_time
+    results['processing_time_sec'] = processing_time
+
+    report_progress(progress, 'saving', 0.0, 'Saving results and plots')
+    csv_path, json_path = save_results(results, csv_dir, experiment_name)
+    plot_path = create_visualization(results, plots_dir, experiment_name)
+    interactive_plot_path = None
+    if state.get('visualize', True):
         interactive_plot_path = os.path.join(plots_dir, f'{experiment_name}_analysis_interactive.json')
         create_interactive_plot(csv_path, interactive_plot_path)
 
+    state.update({'disk_size': disk_size, 'time_interval': time_interval, 'pixel_scale': pixel_scale,
+                  'tracking_results': tracking_results, 'video_path': video_path})
+    intermediates.save_run_state(output_dir, state)
+    logger.info(f"Re-analysis of {experiment_name} recomputed: {', '.join(stages) or 'metrics only'} "
+                f"({processing_time:.2f}s)")
+
+    report_progress(progress, 'saving', 1.0, 'Re-analysis complete')
+    return {
+        'experiment_name': experiment_name,
+        'output_dir': output_dir,
+        'results': results,
+        'csv_path': csv_path,
+        'summary_path': json_path,
+        'plot_path': plot_path,
+        'interactive_plot_path': interactive_plot_path,
+        'video_path': video_path,
+        'processing_time_sec': processing_time,
+        'stages': stages,
+    }
+
+
+def main():
+    args = parse_arguments()
+
+    if args.reanalyze:
+        try:
+            outcome = reanalyze_experiment(args.reanalyze, time_interval=args.time_interval,
+                                           pixel_scale=args.pixel_scale, disk_size=args.disk_size)
+        except AnalysisError as e:
+            logger.error(f"{e} Aborting.")
+            sys.exit(1)
+        results = outcome['results']
+        logger.info(f"✅ Re-analysis complete in {outcome['processing_time_sec']:.3f} seconds "
+                    f"(recomputed: {', '.join(outcome['stages']) or 'metrics only'})")
+        logger.info(f"Final Closure: {results['final_closure_pct']:.1f}%")
+        logger.info(f"Healing Speed: {abs(results['healing_rate_um2_per_hr']):.2f} µm²/hr")
+        return
+
+    args.disk_size = args.disk_size if args.disk_size is not None else 0
+    args.time_interval = args.time_interval if args.time_interval is not None else 0.25
+    args.pixel_scale = args.pixel_scale if args.pixel_scale is not None else 1.0
+
+    logger.info("=" * 70)
+    logger.info("🔬 WOUND HEALING BATCH ANALYSIS (REFACTORED & FIXED)")
+    logger.info("=" * 70)
+    logger.info(f"Input Directory: {args.input}")
+    logger.info(f"Output Directory: {args.output}")
+    logger.info(f"Disk Size: {'Auto-select' if args.disk_size == 0 else args.disk_size}")
+    logger.info(f"Time Interval: {args.time_interval} hours/frame")
+    logger.info(f"Pixel Scale: {args.pixel_scale} µm/px")
+    logger.info(f"Cell Tracking Enabled: {args.track_cells} (mode: {args.migration_mode})")
+    if args.front_band_um > 0:
+        logger.info(f"Wound-Front Band: {args.front_band_um} µm")
+    logger.info("=" * 70)
+
+    try:
+        outcome = analyze_experiment(args.input, args.output, disk_size=args.disk_size,
+                                     time_interval=args.time_interval, pixel_scale=args.pixel_scale,
+                                     experiment_name=args.experiment_name, visualize=args.visualize,
+                                     track_cells=args.track_cells, save_masks=args.save_masks,
+                                     front_band_um=args.front_band_um, migration_mode=args.migration_mode,
+                                     flow_downsample=args.flow_downsample, workers=args.workers,
+                                     trajectory_format=args.trajectory_format,
+                                     trajectory_video=args.trajectory_video,
+                                     keep_intermediates=not args.no_intermediates)
+    except AnalysisError as e:
+        logger.error(f"{e} Aborting.")
+        sys.exit(1)
+    results = outcome['results']
+
     logger.info("=" * 70)
     logger.info("✅ ANALYSIS COMPLETE!")
-    logger.info(f"Total processing time: {processing_time:.2f} seconds")
+    logger.info(f"Total processing time: {outcome['processing_time_sec']:.2f} seconds")
     logger.info(f"Results saved in: {args.output}")
     logger.info("-" * 20)
     logger.info(f"Final Closure: {results['final_closure_pct']:.1f}%")
@@ -454,9 +848,15 @@ def main():
         logger.info(f"Mean Velocity: {tr.get('mean_velocity_um_min', 0):.2f} μm/min")
         logger.info(f"Migration Efficiency: {tr.get('migration_efficiency_mean', 0):.3f}")
         logger.info(f"Mean Directionality: {tr.get('mean_directionality', 0):.3f}") # NEW
+    elif results.get('tracking_results', {}).get('migration_mode') == 'flow':
+        tr = results['tracking_results']
+        logger.info(f"Mean Flow Speed: {tr.get('mean_velocity_um_min', 0):.2f} μm/min")
+        logger.info(f"Front Velocity: {tr.get('front_velocity_um_min', 0):.2f} μm/min")
+        logger.info(f"Flow Coherence: {tr.get('migration_efficiency_mean', 0):.3f}")
+        logger.info(f"Mean Directionality: {tr.get('mean_directionality', 0):.3f}")
 
     logger.info("=" * 70)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -4,21 +4,22 @@ Robust cell_tracking module.
 
 - Primary strategy: try trackpy (if available) for good detection/linking.
 - Fallback: connected-components + Hungarian matching linking for dense fields.
-- Outputs trajectories.csv, velocities.csv, trajectories_plot.png into output_dir.
+- Outputs trajectories.npy (and/or .csv), velocities.csv, kinematics.csv, msd.csv,
+  trajectories_plot.png into output_dir.
 - Returns a dictionary with keys expected by the rest of the pipeline.
 - NEW: Calculates Directionality (mean cosine similarity to wound center).
+- Optional wound-front band: detection limited to cells within a distance of the wound edge.
 """
 import os
 import math
 import csv
 import numpy as np
 import cv2
-import matplotlib
-
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from scipy.optimize import linear_sum_assignment
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+
+import kinematics
+from video_utils import fps_for_interval, open_video_writer
 
 # Optional trackpy usage
 try:
@@ -212,6 +213,68 @@ def trackpy_linking_wrapper(frames_centroids, search_range=15, memory=3):
         raise
 
 
+# ---------- Columnar track layout ----------
+def tracks_to_columns(tracks: Dict[int, List[tuple]]) -> Dict[str, np.ndarray]:
+    """
+    Flatten {tid: [(frame, x, y), ...]} into typed column arrays sorted by track then frame.
+    """
+    tids = sorted(tracks.keys())
+    lengths = np.array([len(tracks[t]) for t in tids], dtype=np.int64)
+    if lengths.sum() == 0:
+        return {'track_id': np.zeros(0, dtype=np.int32), 'frame': np.zeros(0, dtype=np.int32),
+                'x_px': np.zeros(0, dtype=np.float32), 'y_px': np.zeros(0, dtype=np.float32)}
+    pts = np.array([p for t in tids for p in tracks[t]], dtype=np.float64)
+    return {
+        'track_id': np.repeat(np.array(tids, dtype=np.int32), lengths),
+        'frame': pts[:, 0].astype(np.int32),
+        'x_px': pts[:, 1].astype(np.float32),
+        'y_px': pts[:, 2].astype(np.float32),
+    }
+
+
+# ---------- Trajectory storage ----------
+TRAJECTORY_DTYPE = np.dtype([('track_id', '<i4'), ('frame', '<i4'), ('x_px', '<f4'), ('y_px', '<f4')])
+TRAJECTORY_FORMATS = ('npy', 'csv', 'both')
+
+
+def save_trajectories(columns: Dict[str, np.ndarray], output_dir: str, fmt: str = 'npy') -> Dict[str, Optional[str]]:
+    """
+    Write trajectory columns in one bulk call per format.
+    'npy' -> trajectories.npy (structured array, memory-mappable), 'csv' -> trajectories.csv.
+    Returns {'trajectories_npy': path|None, 'trajectories_csv': path|None}.
+    """
+    if fmt not in TRAJECTORY_FORMATS:
+        raise ValueError(f"Unknown trajectory format: {fmt}")
+    paths = {'trajectories_npy': None, 'trajectories_csv': None}
+    if fmt in ('npy', 'both'):
+        records = np.empty(len(columns['track_id']), dtype=TRAJECTORY_DTYPE)
+        for name in TRAJECTORY_DTYPE.names:
+            records[name] = columns[name]
+        paths['trajectories_npy'] = os.path.join(output_dir, 'trajectories.npy')
+        np.save(paths['trajectories_npy'], records)
+    if fmt in ('csv', 'both'):
+        import pandas as pd
+        paths['trajectories_csv'] = os.path.join(output_dir, 'trajectories.csv')
+        pd.DataFrame({name: columns[name] for name in TRAJECTORY_DTYPE.names}).to_csv(
+            paths['trajectories_csv'], index=False)
+    return paths
+
+
+def load_trajectories(path: str, mmap: bool = True) -> np.ndarray:
+    """
+    Load trajectories as a structured array with fields track_id, frame, x_px, y_px.
+    .npy files are memory-mapped (zero-copy) by default; .csv files are parsed.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r' if mmap else None)
+    import pandas as pd
+    df = pd.read_csv(path)
+    records = np.empty(len(df), dtype=TRAJECTORY_DTYPE)
+    for name in TRAJECTORY_DTYPE.names:
+        records[name] = df[name].to_numpy()
+    return records
+
+
 # ---------- Compute velocities & metrics ----------
 def compute_tracking_metrics(tracks: Dict[int, List[tuple]],
                              wound_centers: List[Optional[tuple]],
@@ -220,9 +283,8 @@ def compute_tracking_metrics(tracks: Dict[int, List[tuple]],
     """
     tracks: {tid: [(frame, x, y), ...]}
     wound_centers: list of (cx, cy) for each frame
-    returns dict with metrics and rows for csv
+    returns dict with metrics
     """
-    traj_rows = []
     speeds = []
     efficiencies = []
     displacements = []
@@ -238,10 +300,6 @@ def compute_tracking_metrics(tracks: Dict[int, List[tuple]],
         end_pt = pts[-1]
         start_frame = start_pt[0]
 
-        # record traj rows
-        for fr, x, y in pts:
-            traj_rows.append([tid, fr, x, y])
-
         # compute stepwise distances (um) and velocities (um/min)
         prev_x, prev_y = start_pt[1], start_pt[2]
         total_path = 0.0
@@ -313,64 +371,266 @@ def compute_tracking_metrics(tracks: Dict[int, List[tuple]],
         'mean_directionality': mean_directionality,  # NEW
         'mean_displacement_um': mean_displacement,
         'mean_path_length_um': mean_path_length,
-        'trajectories_rows': traj_rows
     }
 
 
-# ---------- Visualization ----------
-def save_trajectories_plot(tracks: Dict[int, List[tuple]], img_path: str, out_path: str, max_tracks: int = 100):
-    # create canvas from first image if possible
+# ---------- Cell detection (optionally restricted to the wound-front band) ----------
+def compute_front_band(wound_mask_u8: np.ndarray, front_band_px: float):
+    """
+    Given a binary wound mask (0/1), return (band_mask, bbox) where band_mask marks
+    the cell-covered pixels lying within front_band_px of the wound front and bbox is
+    its (x, y, w, h) bounding box. Returns (None, None) if the band is empty.
+    """
+    cell_area_mask = 1 - wound_mask_u8
+    # Distance of every cell-area pixel to the nearest wound pixel
+    dist = cv2.distanceTransform(cell_area_mask, cv2.DIST_L2, 3)
+    band = ((cell_area_mask > 0) & (dist <= front_band_px)).astype(np.uint8)
+    if not band.any():
+        return None, None
+    return band, cv2.boundingRect(band)
+
+
+def detect_cells_in_frame(img: np.ndarray, wound_mask: Optional[np.ndarray],
+                          front_band_px: Optional[float] = None):
+    """
+    Detect cell centroids in a grayscale frame outside the wound gap.
+    If front_band_px is given, detection is limited to the band of that width along
+    the wound front and thresholding runs only on the band's bounding box.
+    Returns list of (cx, cy, area_px) in full-frame coordinates.
+    """
+    if wound_mask is None:
+        # If no mask, try to detect on whole image (less ideal)
+        wound_mask_u8 = np.zeros_like(img, dtype=np.uint8)
+    else:
+        # Ensure mask is 0/1
+        wound_mask_u8 = (wound_mask > 0).astype(np.uint8)
+
+    x0, y0 = 0, 0
+    if front_band_px and front_band_px > 0 and wound_mask_u8.any():
+        cell_area_mask, bbox = compute_front_band(wound_mask_u8, front_band_px)
+        if cell_area_mask is None:
+            return []
+        x0, y0, w, h = bbox
+        img = img[y0:y0 + h, x0:x0 + w]
+        cell_area_mask = np.ascontiguousarray(cell_area_mask[y0:y0 + h, x0:x0 + w])
+    else:
+        # Create cell mask (inverse of wound mask)
+        cell_area_mask = 1 - wound_mask_u8
+
+    # Apply cell mask to image
+    cell_img = cv2.bitwise_and(img, img, mask=cell_area_mask)
+
+    # Detect cells in this area
+    # Using thresholding + connected components is a good substitute for blob detection
+    # Apply Gaussian blur to reduce noise before thresholding
+    blurred_img = cv2.GaussianBlur(cell_img, (5, 5), 0)
+
+    _, thresh = cv2.threshold(blurred_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Apply mask again in case threshold bleeds
+    thresh = cv2.bitwise_and(thresh, thresh, mask=cell_area_mask)
+
+    # Find components (cells)
+    nlabels, labels, stats, centroids = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+
+    centers = []
+    for j in range(1, nlabels):  # Skip background
+        area = int(stats[j, cv2.CC_STAT_AREA])
+        if area >= 4 and area < 500:  # Filter noise and huge blobs
+            cx, cy = float(centroids[j][0]) + x0, float(centroids[j][1]) + y0
+            centers.append((cx, cy, area))
+    return centers
+
+
+# ---------- Fast OpenCV trajectory rendering ----------
+TRAJECTORY_LUT = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(-1, 1), cv2.COLORMAP_HSV).reshape(256, 3)
+_LINE_SHIFT = 4  # sub-pixel fixed-point bits for cv2.polylines
+
+
+def _track_segments(track_ids: np.ndarray, xs: np.ndarray, ys: np.ndarray):
+    """
+    Split columnar points (sorted by track) into per-track fixed-point polylines.
+    Returns (list of (N,1,2) int32 arrays, LUT colour index per polyline).
+    """
+    if len(track_ids) == 0:
+        return [], np.zeros(0, dtype=np.int64)
+    bounds = np.flatnonzero(np.diff(track_ids)) + 1
+    pts = np.round(np.stack([xs, ys], axis=1) * (1 << _LINE_SHIFT)).astype(np.int32).reshape(-1, 1, 2)
+    starts = np.concatenate(([0], bounds))
+    # Spread neighbouring ids across the LUT so adjacent tracks get distinct colours
+    colour_idx = (track_ids[starts].astype(np.int64) * 97) % 256
+    return np.split(pts, bounds), colour_idx
+
+
+def draw_trajectories(canvas: np.ndarray, track_ids: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                      thickness: int = 1) -> np.ndarray:
+    """
+    Draw every track onto a BGR canvas in place with one cv2.polylines call per LUT colour.
+    """
+    polylines, colour_idx = _track_segments(track_ids, xs, ys)
+    if not polylines:
+        return canvas
+    for c in np.unique(colour_idx):
+        group = [polylines[i] for i in np.flatnonzero(colour_idx == c)]
+        colour = tuple(int(v) for v in TRAJECTORY_LUT[c])
+        cv2.polylines(canvas, group, False, colour, thickness, cv2.LINE_AA, _LINE_SHIFT)
+    return canvas
+
+
+def _load_canvas(img_path: Optional[str], columns: Dict[str, np.ndarray]) -> np.ndarray:
+    canvas = cv2.imread(img_path) if img_path and os.path.exists(img_path) else None
+    if canvas is None:
+        w = int(np.ceil(columns['x_px'].max())) + 1 if len(columns['x_px']) else 1
+        h = int(np.ceil(columns['y_px'].max())) + 1 if len(columns['y_px']) else 1
+        canvas = np.zeros((h, w, 3), dtype=np.uint8)
+    elif len(canvas.shape) == 2 or canvas.shape[2] == 1:
+        canvas = cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR)
+    return canvas
+
+
+def save_trajectories_overlay(columns: Dict[str, np.ndarray], img_path: Optional[str], out_path: str):
+    """
+    Render all tracks over the first frame with cv2.polylines and write a PNG.
+    """
     try:
-        canvas = None
-        if img_path and os.path.exists(img_path):
-            canvas = cv2.imread(img_path)
-            if canvas is not None:
-                if len(canvas.shape) == 2 or canvas.shape[2] == 1:
-                    canvas = cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR)
-                canvas_rgb = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB)
-            else:
-                canvas_rgb = None
-        else:
-            canvas_rgb = None
+        canvas = _load_canvas(img_path, columns)
+        draw_trajectories(canvas, columns['track_id'], columns['x_px'], columns['y_px'])
+        n_tracks = len(np.unique(columns['track_id']))
+        cv2.putText(canvas, f'Trajectories (n={n_tracks})', (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                    (255, 255, 255), 2, cv2.LINE_AA)
+        return out_path if cv2.imwrite(out_path, canvas) else None
+    except Exception:
+        return None
 
-        fig, ax = plt.subplots(figsize=(8, 6))
-        if canvas_rgb is not None:
-            ax.imshow(canvas_rgb)
-            ax.set_xlim(0, canvas_rgb.shape[1])
-            ax.set_ylim(canvas_rgb.shape[0], 0)
-        else:
-            ax.set_facecolor('black')
-
-        keys = list(tracks.keys())
-        if len(keys) > max_tracks:
-            keys = list(np.random.choice(keys, max_tracks, replace=False))
-
-        cmap = plt.get_cmap('tab20')
-        for i, tid in enumerate(keys):
-            pts = tracks[tid]
-            xs = [p[1] for p in pts]
-            ys = [p[2] for p in pts]
-            ax.plot(xs, ys, '-o', linewidth=1.2, markersize=3, color=cmap(i % 20), alpha=0.8)
-        ax.set_title(f'Trajectories (n={len(keys)})')
-        ax.axis('off')
-        plt.tight_layout()
-        plt.savefig(out_path, dpi=150, bbox_inches='tight')
-        plt.close(fig)
+
+def write_trajectory_video(columns: Dict[str, np.ndarray], image_files: List[str], out_path: str,
+                           fps: int, tail: int = 10):
+    """
+    Write an MP4 where each frame shows the last `tail` frames of every track over that frame.
+    Uses the same encoder settings as the analysis video.
+    """
+    # Frame-sorted copy so each window is one contiguous slice
+    by_frame = np.argsort(columns['frame'], kind='stable')
+    frames = columns['frame'][by_frame]
+    track_ids, xs, ys = (columns[k][by_frame] for k in ('track_id', 'x_px', 'y_px'))
+    try:
+        with open_video_writer(out_path, fps) as writer:
+            for t, img_path in enumerate(image_files):
+                canvas = _load_canvas(img_path, columns)
+                lo, hi = np.searchsorted(frames, [t - tail, t + 1])
+                # Back to track order (frames stay ascending within a track) for polylines
+                sel = lo + np.argsort(track_ids[lo:hi], kind='stable')
+                draw_trajectories(canvas, track_ids[sel], xs[sel], ys[sel], thickness=2)
+                writer.append_data(cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB))
         return out_path
-    except Exception:
+    except Exception as e:
+        print(f"Failed to write trajectory video: {e}")
         return None
 
 
 # ---------- Main entrypoint ----------
+def summarize_tracks(tracks: Dict[int, List[tuple]], track_columns: Dict[str, np.ndarray],
+                     wound_centers: List[Optional[tuple]], time_interval: float, pixel_scale: float,
+                     output_dir: str) -> Dict[str, Any]:
+    """
+    Physical-unit metrics of linked tracks: writes velocities.csv, kinematics.csv and msd.csv
+    into output_dir and returns the summary keys of track_cells_in_timeseries.
+    """
+    metrics = compute_tracking_metrics(tracks, wound_centers,
+                                       time_interval_hours=time_interval,
+                                       pixel_scale_um_per_px=pixel_scale)
+
+    # Compute velocities CSV (per-track summary)
+    vel_csv = os.path.join(output_dir, 'velocities.csv')
+    with open(vel_csv, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['num_cells_tracked', 'mean_velocity_um_min', 'migration_efficiency_mean', 'mean_directionality',
+                    'mean_displacement_um', 'mean_path_length_um'])
+        w.writerow([
+            metrics['num_cells_tracked'],
+            metrics['mean_velocity_um_min'],
+            metrics['migration_efficiency_mean'],
+            metrics['mean_directionality'],  # NEW
+            metrics['mean_displacement_um'],
+            metrics['mean_path_length_um']
+        ])
+
+    # Per-track kinematics (FFT MSD, persistence time, diffusion exponent)
+    kin = kinematics.compute_track_kinematics(track_columns, time_interval, pixel_scale)
+    kin_paths = kinematics.save_kinematics(kin, output_dir)
+
+    return {
+        'num_cells_tracked': int(metrics['num_cells_tracked']),
+        'mean_velocity_um_min': float(metrics['mean_velocity_um_min']),
+        'migration_efficiency_mean': float(metrics['migration_efficiency_mean']),
+        'mean_directionality': float(metrics['mean_directionality']),  # NEW
+        'mean_displacement_um': float(metrics['mean_displacement_um']),
+        'mean_path_length_um': float(metrics['mean_path_length_um']),
+        'msd_alpha': kin['msd_alpha'],
+        'mean_persistence_time_min': kin['mean_persistence_time_min'],
+        'kinematics_csv': kin_paths['kinematics_csv'],
+        'msd_csv': kin_paths['msd_csv'],
+    }
+
+
+def columns_to_tracks(records) -> Dict[int, List[tuple]]:
+    """
+    Inverse of tracks_to_columns for a trajectory table sorted by track then frame
+    (as written by save_trajectories): {tid: [(frame, x, y), ...]}.
+    """
+    tids = np.asarray(records['track_id'])
+    if len(tids) == 0:
+        return {}
+    frames = np.asarray(records['frame']).tolist()
+    xs = np.asarray(records['x_px'], dtype=np.float64).tolist()
+    ys = np.asarray(records['y_px'], dtype=np.float64).tolist()
+    starts = np.flatnonzero(np.r_[True, tids[1:] != tids[:-1]])
+    ends = np.r_[starts[1:], len(tids)]
+    return {int(tids[a]): list(zip(frames[a:b], xs[a:b], ys[a:b])) for a, b in zip(starts, ends)}
+
+
+def rescale_tracking_results(previous: Dict[str, Any], wound_centers: List[Optional[tuple]],
+                             time_interval: float, pixel_scale: float, output_dir: str,
+                             previous_time_interval: Optional[float] = None,
+                             image_files: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Recompute the tracking summary for a new time interval / pixel scale from the stored
+    trajectories, without detecting or linking cells again. `previous` is the summary the
+    original run returned; plots keep their paths (they are drawn in pixels). The
+    trajectory video is re-encoded only if its playback rate changes.
+    """
+    traj_path = previous.get('trajectories_npy') or previous.get('trajectories_csv')
+    if not previous.get('num_cells_tracked') or not traj_path or not os.path.exists(traj_path):
+        return dict(previous)
+    records = load_trajectories(traj_path, mmap=False)
+    track_columns = {name: records[name] for name in TRAJECTORY_DTYPE.names}
+    tracks = columns_to_tracks(track_columns)
+
+    result = dict(previous)
+    result.update(summarize_tracks(tracks, track_columns, wound_centers, time_interval, pixel_scale, output_dir))
+
+    video = previous.get('trajectories_video')
+    fps = fps_for_interval(time_interval)
+    if video and image_files and (previous_time_interval is None or fps != fps_for_interval(previous_time_interval)):
+        result['trajectories_video'] = write_trajectory_video(track_columns, image_files, video, fps=fps)
+    return result
+
+
 def track_cells_in_timeseries(image_files: List[str], masks: List[Any],
                               time_interval: float, pixel_scale: float,
-                              output_dir: str):
+                              output_dir: str, front_band_px: Optional[float] = None,
+                              trajectory_format: str = 'npy', trajectory_video: bool = False,
+                              on_frame: Optional[Callable[[int, int], None]] = None):
     """
     image_files: list of image file paths (may be used for plotting)
     masks: list of numpy arrays (wound gap masks)
     time_interval: hours per frame
     pixel_scale: um per pixel
     output_dir: directory to write tracking outputs
+    front_band_px: if set, only detect cells within this distance (px) of the wound front
+    trajectory_format: 'npy' (binary, memory-mappable), 'csv' or 'both'
+    trajectory_video: also write trajectories_video.mp4 with per-frame trajectory tails
+    on_frame: optional callback(frames_done, total) called as cell detection advances
     """
     os.makedirs(output_dir, exist_ok=True)
 
@@ -380,7 +640,8 @@ def track_cells_in_timeseries(image_files: List[str], masks: List[Any],
 
     # 2. Detect cell centroids from *image_files*.
     #    We need a new detection function that uses the *image* not a mask.
-    #    Let's use a simple blob detector on the *inverse* of the wound.
+    #    Let's use a simple blob detector on the *inverse* of the wound,
+    #    optionally restricted to a band along the wound front.
 
     frames_centroids = []
     for i, img_path in enumerate(image_files):
@@ -391,46 +652,14 @@ def track_cells_in_timeseries(image_files: List[str], masks: List[Any],
                 continue
 
             wound_mask = masks[i] if i < len(masks) else None
-            if wound_mask is None:
-                # If no mask, try to detect on whole image (less ideal)
-                wound_mask_u8 = np.zeros_like(img, dtype=np.uint8)
-            else:
-                # Ensure mask is correct format
-                if wound_mask.dtype != np.uint8:
-                    wound_mask_u8 = (wound_mask > 0).astype(np.uint8)
-                else:
-                    wound_mask_u8 = wound_mask
-
-            # Create cell mask (inverse of wound mask)
-            cell_area_mask = 1 - wound_mask_u8  # Invert
-
-            # Apply cell mask to image
-            cell_img = cv2.bitwise_and(img, img, mask=cell_area_mask)
-
-            # Detect cells in this area
-            # Using thresholding + connected components is a good substitute for blob detection
-            # Apply Gaussian blur to reduce noise before thresholding
-            blurred_img = cv2.GaussianBlur(cell_img, (5, 5), 0)
-
-            _, thresh = cv2.threshold(blurred_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-            # Apply mask again in case threshold bleeds
-            thresh = cv2.bitwise_and(thresh, thresh, mask=cell_area_mask)
-
-            # Find components (cells)
-            nlabels, labels, stats, centroids = cv2.connectedComponentsWithStats(thresh, connectivity=8)
-
-            centers = []
-            for j in range(1, nlabels):  # Skip background
-                area = int(stats[j, cv2.CC_STAT_AREA])
-                if area >= 4 and area < 500:  # Filter noise and huge blobs
-                    cx, cy = float(centroids[j][0]), float(centroids[j][1])
-                    centers.append((cx, cy, area))
-            frames_centroids.append(centers)
+            frames_centroids.append(detect_cells_in_frame(img, wound_mask, front_band_px=front_band_px))
 
         except Exception as e:
             print(f"Error detecting cells in frame {i}: {e}")
             frames_centroids.append([])
+        finally:
+            if on_frame is not None:
+                on_frame(i + 1, len(image_files))
 
     total_positions = sum(len(f) for f in frames_centroids)
     if total_positions == 0:
@@ -449,48 +678,31 @@ def track_cells_in_timeseries(image_files: List[str], masks: List[Any],
     if not tracks:
         tracks = link_centroids_hungarian(frames_centroids, max_disp_px=20.0, memory=2)
 
-    # Compute metrics, NOW passing wound_centers
-    metrics = compute_tracking_metrics(tracks, wound_centers,
-                                       time_interval_hours=time_interval,
-                                       pixel_scale_um_per_px=pixel_scale)
+    # Save trajectories (binary columnar by default, CSV optional)
+    track_columns = tracks_to_columns(tracks)
+    traj_paths = save_trajectories(track_columns, output_dir, fmt=trajectory_format)
 
-    # Save trajectories CSV
-    traj_csv = os.path.join(output_dir, 'trajectories.csv')
-    with open(traj_csv, 'w', newline='') as f:
-        w = csv.writer(f)
-        w.writerow(['track_id', 'frame', 'x_px', 'y_px'])
-        for row in metrics.get('trajectories_rows', []):
-            w.writerow(row)
-
-    # Compute velocities CSV (per-track summary)
-    vel_csv = os.path.join(output_dir, 'velocities.csv')
-    with open(vel_csv, 'w', newline='') as f:
-        w = csv.writer(f)
-        w.writerow(['num_cells_tracked', 'mean_velocity_um_min', 'migration_efficiency_mean', 'mean_directionality',
-                    'mean_displacement_um', 'mean_path_length_um'])
-        w.writerow([
-            metrics['num_cells_tracked'],
-            metrics['mean_velocity_um_min'],
-            metrics['migration_efficiency_mean'],
-            metrics['mean_directionality'],  # NEW
-            metrics['mean_displacement_um'],
-            metrics['mean_path_length_um']
-        ])
+    # Metrics (NOW passing wound_centers), velocities CSV and kinematics
+    summary = summarize_tracks(tracks, track_columns, wound_centers, time_interval, pixel_scale, output_dir)
 
     # Save trajectory plot (overlay on first image if available)
     traj_png = os.path.join(output_dir, 'trajectories_plot.png')
-    plot_res = save_trajectories_plot(tracks, image_files[0] if image_files else None, traj_png)
+    plot_res = save_trajectories_overlay(track_columns, image_files[0] if image_files else None, traj_png)
     if not plot_res:
         traj_png = None
 
+    traj_video = None
+    if trajectory_video and image_files:
+        traj_video = write_trajectory_video(track_columns, image_files,
+                                            os.path.join(output_dir, 'trajectories_video.mp4'),
+                                            fps=fps_for_interval(time_interval))
+
     # Return all metrics
-    return {
-        'num_cells_tracked': int(metrics['num_cells_tracked']),
-        'mean_velocity_um_min': float(metrics['mean_velocity_um_min']),
-        'migration_efficiency_mean': float(metrics['migration_efficiency_mean']),
-        'mean_directionality': float(metrics['mean_directionality']),  # NEW
-        'mean_displacement_um': float(metrics['mean_displacement_um']),
-        'mean_path_length_um': float(metrics['mean_path_length_um']),
-        'trajectories_csv': traj_csv,
+    summary.update({
+        'trajectories_npy': traj_paths['trajectories_npy'],
+        'trajectories_csv': traj_paths['trajectories_csv'],
         'trajectories_plot': traj_png,
-    }
\ No newline at end of file
+        'trajectories_video': traj_video,
+        'front_band_px': float(front_band_px) if front_band_px else None,
+    })
+    return summary
\ No newline at end of file
@@ -13,6 +13,57 @@ class Config:
 
     # Define database file path
     DATABASE_URL = os.path.join(DB_FOLDER, 'analysis.db')  # --- NEW ---
+    DB_BUSY_TIMEOUT_SEC = float(os.environ.get('DB_BUSY_TIMEOUT_SEC') or 30)  # wait this long for a write lock
+
+    # Chunked uploads: each PUT is one chunk (well under MAX_CONTENT_LENGTH)
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE') or 50 * 1024 ** 3)
+
+    # Result cache keyed by (input hash, pipeline version, parameters)
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', '1') != '0'
+    RESULT_CACHE_POLICY = os.environ.get('RESULT_CACHE_POLICY', 'lru')  # 'lru', 'lfu' or 'fifo'
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES') or 5000)
+    RESULT_CACHE_MAX_AGE_DAYS = float(os.environ.get('RESULT_CACHE_MAX_AGE_DAYS') or 180)
+    # Cached preprocessed frames (cache/frames.npy) of older runs are deleted by
+    # `python result_cache.py --prune-frames`; 0 keeps them
+    INTERMEDIATE_FRAMES_MAX_AGE_DAYS = float(os.environ.get('INTERMEDIATE_FRAMES_MAX_AGE_DAYS') or 30)
+
+    # Write .gz/.br copies of result JSON/CSV for clients that accept them
+    PRECOMPRESS_RESULTS = os.environ.get('PRECOMPRESS_RESULTS', '1') != '0'
+
+    # PDF reports: rendered in a separate process pool and cached per summary version
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS') or min(4, os.cpu_count() or 1))
+    REPORT_BATCH_MAX = 200
+    REPORT_BATCH_TIMEOUT_SEC = 600
+
+    # Statistics tab: pairwise condition comparisons
+    PVALUE_CORRECTION = os.environ.get('PVALUE_CORRECTION', 'holm')  # 'holm', 'fdr_bh', 'bonferroni' or 'none'
+    PERMUTATION_RESAMPLES = int(os.environ.get('PERMUTATION_RESAMPLES') or 2000)
+    # Permutation test limits: larger pairs are left to Welch/Mann-Whitney; resamples x values budget
+    PERMUTATION_MAX_PAIR_SIZE = int(os.environ.get('PERMUTATION_MAX_PAIR_SIZE') or 200)
+    PERMUTATION_MAX_WORK = int(os.environ.get('PERMUTATION_MAX_WORK') or 20_000_000)
+
+    # Results tree importer (results_catalog.py): summary-parsing processes, entries per transaction
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS') or os.cpu_count() or 1)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 500)
+
+    # Parquet analytics store (analytics_store.py; needs pyarrow): appended by finished runs and imports
+    ANALYTICS_FOLDER = os.environ.get('ANALYTICS_FOLDER') or 'analytics'
+    ANALYTICS_STORE = os.environ.get('ANALYTICS_STORE', '1') != '0'
+
+    # Curve overlays: decoded timeseries kept per app process (experiments)
+    CURVE_CACHE_ENTRIES = int(os.environ.get('CURVE_CACHE_ENTRIES') or 500)
+
+    # Analysis job queue: jobs running at once across all app processes
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+    JOB_HEARTBEAT_SEC = 10
+    JOB_STALE_SEC = 60  # a running job without a heartbeat for this long is re-queued
+    JOB_MAX_ATTEMPTS = 3
+    # Progress streams of jobs running in this process are pushed (job_queue.notify); the
+    # job's process re-reads its row this often to pick up writes from worker processes
+    JOB_EVENTS_POLL_SEC = 0.5
+    JOB_EVENTS_REMOTE_POLL_SEC = 2.0  # streams of jobs queued or running in another process poll
+    JOB_EVENTS_KEEPALIVE_SEC = 15
 
     # Ensure all directories exist
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
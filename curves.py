@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+curves.py
+
+Wound area / closure curves of many experiments for overlay charts, read from the
+`timeseries` table and downsampled on the server with Largest-Triangle-Three-Buckets
+(LTTB) to a per-curve point budget.
+
+LTTB keeps the first and last points and, from each of budget-2 equal buckets in
+between, the point forming the largest triangle with the previously kept point and the
+mean of the next bucket, which preserves peaks and the overall shape far better than
+striding. The selection is sequential within a curve, so lttb_many() runs the bucket
+loop once for all curves at the same time (padded bucket matrices), making the cost
+O(budget) Python iterations regardless of how many experiments are overlaid.
+
+Decoded series are kept in a per-process LRU (Config.CURVE_CACHE_ENTRIES experiments)
+that is dropped whenever the `timeseries` table's generation changes.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CURVE_METRICS = ('closure_pct', 'area_px', 'area_um2')
+# Decimals kept in the JSON payload per field
+FIELD_DECIMALS = {'time_hr': 4, 'closure_pct': 3, 'area_px': 1, 'area_um2': 1}
+DEFAULT_POINTS = 500
+MIN_POINTS = 3
+MAX_POINTS = 5000
+MAX_EXPERIMENTS = 500
+
+
+def _bucket_bounds(n: int, n_out: int) -> np.ndarray:
+    """Start index of each of the n_out-2 LTTB buckets over points 1..n-2, plus the end (n-1)."""
+    every = (n - 2) / (n_out - 2)
+    return np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+
+
+def lttb_many(series: Sequence[Tuple[np.ndarray, np.ndarray]], n_out: int) -> List[np.ndarray]:
+    """
+    LTTB for several (x, y) curves at once. Returns, per curve, the sorted indices of the
+    kept points (all indices when the curve has at most n_out points). x must be sorted.
+    """
+    n_out = max(MIN_POINTS, int(n_out))
+    result = [np.arange(len(x)) for x, _ in series]
+    todo = [k for k, (x, _) in enumerate(series) if len(x) > n_out]
+    if not todo:
+        return result
+
+    n_buckets = n_out - 2
+    offsets, xs, ys, bounds = [], [], [], []
+    offset = 0
+    for k in todo:
+        x, y = series[k]
+        offsets.append(offset)
+        xs.append(np.asarray(x, dtype=np.float64))
+        ys.append(np.asarray(y, dtype=np.float64))
+        bounds.append(_bucket_bounds(len(x), n_out))
+        offset += len(x)
+    x_all, y_all = np.concatenate(xs), np.concatenate(ys)
+    offsets = np.array(offsets)
+    # Global bucket starts/ends, shape (E, n_buckets)
+    starts = np.stack([b[:-1] for b in bounds]) + offsets[:, None]
+    ends = np.stack([b[1:] for b in bounds]) + offsets[:, None]
+
+    # Mean of each bucket from prefix sums; the "next bucket" of the last bucket is the
+    # curve's last point
+    cum_x = np.concatenate([[0.0], np.cumsum(x_all)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y_all)])
+    counts = ends - starts
+    mean_x = (cum_x[ends] - cum_x[starts]) / counts
+    mean_y = (cum_y[ends] - cum_y[starts]) / counts
+    final = ends[:, -1]  # index of each curve's last point
+    next_x = np.concatenate([mean_x[:, 1:], x_all[final][:, None]], axis=1)
+    next_y = np.concatenate([mean_y[:, 1:], y_all[final][:, None]], axis=1)
+
+    width = int(counts.max())
+    lanes = np.arange(width)
+    chosen = np.empty((len(todo), n_buckets), dtype=np.int64)
+    a = offsets.copy()  # previously kept point (the first point to start with)
+    for i in range(n_buckets):
+        idx = starts[:, i:i + 1] + lanes
+        valid = idx < ends[:, i:i + 1]
+        idx = np.where(valid, idx, starts[:, i:i + 1])
+        ax, ay = x_all[a][:, None], y_all[a][:, None]
+        area = np.abs((ax - next_x[:, i:i + 1]) * (y_all[idx] - ay) - (ax - x_all[idx]) * (next_y[:, i:i + 1] - ay))
+        area[~valid] = -1.0
+        a = idx[np.arange(len(todo)), np.argmax(area, axis=1)]
+        chosen[:, i] = a
+
+    for row, k in enumerate(todo):
+        local = chosen[row] - offsets[row]
+        result[k] = np.concatenate([[0], local, [len(series[k][0]) - 1]])
+    return result
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the points LTTB keeps from one curve."""
+    return lttb_many([(x, y)], n_out)[0]
+
+
+_cache: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+_cache_generation = None
+_cache_lock = threading.Lock()
+
+
+def load_series(result_ids: Sequence[str]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Timeseries (time_hr and CURVE_METRICS) of the given experiments, through the LRU."""
+    global _cache_generation
+    generation = database.get_table_generation('timeseries')
+    if generation < 0:  # generation unavailable: do not cache
+        return database.get_timeseries(result_ids, ('time_hr',) + CURVE_METRICS)
+    found = {}
+    with _cache_lock:
+        if generation != _cache_generation:
+            _cache.clear()
+            _cache_generation = generation
+        for rid in result_ids:
+            if rid in _cache:
+                _cache.move_to_end(rid)
+                found[rid] = _cache[rid]
+    missing = [rid for rid in result_ids if rid not in found]
+    if missing:
+        fetched = database.get_timeseries(missing, ('time_hr',) + CURVE_METRICS)
+        found.update(fetched)
+        with _cache_lock:
+            # A write while fetching moves the generation on, so these are not kept stale
+            if generation == _cache_generation:
+                _cache.update(fetched)
+                while len(_cache) > Config.CURVE_CACHE_ENTRIES:
+                    _cache.popitem(last=False)
+    return found
+
+
+def _rounded(values: np.ndarray, field: str) -> list:
+    return np.round(values, FIELD_DECIMALS.get(field, 6)).tolist()
+
+
+def overlay(result_ids: Sequence[str], metrics: Sequence[str] = ('closure_pct',),
+            points: int = DEFAULT_POINTS) -> Dict:
+    """
+    Downsampled curves of several experiments, columnar per curve:
+    {'x': 'time_hr', 'points': budget, 'series': [{'id', 'experiment_name', 'condition_name',
+    'n': frames, metric: {'x': [...], 'y': [...]}, ...}], 'missing': [ids without a timeseries]}.
+    """
+    metrics = [m for m in metrics if m in CURVE_METRICS]
+    data = load_series(list(dict.fromkeys(result_ids)))
+    names = {row['id']: row for row in database.query_experiments(
+        ['experiment_name', 'condition_name'], ids=list(data), limit=max(1, len(data)))[0]} if data else {}
+
+    ordered = [rid for rid in dict.fromkeys(result_ids) if rid in data]
+    series = []
+    for rid in ordered:
+        meta = names.get(rid, {})
+        series.append({'id': rid, 'experiment_name': meta.get('experiment_name', rid),
+                       'condition_name': meta.get('condition_name'), 'n': int(len(data[rid]['time_hr']))})
+    for metric in metrics:
+        curves = []
+        for rid in ordered:
+            t, y = data[rid]['time_hr'], data[rid][metric]
+            keep = ~(np.isnan(t) | np.isnan(y))
+            curves.append((t[keep], y[keep]))
+        for entry, (t, y), idx in zip(series, curves, lttb_many(curves, points)):
+            entry[metric] = {'x': _rounded(t[idx], 'time_hr'), 'y': _rounded(y[idx], metric)}
+    return {'x': 'time_hr', 'points': points, 'series': series,
+            'missing': [rid for rid in dict.fromkeys(result_ids) if rid not in data]}
@@ -1,28 +1,208 @@
 """
 Database module for handling SQLite operations.
 """
+import os
 import sqlite3
 import logging
+import itertools
+import json
+import threading
+import time
 import pandas as pd
 import numpy as np
-from scipy import stats
-from itertools import combinations
 from config import Config
+import significance
 
 logger = logging.getLogger(__name__)
 DATABASE_URL = Config.DATABASE_URL
 
+class PooledConnection(sqlite3.Connection):
+    """
+    A connection kept open for reuse by the thread that opened it. close() hands it back:
+    any transaction left open is rolled back and per-use settings are reset, so callers
+    keep the usual connect / try / finally close pattern.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+
+    def close(self):
+        self.checkouts = max(0, self.checkouts - 1)
+        if self.checkouts:  # still in use by an outer caller on this thread
+            return
+        if self.in_transaction:
+            self.rollback()
+        self.isolation_level = ''
+        self.row_factory = sqlite3.Row
+
+    def discard(self):
+        super().close()
+
+
+_local = threading.local()
+
+
+def _open_connection() -> PooledConnection:
+    conn = sqlite3.connect(DATABASE_URL, timeout=Config.DB_BUSY_TIMEOUT_SEC, factory=PooledConnection)
+    conn.row_factory = sqlite3.Row  # Allows accessing columns by name
+    # WAL lets readers run alongside a writer; NORMAL is durable across app crashes in WAL mode
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT_SEC * 1000)}")
+    return conn
+
+
 def create_connection():
-    """Create a database connection to the SQLite database."""
-    conn = None
-    try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row # Allows accessing columns by name
-        return conn
-    except sqlite3.Error as e:
-        logger.error(f"Error connecting to database: {e}")
+    """
+    The calling thread's connection to the SQLite database, opened on first use. Callers
+    close() it when done, which returns it for reuse rather than closing it.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():  # none yet, or inherited across a fork
+        try:
+            conn = _open_connection()
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to database: {e}")
+            return None
+        _local.conn, _local.pid = conn, os.getpid()
+    conn.checkouts += 1
     return conn
 
+
+def close_thread_connection():
+    """Really close the calling thread's connection (e.g. before the thread exits)."""
+    conn = getattr(_local, 'conn', None)
+    _local.conn = None
+    if conn is not None and _local.pid == os.getpid():
+        conn.discard()
+
+def _add_missing_columns(cursor, table: str, columns: dict):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row['name'] for row in cursor.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+
+def _migrate_experiment_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_experiments_condition ON experiments (condition_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_experiments_timestamp ON experiments (timestamp)")
+
+
+def _migrate_series_tables(cursor):
+    # Per-frame wound area and per-track kinematics of each experiment, clustered by
+    # experiment id so one experiment (or a list of them) is a single index range scan
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS timeseries (
+        experiment_id TEXT NOT NULL,
+        frame INTEGER NOT NULL,
+        time_hr REAL,
+        area_px REAL,
+        area_um2 REAL,
+        closure_pct REAL,
+        PRIMARY KEY (experiment_id, frame)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS tracks (
+        experiment_id TEXT NOT NULL,
+        track_id INTEGER NOT NULL,
+        n_points INTEGER,
+        start_frame INTEGER,
+        end_frame INTEGER,
+        duration_min REAL,
+        path_length_um REAL,
+        net_displacement_um REAL,
+        mean_speed_um_min REAL,
+        straightness REAL,
+        persistence_time_min REAL,
+        diffusion_exponent REAL,
+        diffusion_coeff_um2_min REAL,
+        points BLOB,
+        PRIMARY KEY (experiment_id, track_id)
+    ) WITHOUT ROWID
+    """)
+
+
+def _migrate_packed_timeseries(cursor):
+    # One row per experiment holding its whole series packed (see TIMESERIES_COLUMNS);
+    # per-frame rows cost a Python tuple per frame on every read
+    cursor.execute("""
+    CREATE TABLE timeseries_packed (
+        experiment_id TEXT PRIMARY KEY,
+        n_frames INTEGER NOT NULL,
+        data BLOB NOT NULL
+    )
+    """)
+    rows = cursor.connection.execute(f"SELECT experiment_id, {', '.join(TIMESERIES_COLUMNS)} FROM timeseries "
+                                     f"ORDER BY experiment_id, frame")
+    for result_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        group = [tuple(row)[1:] for row in group]
+        cursor.execute("INSERT INTO timeseries_packed (experiment_id, n_frames, data) VALUES (?, ?, ?)",
+                       (result_id, len(group), _pack_timeseries(group)))
+    cursor.execute("DROP TABLE timeseries")
+    cursor.execute("ALTER TABLE timeseries_packed RENAME TO timeseries")
+
+
+def _migrate_added_columns(cursor):
+    # Columns added after these tables first shipped (fresh databases already have them)
+    _add_missing_columns(cursor, 'jobs', {'detail_json': 'TEXT'})
+    _add_missing_columns(cursor, 'uploads', {'content_sha256': 'TEXT', 'source_upload_id': 'TEXT'})
+
+
+def _migrate_lookup_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_mtime ON results_catalog (summary_mtime DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_condition ON results_catalog (condition, summary_mtime DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_content ON uploads (content_sha256)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_result ON result_cache (result_id)")
+
+
+def _migrate_condition_stats(cursor):
+    # Databases from before condition_stats existed: aggregate the experiments already there
+    _rebuild_condition_stats(cursor)
+    _bump_generation(cursor, 'experiments')
+
+
+def _migrate_persistence_censored(cursor):
+    # 1 where the track's direction autocorrelation never dropped below 1/e (persistence
+    # time NaN because it exceeds the track), 0 otherwise, NULL for older imports
+    _add_missing_columns(cursor, 'tracks', {'persistence_censored': 'INTEGER'})
+
+
+# Schema migrations as (version, function(cursor)), applied in order to a database whose
+# PRAGMA user_version is lower. Append new steps; never edit or reorder shipped ones.
+MIGRATIONS = (
+    (1, _migrate_experiment_indexes),
+    (2, _migrate_series_tables),
+    (3, _migrate_packed_timeseries),
+    (4, _migrate_added_columns),
+    (5, _migrate_lookup_indexes),
+    (6, _migrate_condition_stats),
+    (7, _migrate_persistence_censored),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _migrate_schema(cursor):
+    """Apply pending MIGRATIONS in one transaction (safe when several processes start at once)."""
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("PRAGMA user_version")
+        current = cursor.fetchone()[0]
+        for version, step in MIGRATIONS:
+            if version > current:
+                step(cursor)
+                logger.info(f"Applied database migration {version} ({step.__name__})")
+        if SCHEMA_VERSION > current:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        cursor.execute("COMMIT")
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK")
+        raise
+
+
 def create_table():
     """Create the experiments table if it doesn't exist."""
     sql_create_table = """
@@ -41,27 +221,189 @@ def create_table():
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     );
     """
+    sql_create_catalog = """
+    CREATE TABLE IF NOT EXISTS results_catalog (
+        id TEXT PRIMARY KEY,
+        experiment_name TEXT,
+        condition TEXT,
+        summary_path TEXT,
+        rel_summary_path TEXT,
+        summary_json TEXT,
+        csv_path TEXT,
+        plot_path TEXT,
+        interactive_plot_path TEXT,
+        video_path TEXT,
+        gallery_json TEXT,
+        num_timepoints INTEGER,
+        processing_time_sec REAL,
+        summary_mtime REAL,
+        summary_size INTEGER,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    sql_create_jobs = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        progress REAL DEFAULT 0,
+        message TEXT,
+        params_json TEXT,
+        result_id TEXT,
+        error TEXT,
+        worker TEXT,
+        attempts INTEGER DEFAULT 0,
+        created_at REAL,
+        started_at REAL,
+        finished_at REAL,
+        heartbeat_at REAL,
+        detail_json TEXT
+    );
+    """
+    sql_create_uploads = """
+    CREATE TABLE IF NOT EXISTS uploads (
+        id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT,
+        frame_interval INTEGER DEFAULT 5,
+        status TEXT NOT NULL DEFAULT 'uploading',
+        error TEXT,
+        created_at REAL,
+        updated_at REAL,
+        content_sha256 TEXT,
+        source_upload_id TEXT
+    );
+    """
+    sql_create_result_cache = """
+    CREATE TABLE IF NOT EXISTS result_cache (
+        cache_key TEXT PRIMARY KEY,
+        input_sha256 TEXT NOT NULL,
+        pipeline_version TEXT NOT NULL,
+        params_json TEXT,
+        result_id TEXT NOT NULL,
+        size_bytes INTEGER DEFAULT 0,
+        hits INTEGER DEFAULT 0,
+        created_at REAL,
+        last_hit_at REAL
+    );
+    """
+    sql_create_generations = """
+    CREATE TABLE IF NOT EXISTS table_generations (
+        name TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL DEFAULT 0
+    );
+    """
+    sql_create_materialized = """
+    CREATE TABLE IF NOT EXISTS materialized_stats (
+        name TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL,
+        payload_json TEXT,
+        built_at REAL
+    );
+    """
+    sql_create_condition_stats = """
+    CREATE TABLE IF NOT EXISTS condition_stats (
+        condition_name TEXT PRIMARY KEY,
+        closure_n INTEGER NOT NULL DEFAULT 0,
+        closure_mean REAL NOT NULL DEFAULT 0,
+        closure_m2 REAL NOT NULL DEFAULT 0,
+        healing_n INTEGER NOT NULL DEFAULT 0,
+        healing_mean REAL NOT NULL DEFAULT 0,
+        healing_m2 REAL NOT NULL DEFAULT 0,
+        r2_n INTEGER NOT NULL DEFAULT 0,
+        r2_mean REAL NOT NULL DEFAULT 0,
+        r2_m2 REAL NOT NULL DEFAULT 0
+    );
+    """
     conn = create_connection()
     if conn is not None:
         try:
             c = conn.cursor()
             c.execute(sql_create_table)
+            c.execute(sql_create_catalog)
+            c.execute(sql_create_jobs)
+            c.execute(sql_create_uploads)
+            c.execute(sql_create_result_cache)
+            c.execute(sql_create_generations)
+            c.execute(sql_create_materialized)
+            c.execute(sql_create_condition_stats)
             conn.commit()
-            logger.info("Database table 'experiments' is ready.")
+            _migrate_schema(c)  # columns, indexes and backfills added since (see MIGRATIONS)
+            logger.info("Database tables 'experiments', 'results_catalog', 'jobs', 'uploads', 'result_cache', "
+                        "'materialized_stats' and 'condition_stats' are ready.")
         except sqlite3.Error as e:
             logger.error(f"Error creating table: {e}")
         finally:
             conn.close()
 
-def upsert_experiment(summary_data: dict, result_id: str):
+def _bump_generation(cursor, table: str):
+    """Advance a table's generation; call inside the transaction that modified the table."""
+    cursor.execute("""
+        INSERT INTO table_generations (name, generation) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+    """, (table,))
+
+
+def get_table_generation(table: str = 'experiments') -> int:
     """
-    Insert or update an experiment's results in the database.
-    'result_id' is the unique identifier (e.g., 'uploads/uuid' or 'DA3_Control/CIL_43406')
+    Generation counter of a table, bumped by every write to it. Anything derived from
+    the table and tagged with this number is current while the number is unchanged.
     """
     conn = create_connection()
+    if conn is None:
+        return -1
+    try:
+        c = conn.cursor()
+        c.execute("SELECT generation FROM table_generations WHERE name = ?", (table,))
+        row = c.fetchone()
+        return row['generation'] if row else 0
+    except sqlite3.Error as e:
+        logger.error(f"Error reading generation of '{table}': {e}")
+        return -1
+    finally:
+        conn.close()
+
+
+def get_materialized_stats(name: str):
+    """Returns (generation, payload) of a materialized result, or None."""
+    conn = create_connection()
+    if conn is None:
+        return None
+    try:
+        c = conn.cursor()
+        c.execute("SELECT generation, payload_json FROM materialized_stats WHERE name = ?", (name,))
+        row = c.fetchone()
+        return (row['generation'], json.loads(row['payload_json'])) if row else None
+    except (sqlite3.Error, ValueError) as e:
+        logger.error(f"Error reading materialized stats '{name}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def put_materialized_stats(name: str, generation: int, payload: dict):
+    """Store a materialized result unless a newer generation is already stored."""
+    conn = create_connection()
     if conn is None:
         return
+    try:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO materialized_stats (name, generation, payload_json, built_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET generation = excluded.generation,
+                payload_json = excluded.payload_json, built_at = excluded.built_at
+            WHERE excluded.generation >= materialized_stats.generation
+        """, (name, generation, json.dumps(payload), time.time()))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error storing materialized stats '{name}': {e}")
+    finally:
+        conn.close()
 
+
+def _write_experiment(cursor, summary_data: dict, result_id: str):
+    """Insert or replace one experiments row and keep condition_stats in step (no commit)."""
     sql = """
     INSERT OR REPLACE INTO experiments (
         id, experiment_name, condition_name, final_closure_pct,
@@ -70,29 +412,55 @@ def upsert_experiment(summary_data: dict, result_id: str):
         mean_directionality
     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
+    # Extract data, using .get() to provide defaults (None) if key is missing
+    data_tuple = (
+        result_id,
+        summary_data.get('experiment_name'),
+        summary_data.get('condition_name'),
+        summary_data.get('final_closure_pct'),
+        summary_data.get('healing_rate_um2_per_hr'),
+        summary_data.get('r_squared'),
+        summary_data.get('time_to_50_closure_hr'),
+        summary_data.get('num_cells_tracked'),
+        summary_data.get('mean_velocity_um_min'),
+        summary_data.get('migration_efficiency_mean'),
+        summary_data.get('mean_directionality')
+    )
+    # A replaced row leaves its condition's aggregates before the new one enters
+    _condition_stats_remove(cursor, result_id)
+    cursor.execute(sql, data_tuple)
+    _condition_stats_update(cursor, summary_data.get('condition_name'),
+                            {column: summary_data.get(column) for column in CONDITION_STATS_METRICS}, +1)
 
-    try:
-        # Extract data, using .get() to provide defaults (None) if key is missing
-        data_tuple = (
-            result_id,
-            summary_data.get('experiment_name'),
-            summary_data.get('condition_name'),
-            summary_data.get('final_closure_pct'),
-            summary_data.get('healing_rate_um2_per_hr'),
-            summary_data.get('r_squared'),
-            summary_data.get('time_to_50_closure_hr'),
-            summary_data.get('num_cells_tracked'),
-            summary_data.get('mean_velocity_um_min'),
-            summary_data.get('migration_efficiency_mean'),
-            summary_data.get('mean_directionality')
-        )
 
+def _remove_experiment(cursor, result_id: str) -> bool:
+    """Delete one experiments row and take it out of condition_stats (no commit)."""
+    _condition_stats_remove(cursor, result_id)
+    cursor.execute("DELETE FROM experiments WHERE id = ?", (result_id,))
+    return cursor.rowcount > 0
+
+
+def upsert_experiment(summary_data: dict, result_id: str):
+    """
+    Insert or update an experiment's results in the database.
+    'result_id' is the unique identifier (e.g., 'uploads/uuid' or 'DA3_Control/CIL_43406')
+    """
+    conn = create_connection()
+    if conn is None:
+        return
+
+    conn.isolation_level = None  # explicit transaction below
+    try:
         c = conn.cursor()
-        c.execute(sql, data_tuple)
-        conn.commit()
+        c.execute("BEGIN IMMEDIATE")
+        _write_experiment(c, summary_data, result_id)
+        _bump_generation(c, 'experiments')
+        c.execute("COMMIT")
         logger.info(f"Successfully upserted experiment '{result_id}' to database.")
     except sqlite3.Error as e:
         logger.error(f"Error upserting experiment '{result_id}': {e}")
+        if conn.in_transaction:
+            conn.rollback()
     finally:
         conn.close()
 
@@ -127,14 +495,15 @@ def delete_experiment(result_id: str):
         logger.error("Could not connect to database to delete.")
         return False
 
-    sql = "DELETE FROM experiments WHERE id = ?"
-
+    conn.isolation_level = None  # explicit transaction below
     try:
         c = conn.cursor()
-        c.execute(sql, (result_id,))
-        conn.commit()
-        # Check if any row was actually deleted
-        was_deleted = c.rowcount > 0
+        c.execute("BEGIN IMMEDIATE")
+        was_deleted = _remove_experiment(c, result_id)
+        _delete_series(c, result_id)
+        if was_deleted:
+            _bump_generation(c, 'experiments')
+        c.execute("COMMIT")
         if was_deleted:
             logger.info(f"Successfully deleted experiment '{result_id}' from database.")
         else:
@@ -142,139 +511,1240 @@ def delete_experiment(result_id: str):
         return was_deleted
     except sqlite3.Error as e:
         logger.error(f"Error deleting experiment '{result_id}' from database: {e}")
+        if conn.in_transaction:
+            conn.rollback()
         return False
     finally:
         if conn:
             conn.close()
 
-def get_stats_by_condition():
+
+# ----------------- Experiment queries (comparison tab) -----------------
+EXPERIMENT_COLUMNS = ('id', 'experiment_name', 'condition_name', 'final_closure_pct', 'healing_rate_um2_per_hr',
+                      'r_squared', 'time_to_50_closure_hr', 'num_cells_tracked', 'mean_velocity_um_min',
+                      'migration_efficiency_mean', 'mean_directionality', 'timestamp')
+EXPERIMENT_METRICS = EXPERIMENT_COLUMNS[3:11]
+
+
+def _experiment_filters(conditions=None, since: str = None, until: str = None, ids=None):
+    """WHERE clause and parameters for the experiment filters (since inclusive, until exclusive)."""
+    where, params = [], []
+    if conditions:
+        where.append(f"condition_name IN ({', '.join('?' for _ in conditions)})")
+        params.extend(conditions)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("timestamp < ?")
+        params.append(until)
+    if ids:
+        where.append(f"id IN ({', '.join('?' for _ in ids)})")
+        params.extend(ids)
+    return where, params
+
+
+def query_experiments(fields=None, conditions=None, since: str = None, until: str = None, ids=None,
+                      sort: str = '-timestamp', limit: int = 100, offset: int = 0, after=None):
     """
-    Calculates aggregate statistics (mean, std, n, ci) for key metrics,
-    grouped by condition. This replaces the old file-based logic.
+    One page of experiments: filtered, projected onto `fields` (id is always included)
+    and ordered by `sort` ('column' or '-column'; NULLs last, ties broken by id).
+    `after` = (sort value, id) of the last row of the previous page continues from there
+    (keyset pagination) instead of using offset.
+    Returns (rows, total_matching, last_key) where last_key is the `after` for the next
+    page, or None if this is the last page.
     """
+    fields = [f for f in (fields or EXPERIMENT_COLUMNS) if f in EXPERIMENT_COLUMNS]
+    descending = sort.startswith('-')
+    sort_col = sort.lstrip('-')
+    if sort_col not in EXPERIMENT_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort_col}'")
+    columns = list(dict.fromkeys(['id'] + fields + [sort_col]))
+
+    where, params = _experiment_filters(conditions, since, until, ids)
+    page_where, page_params = list(where), list(params)
+    if after is not None:
+        value, last_id = after
+        cmp = '<' if descending else '>'
+        if value is None:  # already in the NULL tail
+            page_where.append(f"({sort_col} IS NULL AND id {cmp} ?)")
+            page_params.append(last_id)
+        else:
+            page_where.append(f"({sort_col} IS NULL OR {sort_col} {cmp} ? OR ({sort_col} = ? AND id {cmp} ?))")
+            page_params.extend([value, value, last_id])
+        offset = 0
+    direction = 'DESC' if descending else 'ASC'
+
+    # Only after validation: a raise above must not leave a pooled checkout behind
     conn = create_connection()
     if conn is None:
-        return {}
+        return [], 0, None
+    try:
+        c = conn.cursor()
+        count_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        c.execute(f"SELECT COUNT(*) FROM experiments {count_sql}", params)
+        total = c.fetchone()[0]
+        page_sql = f"WHERE {' AND '.join(page_where)}" if page_where else ""
+        c.execute(f"""
+            SELECT {', '.join(columns)} FROM experiments {page_sql}
+            ORDER BY ({sort_col} IS NULL), {sort_col} {direction}, id {direction}
+            LIMIT ? OFFSET ?
+        """, page_params + [int(limit) + 1, int(offset)])
+        rows = [dict(row) for row in c.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error querying experiments: {e}")
+        return [], 0, None
+    finally:
+        conn.close()
 
-    # --- FIXED ---
-    # 1. Select the raw data, not the aggregates.
-    query = """
-    SELECT
-        condition_name,
-        final_closure_pct,
-        healing_rate_um2_per_hr,
-        r_squared
-    FROM experiments
-    WHERE condition_name IS NOT NULL
+    last_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_key = (rows[-1][sort_col], rows[-1]['id'])
+    if sort_col not in fields and sort_col != 'id':
+        for row in rows:
+            del row[sort_col]
+    return rows, int(total), last_key
+
+
+def aggregate_experiments(metrics=None, conditions=None, since: str = None, until: str = None):
     """
+    Per-condition summaries of `metrics` over the filtered experiments:
+    [{'condition_name', 'metrics': {metric: {'n', 'mean', 'std'}}}], std being the
+    sample standard deviation (None when n < 2). Without a date range, metrics kept in
+    condition_stats are read from there (O(#conditions)).
+    """
+    metrics = [m for m in (metrics or EXPERIMENT_METRICS) if m in EXPERIMENT_METRICS]
+    if not metrics:
+        return []
+    if not since and not until and all(m in CONDITION_STATS_METRICS for m in metrics):
+        summary = []
+        for condition, moments in sorted(get_condition_moments().items()):
+            if conditions and condition not in conditions:
+                continue
+            entry = {}
+            for m in metrics:
+                n, mean, m2 = moments[CONDITION_STATS_METRICS[m]]
+                entry[m] = {'n': n, 'mean': mean if n else None,
+                            'std': float(np.sqrt(m2 / (n - 1))) if n >= 2 else None}
+            summary.append({'condition_name': condition, 'metrics': entry})
+        return summary
 
-    summary = {}
+    conn = create_connection()
+    if conn is None:
+        return []
+    where, params = _experiment_filters(conditions, since, until)
+    where.append("condition_name IS NOT NULL")
+    # Two passes (means, then squared deviations) for a numerically stable variance
+    sql = f"""
+    WITH filtered AS (
+        SELECT condition_name, {', '.join(metrics)} FROM experiments WHERE {' AND '.join(where)}
+    ), means AS (
+        SELECT condition_name, {', '.join(f'AVG({m}) AS mean_{m}' for m in metrics)}
+        FROM filtered GROUP BY condition_name
+    )
+    SELECT condition_name,
+           {', '.join(f'COUNT(f.{m}) AS n_{m}, mean_{m}, SUM((f.{m} - mean_{m}) * (f.{m} - mean_{m})) AS m2_{m}'
+                      for m in metrics)}
+    FROM filtered f JOIN means USING (condition_name)
+    GROUP BY condition_name ORDER BY condition_name
+    """
     try:
-        # 2. Read all data into pandas
-        df = pd.read_sql_query(query, conn)
-        if df.empty:
-            return {}
-
-        # 3. Use pandas to calculate all stats, which handles STDEV correctly.
-        grouped = df.groupby('condition_name')
-
-        # Note: pandas .std() uses ddof=1 by default (sample stdev), which is correct.
-        stats_df = grouped.agg(
-            n=('final_closure_pct', 'count'),
-            closure_mean=('final_closure_pct', 'mean'),
-            closure_std=('final_closure_pct', 'std'),
-            healing_mean=('healing_rate_um2_per_hr', 'mean'),
-            healing_std=('healing_rate_um2_per_hr', 'std'),
-            r2_mean=('r_squared', 'mean')
-        )
-
-        # 4. Filter for n >= 2 and fill NaNs (which happen if std dev is 0)
-        stats_df = stats_df[stats_df['n'] >= 2].fillna(0)
-
-        # 5. Build the summary dictionary from the pandas DataFrame
-        for condition_name, row in stats_df.iterrows():
-            n = row['n']
-            closure_std = row['closure_std']
-            healing_std = row['healing_std']
+        c = conn.cursor()
+        c.execute(sql, params)
+        summary = []
+        for row in c.fetchall():
+            entry = {}
+            for m in metrics:
+                n = row[f'n_{m}']
+                entry[m] = {'n': n, 'mean': row[f'mean_{m}'],
+                            'std': float(np.sqrt(row[f'm2_{m}'] / (n - 1))) if n >= 2 else None}
+            summary.append({'condition_name': row['condition_name'], 'metrics': entry})
+        return summary
+    except sqlite3.Error as e:
+        logger.error(f"Error aggregating experiments: {e}")
+        return []
+    finally:
+        conn.close()
 
-            # Check if healing_rate_um2_per_hr was used
-            uses_scientific = row['healing_mean'] != 0
 
-            summary[condition_name] = {
-                'n': int(n),
-                'closure_mean': float(row['closure_mean']),
-                'closure_std': float(closure_std),
-                'closure_ci': float(1.96 * closure_std / np.sqrt(n)) if n > 0 else 0,
-                'healing_mean': float(row['healing_mean']),
-                'healing_std': float(healing_std),
-                'healing_ci': float(1.96 * healing_std / np.sqrt(n)) if n > 0 else 0,
-                'r2_mean': float(row['r2_mean']),
-                'uses_scientific': bool(uses_scientific),
-                'healing_unit': 'µm²/hr' if bool(uses_scientific) else 'px/hr'
-            }
+# ----------------- Per-condition running aggregates -----------------
+# experiments column -> condition_stats column prefix. Each metric keeps its own count,
+# mean and M2 (sum of squared deviations, Welford), so mean/std/n per condition are read
+# back in O(#conditions) and updated in O(1) per experiment write.
+CONDITION_STATS_METRICS = {
+    'final_closure_pct': 'closure',
+    'healing_rate_um2_per_hr': 'healing',
+    'r_squared': 'r2',
+}
 
-    except Exception as e:
-        logger.error(f"Error calculating stats by condition: {e}")
+
+def _finite(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def _welford(n: int, mean: float, m2: float, x: float, sign: int):
+    """Add (sign=+1) or remove (sign=-1) one observation x from (n, mean, M2)."""
+    if sign > 0:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        return n, mean, m2 + delta * (x - mean)
+    if n <= 1:
+        return 0, 0.0, 0.0
+    prev_mean = (n * mean - x) / (n - 1)
+    m2 -= (x - prev_mean) * (x - mean)
+    return n - 1, prev_mean, max(m2, 0.0)
+
+
+def _condition_stats_update(cursor, condition_name, values: dict, sign: int):
+    """Fold one experiment's metrics into (sign=+1) or out of (sign=-1) its condition's row."""
+    if condition_name is None:
+        return
+    cursor.execute("INSERT OR IGNORE INTO condition_stats (condition_name) VALUES (?)", (condition_name,))
+    cursor.execute("SELECT * FROM condition_stats WHERE condition_name = ?", (condition_name,))
+    row = dict(cursor.fetchone())
+    for column, prefix in CONDITION_STATS_METRICS.items():
+        x = _finite(values.get(column))
+        if x is None:
+            continue
+        row[f'{prefix}_n'], row[f'{prefix}_mean'], row[f'{prefix}_m2'] = _welford(
+            row[f'{prefix}_n'], row[f'{prefix}_mean'], row[f'{prefix}_m2'], x, sign)
+    if not any(row[f'{prefix}_n'] for prefix in CONDITION_STATS_METRICS.values()):
+        cursor.execute("DELETE FROM condition_stats WHERE condition_name = ?", (condition_name,))
+        return
+    assignments = ', '.join(f'{key} = ?' for key in row if key != 'condition_name')
+    cursor.execute(f"UPDATE condition_stats SET {assignments} WHERE condition_name = ?",
+                   [v for k, v in row.items() if k != 'condition_name'] + [condition_name])
+
+
+def _condition_stats_remove(cursor, result_id: str):
+    """Take the stored row of result_id (if any) out of its condition's aggregates."""
+    cursor.execute(f"SELECT condition_name, {', '.join(CONDITION_STATS_METRICS)} FROM experiments WHERE id = ?",
+                   (result_id,))
+    old = cursor.fetchone()
+    if old is not None:
+        _condition_stats_update(cursor, old['condition_name'], dict(old), -1)
+
+
+def _rebuild_condition_stats(cursor):
+    """Recompute condition_stats from the experiments table."""
+    cursor.execute("DELETE FROM condition_stats")
+    cursor.execute(f"SELECT condition_name, {', '.join(CONDITION_STATS_METRICS)} FROM experiments "
+                   "WHERE condition_name IS NOT NULL ORDER BY condition_name")
+    for row in cursor.fetchall():
+        _condition_stats_update(cursor, row['condition_name'], dict(row), +1)
+
+
+def rebuild_condition_stats() -> bool:
+    """Recompute the per-condition aggregates from scratch (e.g. after editing experiments by hand)."""
+    conn = create_connection()
+    if conn is None:
+        return False
+    conn.isolation_level = None  # explicit transaction below
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        _rebuild_condition_stats(c)
+        _bump_generation(c, 'experiments')
+        c.execute("COMMIT")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error rebuilding condition stats: {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        return False
     finally:
-        if conn:
-            conn.close()
-    return summary
-    # --- END FIX ---
+        conn.close()
 
-def get_significance_stars(p_value):
-    if p_value is None or np.isnan(p_value):
-        return 'n/a'
-    if p_value < 0.001:
-        return '***'
-    if p_value < 0.01:
-        return '**'
-    if p_value < 0.05:
-        return '*'
-    return 'ns'
 
-def calculate_all_pvalues():
+# ----------------- Results catalog -----------------
+CATALOG_COLUMNS = ('id', 'experiment_name', 'condition', 'summary_path', 'rel_summary_path', 'summary_json',
+                   'csv_path', 'plot_path', 'interactive_plot_path', 'video_path', 'gallery_json',
+                   'num_timepoints', 'processing_time_sec', 'summary_mtime', 'summary_size')
+
+
+def _catalog_row(row) -> dict:
+    """Turn a results_catalog row into the result dict used by the web app."""
+    entry = dict(row)
+    entry['raw_summary'] = json.loads(entry.pop('summary_json')) if entry.get('summary_json') else None
+    entry['gallery'] = json.loads(entry.pop('gallery_json')) if entry.get('gallery_json') else []
+    return entry
+
+
+CATALOG_UPSERT_SQL = f"""
+INSERT OR REPLACE INTO results_catalog ({', '.join(CATALOG_COLUMNS)}, updated_at)
+VALUES ({', '.join('?' for _ in CATALOG_COLUMNS)}, CURRENT_TIMESTAMP)
+"""
+
+
+def _catalog_values(entry: dict) -> tuple:
+    """A catalog entry as a results_catalog row in CATALOG_COLUMNS order."""
+    summary = entry.get('raw_summary') or {}
+    values = dict(entry)
+    values['summary_json'] = json.dumps(entry.get('raw_summary')) if entry.get('raw_summary') is not None else None
+    values['gallery_json'] = json.dumps(entry.get('gallery') or [])
+    values['num_timepoints'] = int(summary.get('num_timepoints') or 0)
+    values['processing_time_sec'] = float(summary.get('processing_time_sec') or 0.0)
+    return tuple(values.get(col) for col in CATALOG_COLUMNS)
+
+
+def upsert_catalog_entry(entry: dict):
     """
-    Calculates t-test p-values for all combinations of conditions.
-    This replaces the old file-based logic.
+    Insert or update one experiment's catalog entry (resolved asset paths + summary).
     """
     conn = create_connection()
     if conn is None:
-        return {}
+        return
 
-    query = """
-    SELECT condition_name, final_closure_pct, healing_rate_um2_per_hr
-    FROM experiments
-    WHERE condition_name IS NOT NULL
+    try:
+        c = conn.cursor()
+        c.execute(CATALOG_UPSERT_SQL, _catalog_values(entry))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error upserting catalog entry '{entry.get('id')}': {e}")
+    finally:
+        conn.close()
+
+
+def get_catalog_entries():
     """
-    pvalues = {}
+    All catalog entries, newest summary first.
+    """
+    conn = create_connection()
+    if conn is None:
+        return []
 
     try:
-        df = pd.read_sql_query(query, conn)
-        df = df.dropna(subset=['final_closure_pct', 'healing_rate_um2_per_hr'])
+        c = conn.cursor()
+        c.execute(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM results_catalog ORDER BY summary_mtime DESC")
+        return [_catalog_row(row) for row in c.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching catalog entries: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_catalog_entry(result_id: str):
+    """
+    One catalog entry by id (primary-key lookup), or None.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
 
-        conditions = df['condition_name'].unique()
+    try:
+        c = conn.cursor()
+        c.execute(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM results_catalog WHERE id = ?", (result_id,))
+        row = c.fetchone()
+        return _catalog_row(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching catalog entry '{result_id}': {e}")
+        return None
+    finally:
+        conn.close()
 
-        for cond1, cond2 in combinations(conditions, 2):
-            pair = f"{cond1} vs {cond2}"
 
-            data1_closure = df[df['condition_name'] == cond1]['final_closure_pct']
-            data2_closure = df[df['condition_name'] == cond2]['final_closure_pct']
+def query_catalog(condition: str = None, search: str = None, limit: int = 24, offset: int = 0):
+    """
+    One page of catalog entries, newest first, optionally filtered by condition key
+    and a case-insensitive substring of the experiment name.
+    Returns (entries, total_matching).
+    """
+    conn = create_connection()
+    if conn is None:
+        return [], 0
 
-            data1_healing = df[df['condition_name'] == cond1]['healing_rate_um2_per_hr']
-            data2_healing = df[df['condition_name'] == cond2]['healing_rate_um2_per_hr']
+    where, params = [], []
+    if condition:
+        where.append("condition = ?")
+        params.append(condition)
+    if search:
+        where.append("experiment_name LIKE ? ESCAPE '\\'")
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f"%{escaped}%")
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
 
-            if len(data1_closure) < 2 or len(data2_closure) < 2:
-                continue
+    try:
+        c = conn.cursor()
+        c.execute(f"SELECT COUNT(*) AS n FROM results_catalog {where_sql}", params)
+        total = c.fetchone()['n']
+        c.execute(f"""
+            SELECT {', '.join(CATALOG_COLUMNS)} FROM results_catalog {where_sql}
+            ORDER BY summary_mtime DESC LIMIT ? OFFSET ?
+        """, params + [int(limit), int(offset)])
+        return [_catalog_row(row) for row in c.fetchall()], int(total)
+    except sqlite3.Error as e:
+        logger.error(f"Error querying catalog: {e}")
+        return [], 0
+    finally:
+        conn.close()
 
-            _, p_closure = stats.ttest_ind(data1_closure, data2_closure, equal_var=False, nan_policy='omit')
-            _, p_healing = stats.ttest_ind(data1_healing, data2_healing, equal_var=False, nan_policy='omit')
 
-            pvalues[pair] = {
-                'closure_p': float(p_closure),
-                'healing_p': float(p_healing),
-                'closure_sig': get_significance_stars(p_closure),
-                'healing_sig': get_significance_stars(p_healing)
-            }
+def get_catalog_totals():
+    """
+    Dashboard header aggregates and the list of condition keys present in the catalog.
+    """
+    conn = create_connection()
+    totals = {'total_exp': 0, 'total_cond': 0, 'total_frames': 0, 'total_time_sec': 0.0, 'conditions': []}
+    if conn is None:
+        return totals
+
+    try:
+        c = conn.cursor()
+        c.execute("""
+            SELECT COUNT(*) AS n, COALESCE(SUM(num_timepoints), 0) AS frames,
+                   COALESCE(SUM(processing_time_sec), 0) AS secs
+            FROM results_catalog
+        """)
+        row = c.fetchone()
+        c.execute("SELECT DISTINCT condition FROM results_catalog ORDER BY condition")
+        conditions = [r['condition'] or 'Unknown' for r in c.fetchall()]
+        totals.update({'total_exp': int(row['n']), 'total_cond': len(conditions),
+                       'total_frames': int(row['frames']), 'total_time_sec': float(row['secs']),
+                       'conditions': conditions})
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching catalog totals: {e}")
+    finally:
+        conn.close()
+    return totals
+
+
+def get_catalog_ids():
+    conn = create_connection()
+    if conn is None:
+        return []
+
+    try:
+        c = conn.cursor()
+        c.execute("SELECT id FROM results_catalog")
+        return [row['id'] for row in c.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching catalog ids: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_catalog_signatures():
+    """
+    {id: (summary_path, summary_mtime, summary_size, has_summary, in_experiments)} for every
+    catalog entry, used by the importer to skip summaries that did not change.
+    """
+    conn = create_connection()
+    if conn is None:
+        return {}
+
+    try:
+        c = conn.cursor()
+        c.row_factory = None  # plain tuples
+        c.execute("""
+            SELECT r.id, r.summary_path, r.summary_mtime, r.summary_size, r.summary_json IS NOT NULL,
+                   EXISTS (SELECT 1 FROM experiments e WHERE e.id = r.id)
+            FROM results_catalog r
+        """)
+        return {row[0]: (row[1], row[2], row[3], bool(row[4]), bool(row[5])) for row in c.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching catalog signatures: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def delete_catalog_entry(result_id: str):
+    conn = create_connection()
+    if conn is None:
+        return False
+
+    try:
+        c = conn.cursor()
+        c.execute("DELETE FROM results_catalog WHERE id = ?", (result_id,))
+        deleted = c.rowcount > 0
+        _delete_series(c, result_id)
+        conn.commit()
+        return deleted
+    except sqlite3.Error as e:
+        logger.error(f"Error deleting catalog entry '{result_id}': {e}")
+        return False
+    finally:
+        conn.close()
+
+
+# ----------------- Per-frame and per-track series -----------------
+TIMESERIES_COLUMNS = ('frame', 'time_hr', 'area_px', 'area_um2', 'closure_pct')
+TRACK_COLUMNS = ('track_id', 'n_points', 'start_frame', 'end_frame', 'duration_min', 'path_length_um',
+                 'net_displacement_um', 'mean_speed_um_min', 'straightness', 'persistence_time_min',
+                 'diffusion_exponent', 'diffusion_coeff_um2_min', 'persistence_censored')
+# Layout of tracks.points: the track's positions packed as little-endian records
+TRACK_POINTS_DTYPE = np.dtype([('frame', '<i4'), ('x_px', '<f4'), ('y_px', '<f4')])
+# Layout of timeseries.data: little-endian float64, one block of n_frames values per
+# TIMESERIES_COLUMNS entry in that order (NaN where missing), frames ascending
+TIMESERIES_DTYPE = np.dtype('<f8')
+# Ids per IN (...) query, well under SQLite's bound-parameter limit
+SERIES_QUERY_BATCH = 500
+
+
+def _pack_timeseries(timeseries_rows) -> bytes:
+    """timeseries.data of rows in TIMESERIES_COLUMNS order (None -> NaN)."""
+    values = np.array(timeseries_rows, dtype=np.float64).reshape(-1, len(TIMESERIES_COLUMNS))
+    values = values[np.argsort(values[:, 0], kind='stable')]
+    return np.ascontiguousarray(values.T, dtype=TIMESERIES_DTYPE).tobytes()
+
+
+def _delete_series(cursor, result_id: str):
+    cursor.execute("DELETE FROM timeseries WHERE experiment_id = ?", (result_id,))
+    cursor.execute("DELETE FROM tracks WHERE experiment_id = ?", (result_id,))
+    _bump_generation(cursor, 'timeseries')  # every series write starts here
+
+
+def _write_series(cursor, result_id: str, timeseries_rows, track_rows):
+    """Replace an experiment's series rows (no commit)."""
+    _delete_series(cursor, result_id)
+    if len(timeseries_rows):
+        cursor.execute("INSERT INTO timeseries (experiment_id, n_frames, data) VALUES (?, ?, ?)",
+                       (result_id, len(timeseries_rows), _pack_timeseries(timeseries_rows)))
+    cursor.executemany(f"""
+        INSERT INTO tracks (experiment_id, {', '.join(TRACK_COLUMNS)}, points)
+        VALUES (?, {', '.join('?' for _ in TRACK_COLUMNS)}, ?)
+    """, ((result_id,) + tuple(row) for row in track_rows))
+
+
+def save_experiment_series(result_id: str, timeseries_rows, track_rows) -> bool:
+    """
+    Replace an experiment's per-frame and per-track rows in one transaction.
+    timeseries_rows: tuples in TIMESERIES_COLUMNS order; track_rows: tuples in
+    TRACK_COLUMNS order followed by the packed points (bytes, TRACK_POINTS_DTYPE) or None.
+    """
+    conn = create_connection()
+    if conn is None:
+        return False
+
+    conn.isolation_level = None  # explicit transaction below
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        _write_series(c, result_id, timeseries_rows, track_rows)
+        c.execute("COMMIT")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error saving series of '{result_id}': {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def _query_by_experiment(table: str, columns, result_ids, order_by: str = None):
+    """Rows (experiment_id, *columns) of `table` for many experiments, batched over IN (...)."""
+    conn = create_connection()
+    if conn is None:
+        return []
+    rows = []
+    try:
+        c = conn.cursor()
+        c.row_factory = None  # plain tuples
+        ids = list(dict.fromkeys(result_ids))
+        for start in range(0, len(ids), SERIES_QUERY_BATCH):
+            batch = ids[start:start + SERIES_QUERY_BATCH]
+            c.execute(f"""
+                SELECT experiment_id, {', '.join(columns)} FROM {table}
+                WHERE experiment_id IN ({', '.join('?' for _ in batch)})
+                ORDER BY experiment_id{f', {order_by}' if order_by else ''}
+            """, batch)
+            rows.extend(c.fetchall())
+    except sqlite3.Error as e:
+        logger.error(f"Error reading {table}: {e}")
+        return []
+    finally:
+        conn.close()
+    return rows
+
+
+def _split_columns(rows, columns) -> dict:
+    """{experiment_id: {column: float64 array}} from rows sorted by experiment id."""
+    if not rows:
+        return {}
+    ids = [row[0] for row in rows]
+    values = np.array([row[1:] for row in rows], dtype=np.float64)  # NULL -> NaN
+    out = {}
+    start = 0
+    for end in range(1, len(ids) + 1):
+        if end == len(ids) or ids[end] != ids[start]:
+            out[ids[start]] = {col: values[start:end, k] for k, col in enumerate(columns)}
+            start = end
+    return out
+
+
+def get_timeseries(result_ids, columns=('time_hr', 'area_px', 'closure_pct')) -> dict:
+    """
+    Per-frame series of many experiments in one indexed query:
+    {result_id: {column: np.ndarray}}, frames in order. Experiments without rows are absent.
+    The arrays are read-only views of the packed rows.
+    """
+    columns = tuple(col for col in columns if col in TIMESERIES_COLUMNS)
+    out = {}
+    for result_id, n_frames, blob in _query_by_experiment('timeseries', ('n_frames', 'data'), result_ids):
+        values = np.frombuffer(blob, dtype=TIMESERIES_DTYPE).reshape(len(TIMESERIES_COLUMNS), n_frames)
+        out[result_id] = {col: values[TIMESERIES_COLUMNS.index(col)] for col in columns}
+    return out
+
+
+def get_tracks(result_ids, columns=TRACK_COLUMNS) -> dict:
+    """Per-track kinematics of many experiments: {result_id: {column: np.ndarray}} by track id."""
+    columns = tuple(col for col in columns if col in TRACK_COLUMNS)
+    return _split_columns(_query_by_experiment('tracks', columns, result_ids, 'track_id'), columns)
+
+
+def get_track_points(result_id: str, track_ids=None) -> np.ndarray:
+    """
+    Positions of an experiment's tracks (all, or those in track_ids) as one structured
+    array with fields track_id, frame, x_px, y_px, ordered by track then frame.
+    """
+    dtype = np.dtype([('track_id', '<i4')] + TRACK_POINTS_DTYPE.descr)
+    wanted = None if track_ids is None else {int(t) for t in track_ids}
+    rows = _query_by_experiment('tracks', ('track_id', 'points'), [result_id], 'track_id')
+    parts = []
+    for _, track_id, blob in rows:
+        if not blob or (wanted is not None and track_id not in wanted):
+            continue
+        points = np.frombuffer(blob, dtype=TRACK_POINTS_DTYPE)
+        part = np.empty(len(points), dtype=dtype)
+        part['track_id'] = track_id
+        for name in TRACK_POINTS_DTYPE.names:
+            part[name] = points[name]
+        parts.append(part)
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+# ----------------- Results tree import -----------------
+def apply_import_batch(records, removed_ids=()) -> bool:
+    """
+    Write one batch of the results importer in a single transaction.
+    records: dicts with 'entry' (catalog entry), 'experiment' (summary data for the
+    experiments table, or None) and 'series' ((timeseries_rows, track_rows), or None to
+    leave the stored series alone). removed_ids: catalog ids whose summary is gone; their
+    catalog entry, experiments row and series are deleted.
+    """
+    conn = create_connection()
+    if conn is None:
+        return False
+
+    conn.isolation_level = None  # explicit transaction below
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        c.executemany(CATALOG_UPSERT_SQL, (_catalog_values(record['entry']) for record in records))
+        experiments_changed = False
+        for record in records:
+            result_id = record['entry']['id']
+            if record.get('experiment') is not None:
+                _write_experiment(c, record['experiment'], result_id)
+                experiments_changed = True
+            if record.get('series') is not None:
+                _write_series(c, result_id, *record['series'])
+        for result_id in removed_ids:
+            c.execute("DELETE FROM results_catalog WHERE id = ?", (result_id,))
+            experiments_changed |= _remove_experiment(c, result_id)
+            _delete_series(c, result_id)
+        if experiments_changed:
+            _bump_generation(c, 'experiments')
+        c.execute("COMMIT")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error writing import batch ({len(records)} entries, {len(removed_ids)} removals): {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+# ----------------- Analysis jobs -----------------
+JOB_COLUMNS = ('id', 'kind', 'status', 'progress', 'message', 'params_json', 'result_id', 'error', 'worker',
+               'attempts', 'created_at', 'started_at', 'finished_at', 'heartbeat_at', 'detail_json')
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+
+
+def _job_row(row) -> dict:
+    job = dict(row)
+    job['params'] = json.loads(job.pop('params_json')) if job.get('params_json') else {}
+    job['detail'] = json.loads(job.pop('detail_json')) if job.get('detail_json') else {}
+    return job
+
+
+def create_job(job_id: str, kind: str, params: dict):
+    """
+    Enqueue a job. Returns the job dict, or None on failure.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    now = time.time()
+    try:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO jobs (id, kind, status, progress, message, params_json, created_at)
+            VALUES (?, ?, 'queued', 0, 'Queued', ?, ?)
+        """, (job_id, kind, json.dumps(params), now))
+        conn.commit()
+        c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return _job_row(c.fetchone())
+    except sqlite3.Error as e:
+        logger.error(f"Error creating job '{job_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def claim_next_job(worker: str, max_running: int, stale_after_sec: float, max_attempts: int = 3):
+    """
+    Atomically move the oldest queued job to 'running' for `worker`, provided fewer than
+    `max_running` jobs are running across all processes. Running jobs whose heartbeat is
+    older than `stale_after_sec` (their process died) are re-queued first, or failed once
+    they have used up `max_attempts`. Returns the claimed job dict, or None.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    now = time.time()
+    conn.isolation_level = None  # explicit transaction below
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        stale = now - stale_after_sec
+        c.execute("""
+            UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Worker lost',
+                   message = '❌ Error: analysis worker stopped responding'
+            WHERE status = 'running' AND COALESCE(heartbeat_at, 0) < ? AND attempts >= ?
+        """, (now, stale, max_attempts))
+        c.execute("""
+            UPDATE jobs SET status = 'queued', worker = NULL, message = 'Re-queued after worker restart'
+            WHERE status = 'running' AND COALESCE(heartbeat_at, 0) < ?
+        """, (stale,))
+
+        c.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'")
+        if c.fetchone()[0] >= max_running:
+            c.execute("COMMIT")
+            return None
+
+        c.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1")
+        row = c.fetchone()
+        if row is None:
+            c.execute("COMMIT")
+            return None
+
+        c.execute("""
+            UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                   started_at = ?, heartbeat_at = ?, progress = 0, message = 'Starting', detail_json = NULL
+            WHERE id = ?
+        """, (worker, now, now, row['id']))
+        c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (row['id'],))
+        job = _job_row(c.fetchone())
+        c.execute("COMMIT")
+        return job
+    except sqlite3.Error as e:
+        logger.error(f"Error claiming job: {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+
+def update_job_progress(job_id: str, progress: float = None, message: str = None, detail: dict = None):
+    """
+    Record progress/status text for a running job; also refreshes its heartbeat.
+    detail: optional structured progress (stage, frame, total_frames, fps, eta_sec).
+    """
+    conn = create_connection()
+    if conn is None:
+        return
+
+    try:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message),
+                   detail_json = COALESCE(?, detail_json), heartbeat_at = ?
+            WHERE id = ? AND status = 'running'
+        """, (progress, message, json.dumps(detail) if detail is not None else None, time.time(), job_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error updating job '{job_id}': {e}")
+    finally:
+        conn.close()
+
+
+def finish_job(job_id: str, status: str, message: str, result_id: str = None, error: str = None):
+    """
+    Mark a job 'done' or 'failed'.
+    """
+    conn = create_connection()
+    if conn is None:
+        return
+
+    try:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE jobs SET status = ?, message = ?, result_id = ?, error = ?, finished_at = ?,
+                   progress = CASE WHEN ? = 'done' THEN 100 ELSE progress END
+            WHERE id = ?
+        """, (status, message, result_id, error, time.time(), status, job_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error finishing job '{job_id}': {e}")
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str):
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        row = c.fetchone()
+        return _job_row(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching job '{job_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_recent_jobs(limit: int = 20):
+    """
+    Most recently created jobs first.
+    """
+    conn = create_connection()
+    if conn is None:
+        return []
+
+    try:
+        c = conn.cursor()
+        c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [_job_row(row) for row in c.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching jobs: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+# ----------------- Upload sessions -----------------
+def create_upload(upload_id: str, filename: str, size: int, frame_interval: int = 5, sha256: str = None,
+                  status: str = 'uploading'):
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    now = time.time()
+    try:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO uploads (id, filename, size, sha256, frame_interval, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (upload_id, filename, size, sha256, frame_interval, status, now, now))
+        conn.commit()
+        return get_upload(upload_id)
+    except sqlite3.Error as e:
+        logger.error(f"Error creating upload '{upload_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_upload(upload_id: str):
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,))
+        row = c.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching upload '{upload_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def set_upload_status(upload_id: str, status: str, error: str = None):
+    """
+    Move an upload to 'uploading', 'complete', 'ingesting', 'ingested' or 'failed'.
+    """
+    conn = create_connection()
+    if conn is None:
+        return
+
+    try:
+        c = conn.cursor()
+        c.execute("UPDATE uploads SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                  (status, error, time.time(), upload_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error updating upload '{upload_id}': {e}")
+    finally:
+        conn.close()
+
+
+def claim_upload_ingest(upload_id: str, stale_sec: float) -> bool:
+    """
+    Atomically move a 'complete' upload to 'ingesting' (or take over an 'ingesting' one not
+    touched for stale_sec, whose worker died). Returns True if this caller now owns ingestion.
+    """
+    conn = create_connection()
+    if conn is None:
+        return False
+
+    try:
+        c = conn.cursor()
+        now = time.time()
+        c.execute("""
+            UPDATE uploads SET status = 'ingesting', error = NULL, updated_at = ?
+            WHERE id = ? AND (status = 'complete' OR (status = 'ingesting' AND updated_at < ?))
+        """, (now, upload_id, now - stale_sec))
+        conn.commit()
+        return c.rowcount == 1
+    except sqlite3.Error as e:
+        logger.error(f"Error claiming upload '{upload_id}': {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def touch_upload(upload_id: str):
+    """Refresh updated_at of an upload being ingested, so it is not taken over as stale."""
+    conn = create_connection()
+    if conn is None:
+        return
+
+    try:
+        c = conn.cursor()
+        c.execute("UPDATE uploads SET updated_at = ? WHERE id = ? AND status = 'ingesting'", (time.time(), upload_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error touching upload '{upload_id}': {e}")
+    finally:
+        conn.close()
+
+
+def set_upload_content(upload_id: str, content_sha256: str, source_upload_id: str = None):
+    """
+    Record an upload's content hash and, when its bytes duplicate an earlier upload,
+    the upload whose decoded frames it shares.
+    """
+    conn = create_connection()
+    if conn is None:
+        return
+
+    try:
+        c = conn.cursor()
+        c.execute("UPDATE uploads SET content_sha256 = ?, source_upload_id = ?, updated_at = ? WHERE id = ?",
+                  (content_sha256, source_upload_id, time.time(), upload_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error recording content hash for upload '{upload_id}': {e}")
+    finally:
+        conn.close()
+
+
+def find_ingested_upload(content_sha256: str, exclude_id: str = None):
+    """
+    The oldest already-decoded upload with this content hash that owns its frames, or None.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute("""
+            SELECT * FROM uploads
+            WHERE content_sha256 = ? AND status = 'ingested' AND source_upload_id IS NULL AND id != ?
+            ORDER BY created_at LIMIT 1
+        """, (content_sha256, exclude_id or ''))
+        row = c.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error looking up uploads by content hash: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+# ----------------- Result cache -----------------
+def get_cached_result(cache_key: str):
+    """
+    Look up a cache entry and record the hit. Returns the entry dict or None.
+    """
+    conn = create_connection()
+    if conn is None:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute("SELECT * FROM result_cache WHERE cache_key = ?", (cache_key,))
+        row = c.fetchone()
+        if row is None:
+            return None
+        c.execute("UPDATE result_cache SET hits = hits + 1, last_hit_at = ? WHERE cache_key = ?",
+                  (time.time(), cache_key))
+        conn.commit()
+        return dict(row)
+    except sqlite3.Error as e:
+        logger.error(f"Error reading result cache: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def put_cached_result(cache_key: str, input_sha256: str, pipeline_version: str, params: dict,
+                      result_id: str, size_bytes: int = 0):
+    conn = create_connection()
+    if conn is None:
+        return
+
+    now = time.time()
+    try:
+        c = conn.cursor()
+        c.execute("""
+            INSERT OR REPLACE INTO result_cache
+                (cache_key, input_sha256, pipeline_version, params_json, result_id, size_bytes, hits, created_at, last_hit_at)
+            VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+        """, (cache_key, input_sha256, pipeline_version, json.dumps(params, sort_keys=True), result_id,
+              int(size_bytes), now, now))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error writing result cache: {e}")
+    finally:
+        conn.close()
+
+
+def delete_cached_results(cache_key: str = None, result_id: str = None) -> int:
+    """
+    Drop one cache entry (by key) or every entry pointing at a result.
+    """
+    conn = create_connection()
+    if conn is None:
+        return 0
+
+    try:
+        c = conn.cursor()
+        if cache_key is not None:
+            c.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+        else:
+            c.execute("DELETE FROM result_cache WHERE result_id = ?", (result_id,))
+        conn.commit()
+        return c.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Error deleting result cache entries: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+CACHE_EVICTION_ORDER = {
+    'lru': 'last_hit_at ASC',
+    'lfu': 'hits ASC, last_hit_at ASC',
+    'fifo': 'created_at ASC',
+}
+
+
+def evict_result_cache(policy: str = 'lru', max_entries: int = None, max_age_sec: float = None):
+    """
+    Trim the result cache: drop entries not hit within max_age_sec, then remove entries in
+    `policy` order ('lru', 'lfu' or 'fifo') until at most max_entries remain.
+    Only cache entries are removed; the results they point to are left alone.
+    Returns (number of entries removed, result ids no longer referenced by any entry).
+    """
+    order = CACHE_EVICTION_ORDER.get(policy)
+    if order is None:
+        raise ValueError(f"Unknown cache eviction policy: {policy}")
+    conn = create_connection()
+    if conn is None:
+        return 0, []
+
+    conn.isolation_level = None  # explicit transaction below
+    victims = {}
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        if max_age_sec:
+            c.execute("SELECT cache_key, result_id FROM result_cache WHERE last_hit_at < ?",
+                      (time.time() - max_age_sec,))
+            expired = {row['cache_key']: row['result_id'] for row in c.fetchall()}
+            c.executemany("DELETE FROM result_cache WHERE cache_key = ?", [(key,) for key in expired])
+            victims.update(expired)
+
+        if max_entries is not None:
+            c.execute(f"""
+                SELECT cache_key, result_id FROM result_cache ORDER BY {order}
+                LIMIT MAX(0, (SELECT COUNT(*) FROM result_cache) - ?)
+            """, (max_entries,))
+            excess = {row['cache_key']: row['result_id'] for row in c.fetchall()}
+            c.executemany("DELETE FROM result_cache WHERE cache_key = ?", [(key,) for key in excess])
+            victims.update(excess)
+
+        orphaned = []
+        for result_id in sorted(set(victims.values())):
+            c.execute("SELECT 1 FROM result_cache WHERE result_id = ? LIMIT 1", (result_id,))
+            if c.fetchone() is None:
+                orphaned.append(result_id)
+        c.execute("COMMIT")
+        return len(victims), orphaned
+    except sqlite3.Error as e:
+        logger.error(f"Error evicting result cache: {e}")
+        if conn.in_transaction:
+            conn.rollback()
+        return 0, []
+    finally:
+        conn.close()
+
+
+def get_stats_by_condition():
+    """
+    Aggregate statistics (mean, std, n, ci) for key metrics, grouped by condition.
+    Read from the running aggregates in condition_stats, so the cost is O(#conditions).
+    """
+    conn = create_connection()
+    if conn is None:
+        return {}
+
+    summary = {}
+    try:
+        c = conn.cursor()
+        c.execute("SELECT * FROM condition_stats WHERE closure_n >= 2")
+
+        def sample_std(n, m2):
+            # Sample standard deviation (ddof=1); 0 when undefined
+            return float(np.sqrt(m2 / (n - 1))) if n >= 2 else 0.0
+
+        for row in c.fetchall():
+            n = row['closure_n']
+            closure_std = sample_std(n, row['closure_m2'])
+            healing_std = sample_std(row['healing_n'], row['healing_m2'])
+            healing_mean = float(row['healing_mean']) if row['healing_n'] else 0.0
+
+            # Check if healing_rate_um2_per_hr was used
+            uses_scientific = healing_mean != 0
+
+            summary[row['condition_name']] = {
+                'n': int(n),
+                'closure_mean': float(row['closure_mean']),
+                'closure_std': closure_std,
+                'closure_ci': float(1.96 * closure_std / np.sqrt(n)),
+                'healing_mean': healing_mean,
+                'healing_std': healing_std,
+                'healing_ci': float(1.96 * healing_std / np.sqrt(n)),
+                'r2_mean': float(row['r2_mean']) if row['r2_n'] else 0.0,
+                'uses_scientific': bool(uses_scientific),
+                'healing_unit': 'µm²/hr' if bool(uses_scientific) else 'px/hr'
+            }
+
+    except Exception as e:
+        logger.error(f"Error calculating stats by condition: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return summary
+
+def get_significance_stars(p_value):
+    if p_value is None or np.isnan(p_value):
+        return 'n/a'
+    if p_value < 0.001:
+        return '***'
+    if p_value < 0.01:
+        return '**'
+    if p_value < 0.05:
+        return '*'
+    return 'ns'
+
+def get_condition_moments(min_n: int = 0):
+    """
+    Per-condition moments from condition_stats: {condition: {prefix: (n, mean, m2)}} for
+    the prefixes in CONDITION_STATS_METRICS, for conditions with at least min_n closure values.
+    """
+    conn = create_connection()
+    if conn is None:
+        return {}
+    try:
+        c = conn.cursor()
+        c.execute("SELECT * FROM condition_stats WHERE closure_n >= ?", (min_n,))
+        return {row['condition_name']: {prefix: (row[f'{prefix}_n'], row[f'{prefix}_mean'], row[f'{prefix}_m2'])
+                                        for prefix in CONDITION_STATS_METRICS.values()}
+                for row in c.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error reading condition moments: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def calculate_all_pvalues():
+    """
+    Pairwise comparisons of closure and healing rate between all conditions with n >= 2:
+    Welch t-test (closure_p / healing_p) from the condition_stats moments, Mann-Whitney U
+    (*_mw_p) and permutation test (*_perm_p; NaN for pairs above the size/work limits), each
+    with *_p_adj corrected over all pairs by Config.PVALUE_CORRECTION. The significance
+    stars use the corrected Welch p-value.
+    """
+    moments = get_condition_moments(min_n=2)
+    if len(moments) < 2:
+        return {}
+
+    conn = create_connection()
+    if conn is None:
+        return {}
+
+    query = """
+    SELECT condition_name, final_closure_pct, healing_rate_um2_per_hr
+    FROM experiments
+    WHERE condition_name IS NOT NULL
+    ORDER BY rowid
+    """
+    pvalues = {}
+
+    try:
+        df = pd.read_sql_query(query, conn)
+        # One pass over the table; conditions keep their order of first appearance
+        grouped = {name: group for name, group in df.groupby('condition_name', sort=False)}
+        conditions = [name for name in grouped if name in moments]
+
+        results = {}
+        for column, prefix in (('final_closure_pct', 'closure'), ('healing_rate_um2_per_hr', 'healing')):
+            values = [pd.to_numeric(grouped[name][column], errors='coerce').dropna().to_numpy(dtype=float)
+                      for name in conditions]
+            n, mean, m2 = (np.array(v, dtype=float) for v in zip(*(moments[name][prefix] for name in conditions)))
+            results[prefix] = significance.pairwise_tests(
+                conditions, {'n': n, 'mean': mean, 'm2': m2}, values,
+                correction=Config.PVALUE_CORRECTION, resamples=Config.PERMUTATION_RESAMPLES,
+                max_pair_size=Config.PERMUTATION_MAX_PAIR_SIZE, max_work=Config.PERMUTATION_MAX_WORK)
+
+        for k, (i, j) in enumerate(zip(*significance.pair_indices(len(conditions)))):
+            entry = {}
+            for prefix, tests in results.items():
+                entry.update({
+                    f'{prefix}_p': float(tests['welch_p'][k]),
+                    f'{prefix}_p_adj': float(tests['welch_p_adj'][k]),
+                    f'{prefix}_mw_p': float(tests['mw_p'][k]),
+                    f'{prefix}_mw_p_adj': float(tests['mw_p_adj'][k]),
+                    f'{prefix}_perm_p': float(tests['perm_p'][k]),
+                    f'{prefix}_perm_p_adj': float(tests['perm_p_adj'][k]),
+                    f'{prefix}_sig': get_significance_stars(tests['welch_p_adj'][k]),
+                })
+            pvalues[f"{conditions[i]} vs {conditions[j]}"] = entry
 
     except Exception as e:
         logger.error(f"Error calculating p-values: {e}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+figures.py
+
+Slim Plotly figure payloads. A full fig.to_json() embeds the whole layout template
+(about 7 KB for plotly_dark) in every figure and encodes arrays as base64 typed arrays;
+the slim format keeps only the traces and the layout, names the template, and writes
+arrays as plain lists rounded to a few significant digits:
+
+  {"format": "slim-plotly/1", "template": "plotly_dark", "data": [...], "layout": {...}}
+
+The browser fetches each template once from /plotly_template/<name> (immutable per
+plotly version) and applies it before Plotly.newPlot. Full figures (format absent)
+still render as before.
+
+Usage:
+  python figures.py slim [--root results]   # rewrite existing interactive plot JSON as slim
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import plotly
+import plotly.io as pio
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SLIM_FORMAT = 'slim-plotly/1'
+DEFAULT_TEMPLATE = 'plotly_dark'
+SIGNIFICANT_DIGITS = 6
+TEMPLATE_VERSION = plotly.__version__  # cache-busting token of /plotly_template URLs
+INTERACTIVE_SUFFIX = '_interactive.json'
+
+
+def _array_to_list(values: np.ndarray, digits: int) -> list:
+    """Plain-list form of an array; floats rounded to `digits` significant digits of its largest value."""
+    if values.dtype.kind == 'f':
+        finite = np.isfinite(values)
+        if finite.any():
+            top = float(np.abs(values[finite]).max())
+            decimals = max(0, digits - 1 - int(np.floor(np.log10(top)))) if top > 0 else 0
+            values = np.round(values, decimals)
+        if finite.all():
+            if values.size and np.all(values == np.trunc(values)) and np.abs(values).max() < 2 ** 53:
+                return values.astype(np.int64).tolist()  # 100000 rather than 100000.0
+            return values.tolist()
+        return np.where(finite, values.astype(object), None).tolist()
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values).tolist()
+    return _plain(values.tolist(), digits)
+
+
+def _decode_typed_array(spec: dict) -> np.ndarray:
+    """Plotly's {'dtype', 'bdata', 'shape'} typed-array encoding as a numpy array."""
+    values = np.frombuffer(base64.b64decode(spec['bdata']), dtype=np.dtype(spec['dtype']))
+    shape = spec.get('shape')
+    if shape:
+        values = values.reshape([int(s) for s in str(shape).split(',')])
+    return values
+
+
+def _plain(value, digits: int = SIGNIFICANT_DIGITS):
+    """JSON-ready copy of a figure spec: numpy/typed arrays -> rounded lists, NaN -> None."""
+    if isinstance(value, dict):
+        if 'bdata' in value and 'dtype' in value:
+            return _array_to_list(_decode_typed_array(value), digits)
+        return {k: _plain(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v, digits) for v in value]
+    if isinstance(value, np.ndarray):
+        return _array_to_list(value, digits)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def slim_figure(fig, template: str = DEFAULT_TEMPLATE, digits: int = SIGNIFICANT_DIGITS) -> dict:
+    """The slim payload of a plotly figure (or of a full figure dict loaded from JSON)."""
+    spec = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    layout = dict(spec.get('layout') or {})
+    layout.pop('template', None)
+    return {'format': SLIM_FORMAT, 'template': template,
+            'data': _plain(spec.get('data') or [], digits), 'layout': _plain(layout, digits)}
+
+
+def to_slim_json(fig, template: str = DEFAULT_TEMPLATE) -> str:
+    return json.dumps(slim_figure(fig, template), separators=(',', ':'), allow_nan=False)
+
+
+def write_slim_json(fig, path: str, template: str = DEFAULT_TEMPLATE):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(to_slim_json(fig, template))
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=None)
+def template_json(name: str) -> Optional[str]:
+    """JSON of a named plotly template (layout + trace defaults), or None if unknown."""
+    if name not in pio.templates:
+        return None
+    return json.dumps(_plain(pio.templates[name].to_plotly_json()), separators=(',', ':'), allow_nan=False)
+
+
+def slim_existing(root: str) -> int:
+    """Rewrite full interactive plot JSON files under root in the slim format. Returns the count."""
+    import result_files
+
+    count = 0
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d != 'cache']
+        for name in files:
+            if not name.endswith(INTERACTIVE_SUFFIX):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    spec = json.load(f)
+                if spec.get('format') == SLIM_FORMAT:
+                    continue
+                write_slim_json(spec, path)
+                # Older .br/.gz siblings are ignored once the file is newer; refresh them
+                if any(os.path.exists(path + suffix) for _, suffix in result_files.ENCODING_SUFFIXES):
+                    result_files.precompress(path)
+                count += 1
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not slim {path}: {e}")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slim Plotly figure payloads")
+    parser.add_argument('command', choices=('slim',))
+    parser.add_argument('--root', type=str, default=None, help='Results root (default: Config.RESULTS_FOLDER)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    count = slim_existing(os.path.abspath(args.root or Config.RESULTS_FOLDER))
+    print(f"Rewrote {count} interactive plot files.")
+
+
+if __name__ == '__main__':
+    main()
@@ -143,9 +143,9 @@ def discover_assets(summary_path: str) -> dict:
         if candidates['video']:
             break
 
-    # tracking files (trajectories.csv / velocities.csv / trajectories_plot.png)
+    # tracking files (trajectories.npy|csv / velocities.csv / trajectories_plot.png)
     tracking_list = []
-    for tname in ('trajectories.csv', 'velocities.csv', 'trajectories_plot.png', 'trajectories_plot.jpg', 'trajectories.png'):
+    for tname in ('trajectories.npy', 'trajectories.csv', 'velocities.csv', 'trajectories_plot.png', 'trajectories_plot.jpg', 'trajectories.png'):
         for try_path in (os.path.join(base, 'tracking', tname), os.path.join(base, tname), os.path.join(base, '..', 'tracking', tname)):
             if os.path.exists(try_path):
                 tracking_list.append(os.path.abspath(try_path))
@@ -183,7 +183,7 @@ def update_summary_paths(summary_json_path: str, new_paths: dict, results_root:
         'plot_interactive': ['plot_json', 'interactive_plot'],
         'video': ['video_path', 'video'],
         'gallery': ['gallery', 'gallery_thumbs'],
-        'tracking': ['trajectories_csv', 'trajectories_plot', 'velocities_csv']
+        'tracking': ['trajectories_npy', 'trajectories_csv', 'trajectories_plot', 'velocities_csv']
     }
 
     # For each moved item, set sensible keys in JSON
@@ -205,6 +205,8 @@ def update_summary_paths(summary_json_path: str, new_paths: dict, results_root:
     if new_paths.get('tracking'):
         # pick relevant tracking paths
         for t in new_paths['tracking']:
+            if t.lower().endswith('.npy') and 'traject' in t.lower():
+                data['trajectories_npy'] = rel_for(t)
             if t.lower().endswith('.csv') and 'traject' in t.lower():
                 data['trajectories_csv'] = rel_for(t)
             if t.lower().endswith('.csv') and 'velocity' in t.lower():
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+intermediates.py
+
+Per-run intermediates persisted under <output_dir>/cache/ so a result can be re-analyzed
+with new parameters without redoing the expensive stages:
+
+  run.json           parameters the run used, its input frames and tracking summary
+  frames.npy         normalized + blurred uint8 frames (N x H x W), memory-mappable;
+                     the input to segmentation for any disk size
+  areas.npy          frame index and wound area (px) of every segmented frame
+  wound_centers.npy  wound centroid (x, y) per segmented frame, NaN where no wound
+
+run.json is written last, so its presence means the other files are complete. cache/ is
+never served over HTTP. frames.npy is by far the largest file and may be pruned (see
+result_cache.evict and prune_expired); re-analysis then segments from the original images.
+"""
+import json
+import os
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = 'cache'
+RUN_STATE_VERSION = 1
+AREAS_DTYPE = np.dtype([('frame', '<i4'), ('area_px', '<f8')])
+
+
+def cache_dir(output_dir: str) -> str:
+    return os.path.join(output_dir, CACHE_DIR)
+
+
+def _path(output_dir: str, name: str) -> str:
+    return os.path.join(cache_dir(output_dir), name)
+
+
+class FrameStackWriter:
+    """
+    Collects preprocessed frames into frames.npy. The file is sized for n_frames on the
+    first add(); a frame whose shape differs from the first disables the stack.
+    """
+
+    def __init__(self, output_dir: str, n_frames: int):
+        self.path = _path(output_dir, 'frames.npy')
+        self.n_frames = n_frames
+        self._stack = None
+        self.ok = True
+
+    def add(self, index: int, frame: np.ndarray):
+        if not self.ok:
+            return
+        if self._stack is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._stack = np.lib.format.open_memmap(self.path, mode='w+', dtype=np.uint8,
+                                                    shape=(self.n_frames,) + frame.shape)
+        if frame.shape != self._stack.shape[1:]:
+            logger.warning(f"Frame {index} is {frame.shape}, not {self._stack.shape[1:]}; not caching frames.")
+            self.discard()
+            return
+        self._stack[index] = frame
+
+    def close(self) -> bool:
+        """Flush the stack. Returns True if frames.npy holds every added frame."""
+        if self._stack is None:
+            return False
+        self._stack.flush()
+        self._stack = None
+        return self.ok
+
+    def discard(self):
+        self.ok = False
+        self._stack = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_frames(output_dir: str) -> Optional[np.ndarray]:
+    """The cached preprocessed frames (memory-mapped), or None."""
+    path = _path(output_dir, 'frames.npy')
+    return np.load(path, mmap_mode='r') if os.path.exists(path) else None
+
+
+def prune_frames(output_dir: str) -> int:
+    """Delete an output directory's cached frames. Returns the bytes freed."""
+    path = _path(output_dir, 'frames.npy')
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except OSError:
+        return 0
+    return size
+
+
+def prune_expired_frames(output_dirs: Iterable[str], max_age_sec: float) -> int:
+    """
+    Delete the cached frames of each output directory whose run.json (or, for a run
+    without one, frames.npy) was last written more than max_age_sec ago. Only the cache/
+    files are stat'ed; result assets are never listed. Returns the bytes freed.
+    """
+    cutoff = time.time() - max_age_sec
+    freed = 0
+    for output_dir in output_dirs:
+        for stamp in ('run.json', 'frames.npy'):
+            try:
+                written = os.path.getmtime(_path(output_dir, stamp))
+            except OSError:
+                continue
+            if written < cutoff:
+                freed += prune_frames(output_dir)
+            break
+    return freed
+
+
+def save_areas(output_dir: str, frame_index: List[int], areas_px: List[float],
+               wound_centers: List[Optional[tuple]]):
+    os.makedirs(cache_dir(output_dir), exist_ok=True)
+    records = np.empty(len(frame_index), dtype=AREAS_DTYPE)
+    records['frame'] = frame_index
+    records['area_px'] = areas_px
+    np.save(_path(output_dir, 'areas.npy'), records)
+    centers = np.array([c if c is not None else (np.nan, np.nan) for c in wound_centers],
+                       dtype=np.float64).reshape(-1, 2)
+    np.save(_path(output_dir, 'wound_centers.npy'), centers)
+
+
+def load_areas(output_dir: str) -> Tuple[List[int], List[float], List[Optional[tuple]]]:
+    """Returns (frame_index, areas_px, wound_centers) as written by save_areas."""
+    records = np.load(_path(output_dir, 'areas.npy'))
+    centers = np.load(_path(output_dir, 'wound_centers.npy'))
+    wound_centers = [None if np.isnan(c).any() else (float(c[0]), float(c[1])) for c in centers]
+    return records['frame'].tolist(), records['area_px'].tolist(), wound_centers
+
+
+def save_run_state(output_dir: str, state: Dict):
+    os.makedirs(cache_dir(output_dir), exist_ok=True)
+    path = _path(output_dir, 'run.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dict(state, version=RUN_STATE_VERSION), f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def load_run_state(output_dir: str) -> Optional[Dict]:
+    """The parameters and outputs of the last run in output_dir, or None if it kept no intermediates."""
+    try:
+        with open(_path(output_dir, 'run.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != RUN_STATE_VERSION or not os.path.exists(_path(output_dir, 'areas.npy')):
+        return None
+    return state
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+job_queue.py
+
+SQLite-backed analysis job queue shared by every web worker process.
+
+- Jobs live in the `jobs` table (id, status, progress, message, timestamps), so any
+  process can report on any job and queued jobs survive restarts.
+- One app process at a time claims jobs: the process holding an exclusive lock on
+  DB_FOLDER/job_workers.lock runs the worker threads (and, through start_workers'
+  on_start hook, the analysis process pool), and another process takes over when it
+  exits. Claiming is a single IMMEDIATE transaction that also enforces the global
+  concurrency limit.
+- Running jobs refresh a heartbeat; a job whose process died is re-queued by the next
+  claim once its heartbeat goes stale.
+- Progress streams of jobs running in this process wait on an in-process notifier
+  (subscribe / wait_for_event) instead of polling the jobs table; notify() is called by
+  report() and on start/finish, and while a stream is open a watcher re-reads the job
+  row every JOB_EVENTS_POLL_SEC to pick up progress written by analysis worker processes.
+"""
+import os
+import fcntl
+import multiprocessing
+import socket
+import threading
+import uuid
+import logging
+from typing import Callable, Dict, Optional
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SEC = 1.0
+
+_handlers: Dict[str, Callable] = {}
+_wakeup = threading.Event()
+_started = False
+_start_lock = threading.Lock()
+_worker_lock_file = None  # held open (and locked) by the job-claiming process
+
+# Job progress notifier: job id -> [event version, open streams]
+_events = threading.Condition()
+_listeners: Dict[str, list] = {}
+_running_here = set()
+
+
+def register_handler(kind: str, fn: Callable):
+    """
+    Register the function that runs jobs of `kind`. It is called as fn(params, report, job_id)
+    where report(progress=None, message=None) records progress; its return value is
+    stored as the job's result_id.
+    """
+    _handlers[kind] = fn
+
+
+def submit(kind: str, params: dict, job_id: Optional[str] = None) -> Optional[dict]:
+    """Enqueue a job and wake the local workers. Returns the job dict."""
+    job = database.create_job(job_id or uuid.uuid4().hex, kind, params)
+    _wakeup.set()
+    return job
+
+
+def record_finished(kind: str, params: dict, result_id: str, message: str) -> Optional[dict]:
+    """Record a job that needed no work (e.g. answered from the result cache)."""
+    job = database.create_job(uuid.uuid4().hex, kind, params)
+    if job is None:
+        return None
+    database.finish_job(job['id'], 'done', message, result_id=result_id)
+    return database.get_job(job['id'])
+
+
+def subscribe(job_id: str):
+    """Register an open progress stream of `job_id`; pair with unsubscribe()."""
+    with _events:
+        _listeners.setdefault(job_id, [0, 0])[1] += 1
+
+
+def unsubscribe(job_id: str):
+    with _events:
+        entry = _listeners.get(job_id)
+        if entry:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del _listeners[job_id]
+
+
+def notify(job_id: str):
+    """Wake the progress streams of `job_id` in this process."""
+    with _events:
+        entry = _listeners.get(job_id)
+        if entry:
+            entry[0] += 1
+            _events.notify_all()
+
+
+def wait_for_event(job_id: str, version: int, timeout: float) -> int:
+    """
+    Block until `job_id` has an event newer than `version` or `timeout` passes. Returns the
+    current version. The caller must be subscribed.
+    """
+    with _events:
+        _events.wait_for(lambda: _listeners.get(job_id, [version])[0] != version, timeout)
+        return _listeners.get(job_id, [version])[0]
+
+
+def runs_here(job_id: str) -> bool:
+    """Whether `job_id` is running in this process, so its events are notified."""
+    return job_id in _running_here
+
+
+def _heartbeat(job_id: str, stop: threading.Event):
+    while not stop.wait(Config.JOB_HEARTBEAT_SEC):
+        database.update_job_progress(job_id)
+
+
+def _watch_progress(job_id: str, stop: threading.Event):
+    """Notify streams of progress that a worker process wrote to the job row."""
+    last = None
+    while not stop.wait(Config.JOB_EVENTS_POLL_SEC):
+        if job_id not in _listeners:
+            continue
+        job = database.get_job(job_id)
+        state = job and (job['status'], job['progress'], job['message'], job['detail'])
+        if state != last:
+            last = state
+            notify(job_id)
+
+
+def _run_job(job: dict):
+    job_id = job['id']
+    handler = _handlers.get(job['kind'])
+    if handler is None:
+        database.finish_job(job_id, 'failed', f"❌ Error: no handler for job kind '{job['kind']}'",
+                            error='unknown kind')
+        return
+
+    def report(progress=None, message=None):
+        database.update_job_progress(job_id, progress, message)
+        notify(job_id)
+
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True).start()
+    threading.Thread(target=_watch_progress, args=(job_id, stop), daemon=True).start()
+    _running_here.add(job_id)
+    notify(job_id)
+    try:
+        result_id = handler(job['params'], report, job_id)
+        database.finish_job(job_id, 'done', '✅ Complete', result_id=result_id)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed: {e}")
+        database.finish_job(job_id, 'failed', f'❌ Error: {e}', error=str(e))
+    finally:
+        stop.set()
+        _running_here.discard(job_id)
+        notify(job_id)
+
+
+def _worker_loop(worker_name: str):
+    while True:
+        job = database.claim_next_job(worker_name, Config.ANALYSIS_WORKERS,
+                                      Config.JOB_STALE_SEC, Config.JOB_MAX_ATTEMPTS)
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL_SEC)
+            _wakeup.clear()
+            continue
+        logger.info(f"{worker_name} claimed job {job['id']} ({job['kind']})")
+        _run_job(job)
+
+
+def _start_when_elected(n: int, on_start: Optional[Callable[[int], None]]):
+    """Wait until this process holds the job-worker lock, then start claiming jobs."""
+    global _worker_lock_file
+    lock_file = open(os.path.join(Config.DB_FOLDER, 'job_workers.lock'), 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when this process exits
+    _worker_lock_file = lock_file
+    if on_start is not None:
+        try:
+            on_start(n)
+        except Exception as e:
+            logger.error(f"Job worker start-up hook failed: {e}", exc_info=True)
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    for i in range(n):
+        threading.Thread(target=_worker_loop, args=(f'{prefix}/{i}',), daemon=True,
+                         name=f'analysis-worker-{i}').start()
+    logger.info(f"Started {n} analysis worker thread(s) in process {os.getpid()}")
+
+
+def start_workers(concurrency: Optional[int] = None, on_start: Optional[Callable[[int], None]] = None):
+    """
+    Start claiming jobs with `concurrency` worker threads once this process becomes the
+    job-claiming process (immediately if no other process is). on_start(concurrency) runs
+    first in that process, e.g. to start the analysis process pool.
+    """
+    global _started
+    if multiprocessing.parent_process() is not None:
+        return  # analysis worker processes re-import the app; they never claim jobs
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    n = concurrency or Config.ANALYSIS_WORKERS
+    threading.Thread(target=_start_when_elected, args=(n, on_start), daemon=True, name='job-worker-election').start()
+
+
+def job_to_json(job: dict) -> dict:
+    """Public view of a job for the API."""
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'message': job['message'],
+        'result_id': job['result_id'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'analysis_id': job['params'].get('analysis_id'),
+        'stage': job['detail'].get('stage'),
+        'frame': job['detail'].get('frame'),
+        'total_frames': job['detail'].get('total_frames'),
+        'fps': job['detail'].get('fps'),
+        'eta_sec': job['detail'].get('eta_sec'),
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
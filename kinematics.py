@@ -0,0 +1,273 @@
+"""Kinematics Module
+
+Per-track mean-squared displacement (MSD), persistence time and diffusion exponent.
+
+All lags are computed at once with FFT correlations (O(L log L) per track) over
+columnar track arrays (track_id, frame, x, y). Frames missing inside a track (trackpy
+memory gaps) are handled by masking, so every lag only counts pairs of observed points.
+"""
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# Tracks are processed in chunks of similar length to bound memory and padding.
+CHUNK_SIZE = 512
+
+
+def _correlate(a: np.ndarray, b: np.ndarray, n_lags: int) -> np.ndarray:
+    """
+    Row-wise correlation c[:, m] = sum_i a[:, i] * b[:, i + m] for m in [0, n_lags) via FFT.
+    """
+    nfft = 1 << int(2 * a.shape[1] - 1).bit_length()
+    fa = np.fft.rfft(a, n=nfft, axis=1)
+    fb = np.fft.rfft(b, n=nfft, axis=1)
+    return np.fft.irfft(np.conj(fa) * fb, n=nfft, axis=1)[:, :n_lags]
+
+
+def _dense_chunk(starts, spans, offsets, counts, frames, x, y):
+    """Scatter a chunk of tracks into zero-padded (n_tracks, span) position/mask arrays."""
+    n, length = len(spans), int(spans.max())
+    w = np.zeros((n, length))
+    px = np.zeros((n, length))
+    py = np.zeros((n, length))
+    rows = np.repeat(np.arange(n), counts)
+    idx = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - offsets, counts)
+    cols = frames[idx] - np.repeat(starts, counts)
+    w[rows, cols] = 1.0
+    # MSD is translation invariant; recentring on the first point limits FFT round-off
+    px[rows, cols] = x[idx] - np.repeat(x[offsets], counts)
+    py[rows, cols] = y[idx] - np.repeat(y[offsets], counts)
+    return w, px, py
+
+
+def msd_fft(w: np.ndarray, px: np.ndarray, py: np.ndarray):
+    """
+    MSD numerator and pair counts for every lag, for each row of the dense arrays.
+    Returns (sum_sq_disp, n_pairs), both shaped (n_tracks, span).
+    """
+    n_lags = w.shape[1]
+    r2 = w * (px ** 2 + py ** 2)
+    wx, wy = w * px, w * py
+    n_pairs = np.rint(_correlate(w, w, n_lags))
+    sq = (_correlate(r2, w, n_lags) + _correlate(w, r2, n_lags)
+          - 2.0 * (_correlate(wx, wx, n_lags) + _correlate(wy, wy, n_lags)))
+    sq = np.where(n_pairs > 0, np.maximum(sq, 0.0), 0.0)
+    return sq, n_pairs
+
+
+def direction_autocorrelation(w: np.ndarray, px: np.ndarray, py: np.ndarray):
+    """
+    Mean cosine between unit step vectors separated by each lag, per row.
+    Returns array (n_tracks, span - 1) with NaN where no step pairs exist.
+    """
+    valid = w[:, 1:] * w[:, :-1]
+    dx = (px[:, 1:] - px[:, :-1]) * valid
+    dy = (py[:, 1:] - py[:, :-1]) * valid
+    norm = np.hypot(dx, dy)
+    moving = (norm > 0).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ux = np.where(norm > 0, dx / norm, 0.0)
+        uy = np.where(norm > 0, dy / norm, 0.0)
+    n_lags = max(valid.shape[1], 1)
+    num = _correlate(ux, ux, n_lags) + _correlate(uy, uy, n_lags)
+    cnt = np.rint(_correlate(moving, moving, n_lags))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(cnt > 0, num / cnt, np.nan)
+
+
+def persistence_times(acf: np.ndarray, dt: float):
+    """
+    First lag time at which the direction autocorrelation drops below 1/e (linearly
+    interpolated). Returns (times, censored): tracks that stay above 1/e over every
+    observed lag are right-censored (the persistence time exceeds the track) and get NaN,
+    like tracks without step pairs.
+    """
+    n, n_lags = acf.shape
+    out = np.full(n, np.nan)
+    if n_lags == 0:
+        return out, np.zeros(n, dtype=bool)
+    thresh = np.exp(-1.0)
+    acf = acf.copy()
+    acf[:, 0] = np.where(np.isnan(acf[:, 0]), np.nan, 1.0)
+    below = acf < thresh
+    has_cross = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+    rows = np.nonzero(has_cross & (first > 0))[0]
+    if rows.size:
+        m = first[rows]
+        c1, c2 = acf[rows, m - 1], acf[rows, m]
+        frac = np.where(c1 != c2, (c1 - thresh) / (c1 - c2), 0.0)
+        out[rows] = (m - 1 + frac) * dt
+    censored = ~has_cross & ~np.isnan(acf[:, 0])
+    return out, censored
+
+
+def fit_power_law(msd: np.ndarray, lag_times: np.ndarray, max_fit_lag: np.ndarray):
+    """
+    Vectorized log-log least squares MSD = K * t^alpha, per row, over lags 1..max_fit_lag.
+    Returns alpha (NaN where fewer than two usable lags).
+    """
+    n_lags = msd.shape[1]
+    lags = np.arange(n_lags)
+    use = (lags[None, :] >= 1) & (lags[None, :] <= max_fit_lag[:, None]) & (msd > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lx = np.where(use, np.log(np.where(lag_times > 0, lag_times, 1.0))[None, :], 0.0)
+        ly = np.where(use, np.log(np.where(msd > 0, msd, 1.0)), 0.0)
+        n = use.sum(axis=1)
+        sx, sy = lx.sum(axis=1), ly.sum(axis=1)
+        sxx, sxy = (lx * lx).sum(axis=1), (lx * ly).sum(axis=1)
+        denom = n * sxx - sx * sx
+        alpha = np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+    return alpha
+
+
+def compute_track_kinematics(columns: Dict[str, np.ndarray], time_interval_hours: float,
+                             pixel_scale_um_per_px: float, chunk_size: int = CHUNK_SIZE) -> Dict:
+    """
+    columns: dict of equal-length arrays 'track_id', 'frame', 'x_px', 'y_px' sorted by
+             track then frame (see cell_tracking.tracks_to_columns).
+    Returns dict with 'tracks' (per-track DataFrame), 'msd_tracks' (long-format per-track
+    MSD curves), 'msd' (population MSD DataFrame) and population-level scalars.
+    Right-censored persistence times (flagged in 'persistence_censored') are NaN and are
+    left out of 'mean_persistence_time_min'.
+    """
+    dt = time_interval_hours * 60.0  # minutes per frame
+    tids = np.asarray(columns['track_id'])
+    frames = np.asarray(columns['frame']).astype(np.int64)
+    x = np.asarray(columns['x_px'], dtype=np.float64) * pixel_scale_um_per_px
+    y = np.asarray(columns['y_px'], dtype=np.float64) * pixel_scale_um_per_px
+
+    empty = {'tracks': pd.DataFrame(), 'msd_tracks': pd.DataFrame(), 'msd': pd.DataFrame(),
+             'msd_alpha': None, 'mean_persistence_time_min': None}
+    if tids.size == 0:
+        return empty
+
+    # Group boundaries (columns are sorted by track, then frame)
+    bounds = np.flatnonzero(np.diff(tids)) + 1
+    offsets = np.concatenate(([0], bounds))
+    counts = np.diff(np.concatenate((offsets, [tids.size])))
+    keep = counts >= 2
+    offsets, counts = offsets[keep], counts[keep]
+    if offsets.size == 0:
+        return empty
+    track_ids = tids[offsets]
+    starts = frames[offsets]
+    ends = frames[offsets + counts - 1]
+    spans = ends - starts + 1
+
+    # Path length / net displacement from consecutive observed points
+    step = np.hypot(np.diff(x), np.diff(y))
+    same_track = np.diff(tids) == 0
+    step = np.where(same_track, step, 0.0)
+    cum = np.concatenate(([0.0], np.cumsum(step)))
+    path = cum[offsets + counts - 1] - cum[offsets]
+    last = offsets + counts - 1
+    net = np.hypot(x[last] - x[offsets], y[last] - y[offsets])
+    duration = (ends - starts) * dt
+
+    max_span = int(spans.max())
+    pop_sq = np.zeros(max_span)
+    pop_pairs = np.zeros(max_span)
+    pop_tracks = np.zeros(max_span)
+    alpha = np.full(offsets.size, np.nan)
+    persistence = np.full(offsets.size, np.nan)
+    censored = np.zeros(offsets.size, dtype=bool)
+    diff_coeff = np.full(offsets.size, np.nan)
+    curve_parts = []
+
+    order = np.argsort(spans, kind='stable')
+    for c0 in range(0, order.size, chunk_size):
+        sel = order[c0:c0 + chunk_size]
+        w, px, py = _dense_chunk(starts[sel], spans[sel], offsets[sel], counts[sel], frames, x, y)
+        sq, n_pairs = msd_fft(w, px, py)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            msd = np.where(n_pairs > 0, sq / n_pairs, np.nan)
+        length = w.shape[1]
+        pop_sq[:length] += sq.sum(axis=0)
+        pop_pairs[:length] += n_pairs.sum(axis=0)
+        pop_tracks[:length] += (n_pairs > 0).sum(axis=0)
+
+        lag_times = np.arange(length) * dt
+        max_fit = np.maximum(2, (spans[sel] - 1) // 4)
+        alpha[sel] = fit_power_law(np.nan_to_num(msd), lag_times, max_fit)
+        if length > 1 and dt > 0:
+            diff_coeff[sel] = msd[:, 1] / (4.0 * dt)
+        persistence[sel], censored[sel] = persistence_times(direction_autocorrelation(w, px, py), dt)
+
+        r, m = np.nonzero(n_pairs[:, 1:] > 0)
+        m = m + 1
+        curve_parts.append(pd.DataFrame({
+            'track_id': track_ids[sel][r],
+            'lag': m,
+            'lag_time_min': m * dt,
+            'msd_um2': msd[r, m],
+            'n_pairs': n_pairs[r, m].astype(np.int64),
+        }))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_speed = np.where(duration > 0, path / duration, 0.0)
+        straightness = np.where(path > 0, net / path, 0.0)
+    tracks_df = pd.DataFrame({
+        'track_id': track_ids,
+        'n_points': counts,
+        'start_frame': starts,
+        'end_frame': ends,
+        'duration_min': duration,
+        'path_length_um': path,
+        'net_displacement_um': net,
+        'mean_speed_um_min': mean_speed,
+        'straightness': straightness,
+        'persistence_time_min': persistence,
+        'persistence_censored': censored,
+        'diffusion_exponent': alpha,
+        'diffusion_coeff_um2_min': diff_coeff,
+    })
+
+    lags = np.arange(1, max_span)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pop_msd = np.where(pop_pairs[1:] > 0, pop_sq[1:] / pop_pairs[1:], np.nan)
+    msd_df = pd.DataFrame({
+        'lag': lags,
+        'lag_time_min': lags * dt,
+        'msd_um2': pop_msd,
+        'n_pairs': pop_pairs[1:].astype(np.int64),
+        'n_tracks': pop_tracks[1:].astype(np.int64),
+    })
+    msd_df = msd_df[msd_df['n_pairs'] > 0].reset_index(drop=True)
+
+    pop_alpha = None
+    if len(msd_df) >= 2:
+        curve = np.concatenate(([0.0], pop_msd))[None, :]
+        fit_lag = np.array([max(2, (max_span - 1) // 4)])
+        a = fit_power_law(np.nan_to_num(curve), np.arange(max_span) * dt, fit_lag)[0]
+        pop_alpha = None if np.isnan(a) else float(a)
+
+    return {
+        'tracks': tracks_df,
+        'msd_tracks': pd.concat(curve_parts, ignore_index=True) if curve_parts else pd.DataFrame(),
+        'msd': msd_df,
+        'msd_alpha': pop_alpha,
+        'mean_persistence_time_min': float(np.nanmean(persistence)) if np.isfinite(persistence).any() else None,
+    }
+
+
+def save_kinematics(kinematics: Dict, output_dir: str) -> Dict[str, Optional[str]]:
+    """
+    Write kinematics.csv (per track), msd_tracks.csv (per-track curves) and msd.csv
+    (population) into output_dir. Returns the written paths.
+    """
+    paths = {'kinematics_csv': None, 'msd_tracks_csv': None, 'msd_csv': None}
+    if kinematics['tracks'].empty:
+        return paths
+    paths['kinematics_csv'] = os.path.join(output_dir, 'kinematics.csv')
+    kinematics['tracks'].to_csv(paths['kinematics_csv'], index=False)
+    paths['msd_tracks_csv'] = os.path.join(output_dir, 'msd_tracks.csv')
+    kinematics['msd_tracks'].to_csv(paths['msd_tracks_csv'], index=False)
+    paths['msd_csv'] = os.path.join(output_dir, 'msd.csv')
+    kinematics['msd'].to_csv(paths['msd_csv'], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    print("Kinematics module loaded!")
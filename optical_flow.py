@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Dense optical-flow migration module.
+
+- Alternative to per-cell tracking for confluent monolayers, where thresholding +
+  connected components merges neighbouring cells.
+- Computes frame-to-frame Farnebäck flow on downsampled frames (linear in pixels),
+  in parallel across frame pairs (OpenCV releases the GIL).
+- Derives mean speed, front velocity (flow toward the wound inside the front band),
+  flow coherence and directionality toward the get_wound_centers targets.
+- Outputs flow_metrics.csv into output_dir and returns the same summary keys as
+  cell_tracking.track_cells_in_timeseries.
+- rescale_flow_metrics converts a stored flow_metrics.csv to a new time interval /
+  pixel scale without recomputing flow.
+"""
+import os
+import threading
+import numpy as np
+import cv2
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Optional, Callable
+
+from cell_tracking import get_wound_centers, compute_front_band
+
+FARNEBACK_PARAMS = dict(pyr_scale=0.5, levels=3, winsize=15, iterations=3, poly_n=5, poly_sigma=1.2, flags=0)
+
+
+def _load_downsampled(img_path: str, scale: float) -> Optional[np.ndarray]:
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None or scale == 1.0:
+        return img
+    return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def _downsample_mask(mask: Optional[np.ndarray], shape) -> Optional[np.ndarray]:
+    if mask is None:
+        return None
+    mask_u8 = (np.asarray(mask) > 0).astype(np.uint8)
+    if mask_u8.shape != shape:
+        mask_u8 = cv2.resize(mask_u8, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+    return mask_u8
+
+
+def flow_pair_metrics(prev: np.ndarray, nxt: np.ndarray, wound_mask_u8: Optional[np.ndarray],
+                      target: Optional[tuple], front_band_px: float, min_flow_px: float = 0.05) -> dict:
+    """
+    Farnebäck flow between two downsampled frames and its summary, in downsampled px/frame.
+    target is the wound center in downsampled coordinates.
+    """
+    flow = cv2.calcOpticalFlowFarneback(prev, nxt, None, **FARNEBACK_PARAMS)
+    fx, fy = flow[..., 0], flow[..., 1]
+    mag = np.hypot(fx, fy)
+
+    if wound_mask_u8 is None:
+        cell_area = np.ones(prev.shape, dtype=bool)
+    else:
+        cell_area = wound_mask_u8 == 0
+    if not cell_area.any():
+        return {'mean_speed_px': 0.0, 'front_velocity_px': np.nan, 'coherence': 0.0, 'directionality': np.nan}
+
+    mean_speed = float(mag[cell_area].mean())
+    vx, vy = float(fx[cell_area].mean()), float(fy[cell_area].mean())
+    coherence = float(np.hypot(vx, vy) / mean_speed) if mean_speed > 0 else 0.0
+
+    directionality = np.nan
+    front_velocity = np.nan
+    if target is not None:
+        ys, xs = np.indices(prev.shape, dtype=np.float32)
+        tx, ty = target[0] - xs, target[1] - ys
+        tnorm = np.hypot(tx, ty)
+        ok = tnorm > 0
+        ux = np.where(ok, tx / np.where(ok, tnorm, 1.0), 0.0)
+        uy = np.where(ok, ty / np.where(ok, tnorm, 1.0), 0.0)
+        toward = fx * ux + fy * uy  # flow component toward the wound center
+
+        moving = cell_area & ok & (mag > min_flow_px)
+        if moving.any():
+            directionality = float((toward[moving] / mag[moving]).mean())
+
+        if wound_mask_u8 is not None and wound_mask_u8.any():
+            band, _ = compute_front_band(wound_mask_u8, front_band_px)
+            if band is not None:
+                front_velocity = float(toward[band > 0].mean())
+
+    return {'mean_speed_px': mean_speed, 'front_velocity_px': front_velocity,
+            'coherence': coherence, 'directionality': directionality}
+
+
+def flow_migration_in_timeseries(image_files: List[str], masks: List[Any],
+                                 time_interval: float, pixel_scale: float,
+                                 output_dir: str, downsample: float = 0.5,
+                                 front_band_px: Optional[float] = None,
+                                 workers: Optional[int] = None,
+                                 on_frame: Optional[Callable[[int, int], None]] = None):
+    """
+    image_files: list of image file paths
+    masks: list of numpy arrays (wound gap masks)
+    time_interval: hours per frame
+    pixel_scale: um per pixel
+    output_dir: directory to write flow outputs
+    downsample: resize factor applied before computing flow (<= 1)
+    front_band_px: width (full-res px) of the wound-front band used for front velocity
+    workers: number of runs of consecutive frame pairs processed concurrently, each holding
+             two downsampled frames at a time (default: CPU count)
+    on_frame: optional callback(pairs_done, total_pairs) called as flow pairs complete
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    scale = float(min(max(downsample, 0.05), 1.0))
+    band_px = (front_band_px if front_band_px and front_band_px > 0 else 50.0) * scale
+    workers = workers or os.cpu_count() or 1
+
+    empty = {'num_cells_tracked': 0, 'mean_velocity_um_min': 0.0, 'migration_efficiency_mean': 0.0,
+             'mean_directionality': 0.0, 'front_velocity_um_min': 0.0, 'migration_mode': 'flow'}
+    if len(image_files) < 2:
+        return empty
+
+    wound_centers = get_wound_centers(masks)
+    total_pairs = len(image_files) - 1
+    done_lock = threading.Lock()
+    done = [0]
+
+    def pair_metrics_of(i, prev, nxt):
+        try:
+            if prev is None or nxt is None or prev.shape != nxt.shape:
+                return None
+            mask = _downsample_mask(masks[i] if i < len(masks) else None, prev.shape)
+            center = wound_centers[i] if i < len(wound_centers) else None
+            target = (center[0] * scale, center[1] * scale) if center is not None else None
+            return flow_pair_metrics(prev, nxt, mask, target, band_px)
+        finally:
+            if on_frame is not None:
+                with done_lock:
+                    done[0] += 1
+                    on_frame(done[0], total_pairs)
+
+    def run_chunk(pairs):
+        # Streams its run of consecutive pairs, holding only the previous frame
+        prev = _load_downsampled(image_files[pairs[0]], scale)
+        out = []
+        for i in pairs:
+            nxt = _load_downsampled(image_files[i + 1], scale)
+            out.append(pair_metrics_of(i, prev, nxt))
+            prev = nxt
+        return out
+
+    chunks = [c for c in np.array_split(np.arange(total_pairs), min(workers, total_pairs)) if len(c)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        pair_metrics = [m for part in pool.map(run_chunk, chunks) for m in part]
+
+    # downsampled px/frame -> um/min
+    to_um_min = (pixel_scale / scale) / (time_interval * 60.0) if time_interval > 0 else 0.0
+    rows = []
+    for i, m in enumerate(pair_metrics):
+        if m is None:
+            continue
+        rows.append({
+            'frame': i,
+            'time(hours)': i * time_interval,
+            'mean_speed_um_min': m['mean_speed_px'] * to_um_min,
+            'front_velocity_um_min': m['front_velocity_px'] * to_um_min,
+            'coherence': m['coherence'],
+            'directionality': m['directionality'],
+        })
+    if not rows:
+        return empty
+
+    df = pd.DataFrame(rows)
+    flow_csv = os.path.join(output_dir, 'flow_metrics.csv')
+    df.to_csv(flow_csv, index=False)
+    return _flow_summary(df, scale, flow_csv)
+
+
+def _flow_summary(df: pd.DataFrame, scale: float, flow_csv: str) -> dict:
+    def nanmean(col):
+        vals = df[col].dropna()
+        return float(vals.mean()) if len(vals) > 0 else 0.0
+
+    return {
+        'num_cells_tracked': 0,
+        'mean_velocity_um_min': nanmean('mean_speed_um_min'),
+        'migration_efficiency_mean': nanmean('coherence'),
+        'mean_directionality': nanmean('directionality'),
+        'front_velocity_um_min': nanmean('front_velocity_um_min'),
+        'migration_mode': 'flow',
+        'flow_downsample': scale,
+        'flow_csv': flow_csv,
+    }
+
+
+def rescale_flow_metrics(previous: dict, time_interval: float, pixel_scale: float,
+                         previous_time_interval: float, previous_pixel_scale: float) -> dict:
+    """
+    Convert a stored flow_metrics.csv to a new time interval / pixel scale without
+    recomputing flow: speeds scale with um/px and inversely with hours/frame;
+    coherence and directionality are unitless and unchanged.
+    """
+    flow_csv = previous.get('flow_csv')
+    if not flow_csv or not os.path.exists(flow_csv) or previous_time_interval <= 0 or time_interval <= 0:
+        return dict(previous)
+    factor = (pixel_scale / previous_pixel_scale) * (previous_time_interval / time_interval)
+    df = pd.read_csv(flow_csv)
+    df['time(hours)'] = df['frame'] * time_interval
+    df['mean_speed_um_min'] *= factor
+    df['front_velocity_um_min'] *= factor
+    df.to_csv(flow_csv, index=False)
+    return dict(previous, **_flow_summary(df, previous.get('flow_downsample', 1.0), flow_csv))
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+reports.py
+
+PDF analysis reports.
+
+- build_report_pdf renders one experiment's report with ReportLab. Plots are
+  downsampled to REPORT_IMAGE_DPI before embedding instead of embedding the 300-dpi PNG.
+- Reports are cached next to the experiment's summary as <name>_report_<version>.pdf,
+  where version is the summary mtime: a re-run or re-analysis produces a new report and
+  older versions are removed.
+- Rendering runs in a small spawn-context process pool (ReportLab is pure Python, so
+  threads would serialize on the GIL), created by a web process only when it first
+  renders on demand. schedule() renders in the background when a run finishes, through
+  the submit function it is given (the app passes the analysis process pool's, so the
+  job-claiming process does not start a second pool); render_many() renders a batch in parallel for
+  the ZIP export. One render per report file is in flight at a time.
+"""
+import glob
+import io
+import multiprocessing
+import os
+import threading
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+REPORT_IMAGE_DPI = 200
+REPORT_IMAGE_WIDTH_IN = 6
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+
+
+def report_info(result: Dict) -> Dict:
+    """The picklable subset of a catalog result a report needs."""
+    return {
+        'id': result['id'],
+        'experiment_name': result.get('experiment_name'),
+        'condition_name': result.get('condition_name'),
+        'summary': result.get('raw_summary') or {},
+        'summary_path': result['summary_path'],
+        'summary_mtime': result.get('summary_mtime'),
+        'plot_path': result.get('plot_path'),
+    }
+
+
+def _file_stem(info: Dict) -> str:
+    from werkzeug.utils import secure_filename
+
+    return secure_filename(info.get('experiment_name') or '') or 'experiment'
+
+
+def report_path(info: Dict) -> str:
+    version = f"{int((info.get('summary_mtime') or 0) * 1000):x}"
+    return os.path.join(os.path.dirname(info['summary_path']), f"{_file_stem(info)}_report_{version}.pdf")
+
+
+def cached_report(info: Dict) -> Optional[str]:
+    """Path of the report for the current summary version, if it has been rendered."""
+    path = report_path(info)
+    return path if os.path.exists(path) else None
+
+
+# ----------------- Rendering (runs in a pool worker) -----------------
+def _scaled_image(path: str, width_in: float, height_in: float):
+    """A ReportLab image of `path`, resampled to REPORT_IMAGE_DPI at the printed size."""
+    from PIL import Image
+    from reportlab.platypus import Image as RLImage
+    from reportlab.lib.units import inch
+
+    with Image.open(path) as img:
+        max_px = int(width_in * REPORT_IMAGE_DPI)
+        if img.width > max_px:
+            img = img.resize((max_px, max(1, round(img.height * max_px / img.width))), Image.LANCZOS)
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        buf = io.BytesIO()
+        img.save(buf, format='PNG', optimize=True)
+    buf.seek(0)
+    rl_img = RLImage(buf, width=width_in * inch, height=height_in * inch)
+    rl_img.hAlign = 'CENTER'
+    return rl_img
+
+
+def build_report_pdf(info: Dict) -> bytes:
+    """Render the PDF report for one experiment (see report_info) and return its bytes."""
+    import numpy as np
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    data = info['summary']
+    exp_name = info['experiment_name']
+    pdf_buffer = io.BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+    story = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
+                                 textColor=colors.HexColor('#008B8B'), spaceAfter=30, alignment=1)
+    h3_style = ParagraphStyle('CustomH3', parent=styles['Heading3'], fontSize=14, textColor=colors.HexColor('#333333'),
+                              spaceAfter=10, spaceBefore=10)
+    story.append(Paragraph(f'Wound Healing Analysis Report', title_style))
+    story.append(Paragraph(f'<b>Experiment:</b> {exp_name}', styles['Normal']))
+    story.append(Paragraph(f'<b>Condition:</b> {info.get("condition_name")}', styles['Normal']))
+    story.append(Spacer(1, 0.3 * inch))
+    story.append(Paragraph('Wound Area Analysis', h3_style))
+    time_50_val = data.get('time_to_50_closure_hr')
+    time_50_str = f"{time_50_val:.1f}" if time_50_val is not None else "N/A"
+    pixel_scale = data.get('pixel_scale_um_per_px', 1.0)
+    area_unit = "µm²" if pixel_scale != 1.0 else "pixels"
+    speed_unit = "µm²/hr" if pixel_scale != 1.0 else "px/hr"
+    initial_area_display = data.get('initial_area_um2', data.get('initial_area_px', 0))
+    final_area_display = data.get('final_area_um2', data.get('final_area_px', 0))
+    healing_rate_display = abs(data.get('healing_rate_um2_per_hr', data.get('healing_rate_mean_px_per_hr', 0)))
+    mean_area_display = np.mean(data.get('areas_um2', data.get('areas_px', [0])))
+    std_area_display = np.std(data.get('areas_um2', data.get('areas_px', [0])))
+    table_data = [
+        ['Metric', 'Value', 'Unit'],
+        ['Starting Wound Size', f"{initial_area_display:.0f}", area_unit],
+        ['Final Wound Size', f"{final_area_display:.0f}", area_unit],
+        ['Wound Closure', f"{data.get('final_closure_pct', 0):.1f}", '%'],
+        ['Healing Speed (Slope)', f"{healing_rate_display:.2f}", speed_unit],
+        ['Healing Consistency (R²)', f"{data.get('r_squared', 0):.3f}", ''],
+        ['Time to 50% Closure', time_50_str, 'hours'],
+        ['Mean Wound Area', f"{mean_area_display:.0f}", area_unit],
+        ['Area Variability (SD)', f"± {std_area_display:.0f}", area_unit],
+        ['Total Frames', f"{data.get('num_timepoints', 0)}", ''],
+    ]
+    style_commands = [('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#008B8B')),
+                      ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                      ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                      ('FONTSIZE', (0, 0), (-1, 0), 12), ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                      ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DDDDDD')),
+                      ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F4F4F4'), colors.white])]
+    cell_count = data.get('num_cells_tracked', data.get('num_cells', 0))
+    story.append(Table(table_data, colWidths=[2.5 * inch, 1.5 * inch, 1 * inch], style=style_commands))
+
+    if data.get('migration_mode') == 'flow':
+        story.append(Spacer(1, 0.2 * inch))
+        story.append(Paragraph('Cell Migration Analysis (Optical Flow)', h3_style))
+        flow_table_data = [
+            ['Metric', 'Value', 'Unit'],
+            ['Mean Flow Speed', f"{data.get('mean_velocity_um_min', 0):.2f}", 'μm/min'],
+            ['Wound Front Velocity', f"{data.get('front_velocity_um_min', 0):.2f}", 'μm/min'],
+            ['Flow Coherence', f"{data.get('migration_efficiency_mean', 0):.3f}", ''],
+            ['Mean Directionality', f"{data.get('mean_directionality', 0):.3f}", ''],
+        ]
+        flow_style_commands = style_commands.copy()
+        flow_style_commands[0] = ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078D4'))
+        story.append(Table(flow_table_data, colWidths=[2.5 * inch, 1.5 * inch, 1 * inch], style=flow_style_commands))
+    elif cell_count > 0:
+        story.append(Spacer(1, 0.2 * inch))
+        story.append(Paragraph('Cell Migration Analysis', h3_style))
+        mean_vel_val = data.get('mean_velocity_um_min', data.get('mean_velocity'))
+        mean_vel_str = f"{mean_vel_val:.2f}" if mean_vel_val is not None else "N/A"
+        mig_eff_val = data.get('migration_efficiency_mean', data.get('migration_efficiency'))
+        mig_eff_str = f"{mig_eff_val:.3f}" if mig_eff_val is not None else "N/A"
+        mean_disp_val = data.get('mean_displacement_um', data.get('mean_displacement'))
+        mean_disp_str = f"{mean_disp_val:.2f}" if mean_disp_val is not None else "N/A"
+        mean_path_val = data.get('mean_path_length_um', data.get('mean_path_length'))
+        mean_path_str = f"{mean_path_val:.2f}" if mean_path_val is not None else "N/A"
+        directionality_val = data.get('mean_directionality')
+        directionality_str = f"{directionality_val:.3f}" if directionality_val is not None else "N/A"
+
+        tracking_table_data = [
+            ['Metric', 'Value', 'Unit'],
+            ['Cells Tracked', f"{cell_count}", ''],
+            ['Mean Velocity', mean_vel_str, 'μm/min'],
+            ['Migration Efficiency', mig_eff_str, ''],
+            ['Mean Directionality', directionality_str, ''],
+            ['Mean Displacement', mean_disp_str, 'μm'],
+            ['Mean Path Length', mean_path_str, 'μm']
+        ]
+        tracking_style_commands = style_commands.copy()
+        tracking_style_commands[0] = ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078D4'))
+        story.append(
+            Table(tracking_table_data, colWidths=[2.5 * inch, 1.5 * inch, 1 * inch], style=tracking_style_commands))
+
+    story.append(PageBreak())
+    story.append(Paragraph('Analysis Plot', h3_style))
+    if info.get('plot_path') and os.path.exists(info['plot_path']):
+        try:
+            story.append(_scaled_image(info['plot_path'], REPORT_IMAGE_WIDTH_IN, 4.5))
+        except Exception as e:
+            logger.warning(f"Error adding plot to PDF: {e}")
+    tracking_plot_file = data.get('trajectory_plot', data.get('trajectories_plot'))
+    if tracking_plot_file and os.path.exists(tracking_plot_file):
+        story.append(Spacer(1, 0.2 * inch))
+        story.append(Paragraph('Cell Trajectories', h3_style))
+        try:
+            story.append(_scaled_image(tracking_plot_file, REPORT_IMAGE_WIDTH_IN, 4.5))
+        except Exception as e:
+            logger.warning(f"Error adding trajectory plot to PDF: {e}")
+
+    doc.build(story)
+    return pdf_buffer.getvalue()
+
+
+def _render_to_file(info: Dict) -> str:
+    """Worker entry point: render and atomically write the cached report; drop older versions."""
+    path = report_path(info)
+    if os.path.exists(path):
+        return path
+    pdf = build_report_pdf(info)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+    for old in glob.glob(os.path.join(os.path.dirname(path), f"{glob.escape(_file_stem(info))}_report_*.pdf")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
+
+
+# ----------------- Web process side -----------------
+def _get_pool_locked() -> ProcessPoolExecutor:
+    """The report pool, created on first use; the caller holds _pool_lock."""
+    global _pool
+    if _pool is None:
+        ctx = multiprocessing.get_context('spawn')
+        _pool = ProcessPoolExecutor(max_workers=Config.REPORT_WORKERS, mp_context=ctx)
+    return _pool
+
+
+def _submit(info: Dict, submit: Optional[Callable[..., Future]] = None) -> Future:
+    """
+    Render through submit(fn, *args) (default: the report pool), sharing one in-flight
+    render per report file. The lookup, submit and registration happen under one lock,
+    so concurrent callers never start the same render twice.
+    """
+    global _pool
+    path = report_path(info)
+    broken = None
+    with _pool_lock:
+        future = _inflight.get(path)
+        if future is not None:
+            return future
+        if submit is not None:
+            future = submit(_render_to_file, info)
+        else:
+            try:
+                future = _get_pool_locked().submit(_render_to_file, info)
+            except BrokenProcessPool:
+                broken, _pool = _pool, None
+                future = _get_pool_locked().submit(_render_to_file, info)
+        _inflight[path] = future
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+    # Outside the lock: a future that is already done runs the callback right here
+    future.add_done_callback(lambda f: _forget(path, f, own_pool=submit is None))
+    return future
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _forget(path: str, future: Future, own_pool: bool = True):
+    with _pool_lock:
+        if _inflight.get(path) is future:
+            del _inflight[path]
+    exc = None if future.cancelled() else future.exception()
+    if exc is not None:
+        logger.error(f"Report rendering failed for {path}: {exc}")
+        if own_pool and isinstance(exc, BrokenProcessPool):
+            _discard_pool()  # the next render restarts it
+
+
+def ensure_report(info: Dict) -> str:
+    """Path of the up-to-date report, rendering it first if needed. Raises on failure."""
+    return cached_report(info) or _submit(info).result()
+
+
+def schedule(info: Dict, submit: Optional[Callable[..., Future]] = None):
+    """
+    Start rendering a report in the background (no-op if it is already cached), through
+    submit(fn, *args) if given, else on the report pool.
+    """
+    if cached_report(info) is None:
+        _submit(info, submit)
+
+
+def render_many(infos: List[Dict], timeout: Optional[float] = None) -> List[Optional[str]]:
+    """Render several reports in parallel. Returns their paths, None where rendering failed."""
+    futures = [None if cached_report(i) else _submit(i) for i in infos]
+    wait([f for f in futures if f is not None], timeout=timeout)
+    paths = []
+    for info, future in zip(infos, futures):
+        if future is None:
+            paths.append(report_path(info))
+        elif future.done() and not future.cancelled() and future.exception() is None:
+            paths.append(future.result())
+        else:
+            paths.append(None)
+    return paths
+
+
+def shutdown():
+    _discard_pool()
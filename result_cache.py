@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+result_cache.py
+
+Content-addressed cache of analysis results.
+
+- Key: sha256 over (input content hash, PIPELINE_VERSION, normalized analysis parameters).
+  Sample IDs and upload UUIDs are not part of the key, so re-uploading the same plate
+  with the same settings maps to the existing result.
+- Entries live in the `result_cache` table and point at a result id; deleting a result
+  drops its entries, and lookups drop entries whose result has disappeared.
+- evict() trims entries by Config.RESULT_CACHE_POLICY ('lru', 'lfu', 'fifo'), entry
+  count and age. Results themselves are never deleted by eviction, but a result left
+  without entries loses its cached preprocessed frames (cache/frames.npy), the bulk of
+  size_bytes. Re-analysis then segments from the original images.
+- prune_expired() drops the cached frames of runs older than
+  Config.INTERMEDIATE_FRAMES_MAX_AGE_DAYS. It checks every cataloged result, so it runs
+  from this CLI (e.g. a daily cron job), never after each analysis.
+
+Usage:
+  python result_cache.py --evict         # apply the configured eviction policy now
+  python result_cache.py --prune-frames  # drop cached frames of expired runs
+"""
+import argparse
+import hashlib
+import json
+import os
+import logging
+from typing import Dict, Optional
+
+import database
+import intermediates
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a pipeline change alters results for identical inputs and parameters.
+PIPELINE_VERSION = '1'
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def cache_params(params: Dict, filename: str = '') -> Dict:
+    """The analysis parameters that determine the result, normalized for hashing."""
+    normalized = {
+        'disk_size': int(params.get('disk_size') or 0),
+        'time_interval': round(float(params.get('time_interval', 0.25)), 9),
+        'pixel_scale': round(float(params.get('pixel_scale', 1.0)), 9),
+        'track_cells': bool(params.get('track_cells', True)),
+        'visualize': bool(params.get('visualize', True)),
+    }
+    if filename.lower().endswith(VIDEO_EXTENSIONS):
+        normalized['frame_interval'] = int(params.get('frame_interval') or 5)  # decides which frames are sampled
+    return normalized
+
+
+def cache_key(input_sha256: str, params: Dict) -> str:
+    payload = json.dumps({'input': input_sha256, 'pipeline': PIPELINE_VERSION, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(input_sha256: Optional[str], params: Dict) -> Optional[str]:
+    """Result id cached for this input and parameters, or None."""
+    if not Config.RESULT_CACHE_ENABLED or not input_sha256:
+        return None
+    key = cache_key(input_sha256, params)
+    entry = database.get_cached_result(key)
+    if entry is None:
+        return None
+    if database.get_catalog_entry(entry['result_id']) is None:
+        database.delete_cached_results(cache_key=key)  # result was removed behind our back
+        return None
+    logger.info(f"Result cache hit: {entry['result_id']} (key {key[:12]})")
+    return entry['result_id']
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def store(input_sha256: Optional[str], params: Dict, result_id: str, output_dir: str):
+    """Remember result_id for this input and parameters, then apply the eviction policy."""
+    if not Config.RESULT_CACHE_ENABLED or not input_sha256:
+        return
+    database.put_cached_result(cache_key(input_sha256, params), input_sha256, PIPELINE_VERSION, params,
+                               result_id, _dir_size(output_dir))
+    evict()
+
+
+def _result_dir(result_id: str) -> Optional[str]:
+    base = os.path.abspath(Config.RESULTS_FOLDER)
+    path = os.path.abspath(os.path.join(base, result_id))
+    return path if path.startswith(base + os.sep) else None
+
+
+def evict() -> int:
+    removed, orphaned = database.evict_result_cache(Config.RESULT_CACHE_POLICY,
+                                                    max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+                                                    max_age_sec=Config.RESULT_CACHE_MAX_AGE_DAYS * 86400)
+    if removed:
+        logger.info(f"Evicted {removed} result cache entr{'y' if removed == 1 else 'ies'} ({Config.RESULT_CACHE_POLICY}).")
+    freed = 0
+    for result_id in orphaned:
+        output_dir = _result_dir(result_id)
+        if output_dir:
+            freed += intermediates.prune_frames(output_dir)
+    if freed:
+        logger.info(f"Pruned {freed / 1e6:.1f} MB of cached frames.")
+    return removed
+
+
+def prune_expired() -> int:
+    """Drop cached frames of runs older than INTERMEDIATE_FRAMES_MAX_AGE_DAYS. Returns the bytes freed."""
+    if not Config.INTERMEDIATE_FRAMES_MAX_AGE_DAYS:
+        return 0
+    output_dirs = filter(None, (_result_dir(result_id) for result_id in database.get_catalog_ids()))
+    freed = intermediates.prune_expired_frames(output_dirs, Config.INTERMEDIATE_FRAMES_MAX_AGE_DAYS * 86400)
+    if freed:
+        logger.info(f"Pruned {freed / 1e6:.1f} MB of expired cached frames.")
+    return freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the analysis result cache")
+    parser.add_argument('--evict', action='store_true', help='Apply the configured eviction policy now')
+    parser.add_argument('--prune-frames', action='store_true',
+                        help='Drop cached frames of runs older than INTERMEDIATE_FRAMES_MAX_AGE_DAYS')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    database.create_table()
+    if args.evict:
+        print(f"Removed: {evict()}")
+    if args.prune_frames:
+        print(f"Freed: {prune_expired() / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
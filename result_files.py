@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+result_files.py
+
+HTTP delivery of the files under RESULTS_FOLDER (gallery images, videos, plots, CSVs).
+
+- Strong ETags from the file's mtime (ns) and size; conditional GETs get 304.
+- URLs carrying a ?v= token (the result's summary mtime, which changes on every run or
+  re-analysis) name an immutable version and are cached for a year; unversioned URLs
+  are served with no-cache, i.e. revalidated by ETag.
+- Byte-range requests (video seeking) are answered with 206 by werkzeug's conditional
+  responses; Accept-Ranges is always advertised.
+- JSON/CSV assets can have precompressed .br/.gz siblings, written by precompress_tree
+  after each analysis and served when the client accepts the encoding. Brotli is optional.
+"""
+import gzip
+import mimetypes
+import os
+import shutil
+import logging
+from typing import Optional, Tuple
+
+from flask import send_file
+
+logger = logging.getLogger(__name__)
+
+# Optional brotli support
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except Exception:
+    BROTLI_AVAILABLE = False
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PRECOMPRESS_EXTENSIONS = ('.json', '.csv')
+PRECOMPRESS_MIN_SIZE = 1024
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def version_token(mtime: Optional[float]) -> Optional[str]:
+    """URL version token for assets of a result whose summary has this mtime."""
+    return f'{int(mtime * 1000):x}' if mtime else None
+
+
+def strong_etag(st: os.stat_result, encoding: Optional[str] = None) -> str:
+    tag = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+    return f'{tag}-{encoding}' if encoding else tag
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    """True if an Accept-Encoding header allows `coding` (listed with q > 0)."""
+    for part in (accept_encoding or '').split(','):
+        name, *params = part.strip().split(';')
+        if name.strip().lower() != coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        return q > 0
+    return False
+
+
+def pick_variant(path: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+    """
+    The file to send for `path`: a precompressed sibling the client accepts and that is
+    at least as new as the original, else the original. Returns (path, content_encoding).
+    """
+    if not path.endswith(PRECOMPRESS_EXTENSIONS):
+        return path, None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+    for coding, suffix in ENCODING_SUFFIXES:
+        if not _accepts(accept_encoding, coding):
+            continue
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= mtime:
+                return path + suffix, coding
+        except OSError:
+            continue
+    return path, None
+
+
+def send_result(path: str, mimetype: Optional[str] = None, accept_encoding: str = '', versioned: bool = False):
+    """send_file with strong ETag, conditional/range handling and the cache policy above."""
+    variant, coding = pick_variant(path, accept_encoding)
+    st = os.stat(variant)
+    rv = send_file(variant, mimetype=mimetype or mimetypes.guess_type(path)[0], conditional=True,
+                   etag=strong_etag(st, coding), last_modified=st.st_mtime,
+                   max_age=IMMUTABLE_MAX_AGE if versioned else None)
+    if coding:
+        rv.headers['Content-Encoding'] = coding
+    if path.endswith(PRECOMPRESS_EXTENSIONS):
+        rv.vary.add('Accept-Encoding')
+    if versioned:
+        rv.cache_control.immutable = True
+    rv.headers['Accept-Ranges'] = 'bytes'
+    return rv
+
+
+def precompress(path: str) -> int:
+    """Write .gz (and .br if brotli is installed) next to path. Returns the number written."""
+    written = 0
+    tmp = path + '.gz.tmp'
+    with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=9) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, path + '.gz')
+    written += 1
+    if BROTLI_AVAILABLE:
+        with open(path, 'rb') as f:
+            data = brotli.compress(f.read(), quality=11)
+        tmp = path + '.br.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path + '.br')
+        written += 1
+    return written
+
+
+def precompress_tree(output_dir: str) -> int:
+    """Precompress every JSON/CSV asset under one experiment's output directory."""
+    count = 0
+    for root, dirs, files in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if d != 'cache']
+        for name in files:
+            path = os.path.join(root, name)
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            try:
+                if os.path.getsize(path) >= PRECOMPRESS_MIN_SIZE:
+                    count += precompress(path)
+            except OSError as e:
+                logger.warning(f"Could not precompress {path}: {e}")
+    return count
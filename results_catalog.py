@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+results_catalog.py
+
+Resolves the assets of each experiment under RESULTS_FOLDER (summary, timeseries CSV,
+static/interactive plots, video, gallery) and records them in the SQLite catalog, so
+the web app can look results up by id instead of scanning the results tree. The
+per-frame timeseries and per-track kinematics/positions are loaded into the
+`timeseries` and `tracks` tables alongside.
+
+reconcile() imports whole results trees, including ones produced by batch_analysis.py
+by hand or restored from a backup: the tree is walked with os.scandir, summaries whose
+path, mtime and size match the catalog are skipped, the rest are parsed on a process
+pool and written (catalog, experiments table, series) in batched transactions, and
+entries whose summary disappeared are removed. New and re-read experiments are also
+appended to the Parquet analytics store (analytics_store.py), and removed ones are
+marked deleted there.
+
+Usage:
+  python results_catalog.py                  # import/reconcile RESULTS_FOLDER
+  python results_catalog.py --root /path/to/results --workers 8 --list
+  python results_catalog.py --full           # re-read every summary
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import posixpath
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import analytics_store
+import database
+import intermediates
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CONDITION_NAMES = {
+    'MDCK_Control': ('🧬 Epithelial Cells (Baseline)', 'Normal epithelial cells - baseline'),
+    'MDCK_HGF': ('⚡ Epithelial + Growth Factor', 'Epithelial cells treated with HGF/SF'),
+    'DA3_Control': ('🔬 Cancer Cells (Baseline)', 'Cancer cells - baseline'),
+    'DA3_PHA': ('💊 Cancer + Immune Activation', 'Cancer cells with immune activation'),
+    'DA3_HGF': ('🔥 Cancer + Growth Factor', 'Cancer cells with growth factor'),
+    'Uploaded Data': ('📤 Uploaded Data', 'User-uploaded dataset')
+}
+
+
+def _pick_first_existing(cands: List[str]) -> Optional[str]:
+    for c in cands:
+        if c and os.path.exists(c):
+            return c
+    return None
+
+
+def describe_summary(sfile: str, base: str) -> Dict:
+    """
+    Build the catalog entry for one *_summary.json file under the results root `base`.
+    """
+    try:
+        with open(sfile, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except Exception:
+        raw = None
+    summary = raw or {}
+
+    rel = os.path.relpath(sfile, base).replace(os.sep, '/')
+    parts = rel.split('/')
+    default_name = os.path.splitext(parts[-1])[0].replace('_summary', '')
+    if parts[0] == 'uploads' and len(parts) >= 3:
+        result_id = posixpath.join('uploads', parts[1])  # e.g., uploads/uuid
+        condition = 'Uploaded Data'
+        experiment_name = summary.get('experiment', default_name)
+        base_result_dir = os.path.join(base, 'uploads', parts[1])
+    elif len(parts) >= 3:  # e.g., DA3_Control/CIL_43406/csv/DA3_Control_CIL_43406_summary.json
+        condition = parts[0]
+        experiment_name = parts[1]
+        base_result_dir = os.path.join(base, parts[0], experiment_name)
+        result_id = posixpath.join(parts[0], experiment_name)
+    else:
+        condition = 'Unknown'
+        experiment_name = summary.get('experiment', default_name)
+        base_result_dir = os.path.dirname(sfile)
+        result_id = experiment_name
+
+    base_name = summary.get('experiment', default_name)
+
+    plot_path = _pick_first_existing([
+        os.path.join(base_result_dir, 'plots', f'{base_name}_analysis.png'),
+        os.path.join(base_result_dir, 'plots', f'{base_name}.png'),
+        os.path.join(base_result_dir, f'{base_name}.png'),
+    ])
+    csv_path = _pick_first_existing([
+        os.path.join(base_result_dir, 'csv', f'{base_name}_timeseries.csv'),
+        os.path.join(base_result_dir, f'{base_name}.csv'),
+    ])
+    video_path = _pick_first_existing([
+        os.path.join(base_result_dir, 'video', f'{base_name}_analysis_video.mp4'),
+        os.path.join(base_result_dir, 'video', f'{base_name}.mp4'),
+    ])
+    interactive_json_path = _pick_first_existing([
+        os.path.join(base_result_dir, 'plots', f'{base_name}_analysis_interactive.json'),
+    ])
+
+    gallery_dir = os.path.join(base_result_dir, 'gallery')
+    gallery_files = []
+    if os.path.isdir(gallery_dir):
+        for ext in ('*.png', '*.jpg', '*.jpeg'):
+            gallery_files.extend(sorted(glob.glob(os.path.join(gallery_dir, ext))))
+
+    st = os.stat(sfile)
+    return {
+        'id': result_id,
+        'experiment_name': experiment_name,
+        'condition': condition,
+        'summary_path': sfile,
+        'rel_summary_path': rel,
+        'raw_summary': raw,
+        'csv_path': csv_path,
+        'plot_path': plot_path,
+        'interactive_plot_path': interactive_json_path,
+        'video_path': video_path,
+        'gallery': gallery_files,
+        'summary_mtime': st.st_mtime,
+        'summary_size': st.st_size,
+        'result_dir': base_result_dir,
+    }
+
+
+# Timeseries CSV header -> timeseries table column
+TIMESERIES_CSV_COLUMNS = {
+    'time(hours)': 'time_hr',
+    'wound_area(px)': 'area_px',
+    'wound_area(um2)': 'area_um2',
+    'closure_percentage': 'closure_pct',
+}
+# Boolean CSV cells (pandas writes True/False) as the values stored for them
+BOOL_TEXT = {'True': 1.0, 'False': 0.0}
+
+
+def _int_or_none(value):
+    return None if value is None or value != value else int(value)
+
+
+def _float_or_none(text: str):
+    try:
+        return float(text)
+    except ValueError:
+        return BOOL_TEXT.get(text)  # boolean columns as pandas writes them
+
+
+def _csv_columns(path: str, columns) -> Optional[List[list]]:
+    """
+    Float values of the given columns of a small CSV (None where empty or where the column
+    is missing), read with the csv module: per file it is several times cheaper than
+    pandas, which dominates importing thousands of experiments.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        rows = [row for row in reader if row]
+    index = {name: k for k, name in enumerate(header)}
+    out = []
+    for col in columns:
+        k = index.get(col)
+        if k is None:
+            out.append([None] * len(rows))
+        else:
+            out.append([_float_or_none(row[k]) if k < len(row) else None for row in rows])
+    return out
+
+
+def read_experiment_series(entry: Dict) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Per-frame and per-track rows of one catalog entry, in the layout of
+    database.save_experiment_series, read from its timeseries CSV and tracking outputs.
+    """
+    timeseries_rows = []
+    if entry.get('csv_path'):
+        columns = _csv_columns(entry['csv_path'], TIMESERIES_CSV_COLUMNS)
+        if any(value is not None for value in columns[0]):  # has a time(hours) column
+            timeseries_rows = list(zip(range(len(columns[0])), *columns))
+
+    track_rows = []
+    tracking_dir = os.path.join(entry.get('result_dir') or '', 'tracking')
+    kinematics_csv = os.path.join(tracking_dir, 'kinematics.csv')
+    if os.path.exists(kinematics_csv):
+        points = {}
+        traj_npy = os.path.join(tracking_dir, 'trajectories.npy')
+        traj_csv = os.path.join(tracking_dir, 'trajectories.csv')
+        if os.path.exists(traj_npy):
+            records = np.load(traj_npy)
+        elif os.path.exists(traj_csv):
+            traj = pd.read_csv(traj_csv)
+            records = np.empty(len(traj), dtype=[('track_id', '<i4')] + database.TRACK_POINTS_DTYPE.descr)
+            for name in records.dtype.names:
+                records[name] = traj[name].to_numpy()
+        else:
+            records = None
+        if records is not None and len(records):
+            records = records[np.lexsort((records['frame'], records['track_id']))]
+            ids, starts = np.unique(records['track_id'], return_index=True)
+            packed = np.empty(len(records), dtype=database.TRACK_POINTS_DTYPE)
+            for name in database.TRACK_POINTS_DTYPE.names:
+                packed[name] = records[name]
+            for tid, part in zip(ids.tolist(), np.split(packed, starts[1:])):
+                points[tid] = part.tobytes()
+        columns = _csv_columns(kinematics_csv, database.TRACK_COLUMNS)
+        for values in zip(*columns):
+            # track_id, n_points, start_frame, end_frame and the persistence_censored flag are integers
+            row = tuple(_int_or_none(v) for v in values[:4]) + values[4:-1] + (_int_or_none(values[-1]),)
+            track_rows.append(row + (points.get(row[0]),))
+    return timeseries_rows, track_rows
+
+
+def store_experiment_series(entry: Dict) -> Optional[Tuple[List[tuple], List[tuple]]]:
+    """Load one catalog entry's timeseries and tracks into the database; returns them, or None."""
+    try:
+        series = read_experiment_series(entry)
+    except Exception as e:
+        logger.warning(f"Could not read series of '{entry.get('id')}': {e}")
+        return None
+    return series if database.save_experiment_series(entry['id'], *series) else None
+
+
+def find_summary_files(root: str) -> List[str]:
+    return glob.glob(os.path.join(root, '**', '*_summary.json'), recursive=True)
+
+
+# Asset folders inside an experiment directory; they never hold summaries
+ASSET_DIRS = frozenset({intermediates.CACHE_DIR, 'gallery', 'video', 'plots', 'tracking', 'masks'})
+# Summaries per task sent to a parsing process
+IMPORT_CHUNK_SIZE = 32
+
+
+def scan_summary_files(root: str) -> Dict[str, Tuple[float, int]]:
+    """
+    {path: (mtime, size)} of every *_summary.json under root, walked with os.scandir.
+    Asset folders two or more levels down (inside an experiment) and hidden folders are
+    not entered; symlinked folders are followed once.
+    """
+    found = {}
+    seen_links = set()
+    stack = [(root, 0)]
+    while stack:
+        path, depth = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    if item.name.startswith('.'):
+                        continue
+                    if item.is_dir():
+                        if depth >= 2 and item.name in ASSET_DIRS:
+                            continue
+                        if item.is_symlink():
+                            real = os.path.realpath(item.path)
+                            if real in seen_links:
+                                continue
+                            seen_links.add(real)
+                        stack.append((item.path, depth + 1))
+                    elif item.name.endswith('_summary.json'):
+                        st = item.stat()
+                        found[item.path] = (st.st_mtime, st.st_size)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable folder '{path}': {e}")
+    return found
+
+
+def experiment_record(entry: Dict) -> Optional[Dict]:
+    """
+    The experiments-table row of a catalog entry (as the web app records a finished
+    run), or None when it has no readable summary.
+    """
+    summary = entry.get('raw_summary')
+    if not isinstance(summary, dict):
+        return None
+    record = dict(summary)
+    record['experiment_name'] = entry.get('experiment_name') or entry['id']
+    condition = entry.get('condition') or 'Unknown'
+    if condition == 'Uploaded Data':
+        record['condition_name'] = condition
+    else:
+        record['condition_name'] = CONDITION_NAMES.get(condition, (condition,))[0]
+    return record
+
+
+def _read_for_import(sfile: str, base: str, with_series: bool) -> Dict:
+    """Everything the importer writes for one summary file; runs in a pool process."""
+    try:
+        entry = describe_summary(sfile, base)
+    except OSError as e:  # vanished or unreadable since the scan
+        return {'path': sfile, 'error': str(e)}
+    record = {'entry': entry, 'experiment': experiment_record(entry), 'series': None}
+    if with_series:
+        try:
+            record['series'] = read_experiment_series(entry)
+        except Exception as e:
+            logger.warning(f"Could not read series of '{entry['id']}': {e}")
+    return record
+
+
+def _read_chunk(task: Tuple[List[str], str, bool]) -> List[Dict]:
+    sfiles, base, with_series = task
+    return [_read_for_import(sfile, base, with_series) for sfile in sfiles]
+
+
+def _read_all(sfiles: List[str], base: str, with_series: bool, workers: int) -> Iterable[Dict]:
+    """Parsed records of the given summaries, from a process pool when there are many."""
+    chunks = [(sfiles[i:i + IMPORT_CHUNK_SIZE], base, with_series)
+              for i in range(0, len(sfiles), IMPORT_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 2:
+        for chunk in chunks:
+            yield from _read_chunk(chunk)
+        return
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx) as pool:
+        for records in pool.map(_read_chunk, chunks):
+            yield from records
+
+
+def register_output_dir(output_dir: str, results_root: Optional[str] = None) -> List[str]:
+    """
+    Record every summary produced under one experiment's output directory.
+    Returns the catalog ids written.
+    """
+    base = os.path.abspath(results_root or Config.RESULTS_FOLDER)
+    records = []
+    for sfile in find_summary_files(os.path.abspath(output_dir)):
+        entry = describe_summary(sfile, base)
+        database.upsert_catalog_entry(entry)
+        records.append({'entry': entry, 'series': store_experiment_series(entry)})
+    analytics_store.append(records)
+    return [record['entry']['id'] for record in records]
+
+
+def reconcile(results_root: Optional[str] = None, workers: Optional[int] = None, full: bool = False,
+              with_series: bool = True, batch_size: Optional[int] = None) -> Dict:
+    """
+    Bring the catalog, the experiments table and the series tables in line with the
+    results tree. Summaries are re-read only when new or when their path, mtime or size
+    changed (or every one with full=True); entries whose summary is gone are removed.
+
+    Returns a report: counts 'scanned', 'added', 'updated', 'unchanged', 'removed',
+    'failed', 'upserted' (added + updated) and 'seconds', plus 'changes' with the ids
+    added/updated/removed and the summary paths that failed.
+    """
+    started = time.perf_counter()
+    base = os.path.abspath(results_root or Config.RESULTS_FOLDER)
+    workers = workers or Config.IMPORT_WORKERS
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = {'scanned': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0,
+              'upserted': 0, 'seconds': 0.0,
+              'changes': {'added': [], 'updated': [], 'removed': [], 'failed': []}}
+    if not os.path.isdir(base):
+        return report
+
+    found = scan_summary_files(base)
+    report['scanned'] = len(found)
+    known = database.get_catalog_signatures()
+    known_paths = {sig[0]: result_id for result_id, sig in known.items()}
+
+    todo = []
+    for sfile, (mtime, size) in found.items():
+        sig = known.get(known_paths.get(sfile))
+        # Same file as catalogued, and its experiments row exists (or it has no summary to record)
+        if not full and sig and sig[1] == mtime and sig[2] == size and (sig[4] or not sig[3]):
+            report['unchanged'] += 1
+        else:
+            todo.append(sfile)
+
+    seen = {result_id for path, result_id in known_paths.items() if path in found}
+    batch = []
+
+    def flush():
+        if batch and not database.apply_import_batch(batch):
+            report['failed'] += len(batch)
+            report['changes']['failed'].extend(record['entry']['summary_path'] for record in batch)
+        else:
+            analytics_store.append(batch)
+            for record in batch:
+                kind = 'updated' if record['entry']['id'] in known else 'added'
+                report[kind] += 1
+                report['changes'][kind].append(record['entry']['id'])
+        batch.clear()
+
+    for record in _read_all(sorted(todo), base, with_series, workers):
+        if 'error' in record:
+            report['failed'] += 1
+            report['changes']['failed'].append(record['path'])
+            continue
+        seen.add(record['entry']['id'])
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    removed = [result_id for result_id in known if result_id not in seen]
+    for start in range(0, len(removed), batch_size):
+        chunk = removed[start:start + batch_size]
+        if database.apply_import_batch([], chunk):
+            analytics_store.remove(chunk)
+            report['removed'] += len(chunk)
+            report['changes']['removed'].extend(chunk)
+
+    report['upserted'] = report['added'] + report['updated']
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Catalog reconciled in {report['seconds']}s: {report['scanned']} scanned, "
+                f"{report['added']} added, {report['updated']} updated, {report['unchanged']} unchanged, "
+                f"{report['removed']} removed, {report['failed']} failed.")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a results tree into the database (catalog, experiments, series)")
+    parser.add_argument('--root', type=str, default=None, help='Path to results root (default: Config.RESULTS_FOLDER)')
+    parser.add_argument('--workers', type=int, default=None, help='Summary-parsing processes (default: Config.IMPORT_WORKERS)')
+    parser.add_argument('--batch-size', type=int, default=None, help='Entries per transaction (default: Config.IMPORT_BATCH_SIZE)')
+    parser.add_argument('--full', action='store_true', help='Re-read every summary, not only new/changed ones')
+    parser.add_argument('--no-series', action='store_true', help='Skip loading timeseries/tracks')
+    parser.add_argument('--list', action='store_true', help='List the ids that were added, updated or removed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    database.create_table()
+    report = reconcile(args.root, workers=args.workers, full=args.full, with_series=not args.no_series,
+                       batch_size=args.batch_size)
+    print(f"Scanned: {report['scanned']}  Added: {report['added']}  Updated: {report['updated']}  "
+          f"Unchanged: {report['unchanged']}  Removed: {report['removed']}  Failed: {report['failed']}  "
+          f"({report['seconds']}s)")
+    if args.list:
+        for kind in ('added', 'updated', 'removed', 'failed'):
+            for item in report['changes'][kind]:
+                print(f"  {kind:8s} {item}")
+
+
+if __name__ == '__main__':
+    main()
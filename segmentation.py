@@ -5,11 +5,15 @@ from skimage.filters.rank import entropy
 from skimage.morphology import disk, binary_closing, binary_opening, remove_small_objects
 from typing import Tuple
 
-def apply_entropy_filter(image: np.ndarray, disk_size: int = 10) -> np.ndarray:
+def _as_uint8(image: np.ndarray) -> np.ndarray:
     if image.max() <= 1.0:
-        image_uint8 = (image * 255).astype(np.uint8)
-    else:
-        image_uint8 = image.astype(np.uint8)
+        return (image * 255).astype(np.uint8)
+    return image.astype(np.uint8)
+
+def apply_entropy_filter(image: np.ndarray, disk_size: int = 10) -> np.ndarray:
+    return entropy_from_uint8(_as_uint8(image), disk_size=disk_size)
+
+def entropy_from_uint8(image_uint8: np.ndarray, disk_size: int = 10) -> np.ndarray:
     entropy_img = entropy(image_uint8, disk(disk_size))
     entropy_img = entropy_img.astype(np.float32)
     if entropy_img.max() > entropy_img.min():
@@ -42,12 +46,15 @@ def detect_wound_contours(binary_mask: np.ndarray) -> Tuple[list, np.ndarray]:
 def calculate_wound_area(binary_mask: np.ndarray) -> int:
     return np.sum(binary_mask)
 
-def segment_wound_from_array(image: np.ndarray, disk_size: int = 10, apply_morph: bool = True) -> Tuple[np.ndarray, int]:
+def preprocess_for_segmentation(image: np.ndarray) -> np.ndarray:
+    """Normalized, blurred uint8 frame fed to the entropy filter. Does not depend on disk_size."""
     from preprocessing import normalize_intensity, apply_gaussian_blur
     if image.max() > 1.0:
         image = normalize_intensity(image)
-    image = apply_gaussian_blur(image)
-    entropy_img = apply_entropy_filter(image, disk_size=disk_size)
+    return _as_uint8(apply_gaussian_blur(image))
+
+def segment_wound_from_preprocessed(image_uint8: np.ndarray, disk_size: int = 10, apply_morph: bool = True) -> Tuple[np.ndarray, int]:
+    entropy_img = entropy_from_uint8(image_uint8, disk_size=disk_size)
     binary_mask, _ = otsu_threshold(entropy_img)
     wound_mask = ~binary_mask
     if apply_morph:
@@ -55,6 +62,9 @@ def segment_wound_from_array(image: np.ndarray, disk_size: int = 10, apply_morph
     wound_area = calculate_wound_area(wound_mask)
     return wound_mask, wound_area
 
+def segment_wound_from_array(image: np.ndarray, disk_size: int = 10, apply_morph: bool = True) -> Tuple[np.ndarray, int]:
+    return segment_wound_from_preprocessed(preprocess_for_segmentation(image), disk_size=disk_size, apply_morph=apply_morph)
+
 def segment_wound(image_path: str, disk_size: int = 10, normalize: bool = True, apply_morph: bool = True) -> Tuple[np.ndarray, int]:
     from preprocessing import load_and_preprocess_image
     original, processed = load_and_preprocess_image(image_path, normalize=normalize, blur=True)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+significance.py
+
+Pairwise comparisons between conditions for the statistics tab, computed for all
+pairs at once rather than by filtering the experiments table per pair.
+
+- Welch t-test from per-condition moments (n, mean, M2; see database.condition_stats),
+  vectorized over every pair.
+- Mann-Whitney U test on the raw values, each group sorted once.
+- Permutation test on the difference of means: one B x N resampling matrix per
+  metric (N = the largest pair size) is drawn once and reused by every pair. The cost
+  is bounded: pairs larger than max_pair_size are skipped (NaN; the asymptotic Welch
+  and Mann-Whitney tests are accurate there), and the number of resamples is lowered so
+  that resamples x N x (number of tested pairs) stays within max_work.
+- Multiple-testing correction over all pairs of a metric and test ('holm', 'fdr_bh',
+  'bonferroni' or 'none').
+"""
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+logger = logging.getLogger(__name__)
+
+CORRECTION_METHODS = ('holm', 'fdr_bh', 'bonferroni', 'none')
+
+
+def pair_indices(k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Index arrays (i, j), i < j, of all pairs among k groups."""
+    return np.triu_indices(k, 1)
+
+
+def welch_from_moments(n: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided Welch t-test for every pair of groups given their sizes, means and sums of
+    squared deviations. Returns (t, p) over pair_indices(len(n)); NaN where a group has
+    fewer than 2 values or both variances are 0 (as scipy.stats.ttest_ind).
+    """
+    n = np.asarray(n, dtype=float)
+    mean = np.asarray(mean, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_n = np.where(n >= 2, np.asarray(m2, dtype=float) / (n - 1), np.nan) / n
+        i, j = pair_indices(len(n))
+        se2 = var_n[i] + var_n[j]
+        t = (mean[i] - mean[j]) / np.sqrt(se2)
+        dof = se2 ** 2 / (var_n[i] ** 2 / (n[i] - 1) + var_n[j] ** 2 / (n[j] - 1))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+    return t, p
+
+
+def _sorted_with_ties(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted values and, per value, how often it occurs in the group."""
+    ordered = np.sort(values)
+    _, inverse, counts = np.unique(ordered, return_inverse=True, return_counts=True)
+    return ordered, counts[inverse]
+
+
+def mann_whitney(groups: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Two-sided Mann-Whitney U p-value for every pair of groups (normal approximation with
+    tie and continuity correction, as scipy's method='asymptotic'); NaN if either group
+    is empty, 1 if all values are tied.
+
+    Each group is sorted once; per pair, U and the tie term of the pooled sample come from
+    one searchsorted of one group into the other, so a pair costs O(n log n) without ranking
+    the pooled values.
+    """
+    i, j = pair_indices(len(groups))
+    p = np.full(len(i), np.nan)
+    prepared = [_sorted_with_ties(np.asarray(g, dtype=float)) for g in groups]
+    # sum over tied values of (t^3 - t) within each group
+    tie_terms = [float((ties.astype(float) ** 2 - 1).sum()) for _, ties in prepared]
+    for k, (a, b) in enumerate(zip(i, j)):
+        (sa, ta), (sb, _) = prepared[a], prepared[b]
+        n1, n2 = len(sa), len(sb)
+        if n1 == 0 or n2 == 0:
+            continue
+        below = np.searchsorted(sb, sa, side='left')
+        equal = np.searchsorted(sb, sa, side='right') - below
+        u1 = below.sum() + 0.5 * equal.sum()
+        # Pooled tie term: (ta + tb)^3 - (ta + tb) summed over values, expanded into
+        # the per-group terms plus cross terms over the values shared by both groups
+        ties = tie_terms[a] + tie_terms[b] + 3.0 * (ta * equal).sum() + 3.0 * (equal.astype(float) ** 2).sum()
+        n = n1 + n2
+        sigma = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))))
+        if sigma == 0:
+            p[k] = 1.0
+            continue
+        u = max(u1, n1 * n2 - u1)
+        z = (u - n1 * n2 / 2.0 - 0.5) / sigma
+        p[k] = min(1.0, 2 * stats.norm.sf(z))
+    return p
+
+
+def permutation_test(groups: Sequence[np.ndarray], resamples: int = 2000, seed: int = 0,
+                     max_pair_size: int = 200, max_work: int = 20_000_000,
+                     min_resamples: int = 200) -> np.ndarray:
+    """
+    Two-sided permutation p-value of the difference of means for every pair of groups.
+
+    A single (resamples x N) matrix of random permutations of range(N) is drawn, N being the
+    largest tested pair size. For a pair of size m, the entries < m of each row, in order, are
+    a uniform random permutation of range(m), so every pair reuses the same matrix. The
+    p-value is (1 + #{|d*| >= |d|}) / (1 + resamples).
+
+    Pairs with more than max_pair_size values are not tested (NaN). resamples is reduced so
+    that resamples x N x (number of tested pairs) <= max_work; if that leaves fewer than
+    min_resamples, no pair is tested.
+    """
+    i, j = pair_indices(len(groups))
+    p = np.full(len(i), np.nan)
+    sizes = np.array([len(g) for g in groups])
+    if len(i) == 0:
+        return p
+    pair_sizes = sizes[i] + sizes[j]
+    tested = (sizes[i] > 0) & (sizes[j] > 0) & (pair_sizes <= max_pair_size)
+    if not tested.any():
+        return p
+    size = int(pair_sizes[tested].max())
+    if size < 2:
+        return p
+    # Every tested pair scans the whole matrix once (perms < m)
+    resamples = min(resamples, max_work // (size * int(tested.sum())))
+    if resamples < min_resamples:
+        logger.info(f"Permutation test skipped: {int(tested.sum())} pairs of up to {size} values exceed the work budget")
+        return p
+    rng = np.random.default_rng(seed)
+    perms = np.argsort(rng.random((resamples, size)), axis=1)
+    for k, (a, b) in enumerate(zip(i, j)):
+        if not tested[k]:
+            continue
+        n1, n2 = sizes[a], sizes[b]
+        m = n1 + n2
+        pooled = np.concatenate([groups[a], groups[b]])
+        order = perms[perms < m].reshape(resamples, m) if m < size else perms
+        first = pooled[order[:, :n1]].sum(axis=1)
+        total = pooled.sum()
+        diffs = first / n1 - (total - first) / n2
+        observed = groups[a].mean() - groups[b].mean()
+        # Tolerance so resamples equal to the observed split are counted despite rounding
+        tol = 1e-12 * max(1.0, abs(observed))
+        p[k] = (1 + np.count_nonzero(np.abs(diffs) >= abs(observed) - tol)) / (1 + resamples)
+    return p
+
+
+def adjust_pvalues(p: np.ndarray, method: str = 'holm') -> np.ndarray:
+    """Multiple-testing adjusted p-values; NaNs are left out of the family and stay NaN."""
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Unknown correction method '{method}'")
+    p = np.asarray(p, dtype=float)
+    adjusted = np.full_like(p, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    m = len(valid)
+    if m == 0 or method == 'none':
+        adjusted[valid] = p[valid]
+        return adjusted
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(p[valid] * m, 1.0)
+        return adjusted
+    order = valid[np.argsort(p[valid], kind='stable')]
+    ranked = p[order]
+    if method == 'holm':
+        values = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:  # fdr_bh
+        values = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    adjusted[order] = np.minimum(values, 1.0)
+    return adjusted
+
+
+def pairwise_tests(conditions: List[str], moments: Dict[str, np.ndarray], groups: List[np.ndarray],
+                   correction: str = 'holm', resamples: int = 2000, max_pair_size: int = 200,
+                   max_work: int = 20_000_000) -> Dict[str, np.ndarray]:
+    """
+    All tests for one metric. `moments` holds arrays 'n', 'mean', 'm2' aligned with
+    `conditions`, `groups` the raw values per condition. Returns arrays over
+    pair_indices(len(conditions)): welch_t, welch_p, welch_p_adj, mw_p, mw_p_adj,
+    perm_p, perm_p_adj (NaN for pairs the permutation test skipped).
+    """
+    t, p = welch_from_moments(moments['n'], moments['mean'], moments['m2'])
+    mw = mann_whitney(groups)
+    perm = permutation_test(groups, resamples=resamples, max_pair_size=max_pair_size, max_work=max_work) \
+        if resamples else np.full(len(p), np.nan)
+    return {
+        'welch_t': t, 'welch_p': p, 'welch_p_adj': adjust_pvalues(p, correction),
+        'mw_p': mw, 'mw_p_adj': adjust_pvalues(mw, correction),
+        'perm_p': perm, 'perm_p_adj': adjust_pvalues(perm, correction),
+    }
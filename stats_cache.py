@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+stats_cache.py
+
+Materialized results derived from the `experiments` table (per-condition aggregates,
+p-values, Plotly figure JSON for the statistics tab).
+
+- Every write to `experiments` bumps its generation counter in the same transaction
+  (database.upsert_experiment / delete_experiment).
+- register(name, build) declares a payload; get(name) returns the newest one available:
+  from this process's memo, else from the `materialized_stats` table (shared by all app
+  processes). A payload older than the current generation is still served while a
+  background thread rebuilds it; only the very first build runs on the request path.
+- refresh() starts those rebuilds right after a write (e.g. from the job thread that
+  recorded a result), so the next page load usually finds the new payload stored.
+- A page load with nothing changed costs one single-row SELECT.
+"""
+import threading
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import database
+
+logger = logging.getLogger(__name__)
+
+_builders: Dict[str, Callable[[], dict]] = {}
+_memo: Dict[str, Tuple[int, dict]] = {}
+_lock = threading.Lock()
+_building = set()   # names with a background rebuild running
+_dirty = set()      # names written again while their rebuild was running
+
+
+def register(name: str, build: Callable[[], dict]):
+    """Declare the builder of the materialized payload `name`."""
+    _builders[name] = build
+
+
+def _build(name: str) -> Tuple[int, dict]:
+    # The generation is read first: rows written while building get a newer generation,
+    # so the payload is never served for a generation it does not cover.
+    generation = database.get_table_generation('experiments')
+    payload = _builders[name]()
+    database.put_materialized_stats(name, generation, payload)
+    logger.info(f"Rebuilt materialized stats '{name}' at generation {generation}")
+    return generation, payload
+
+
+def _rebuild_loop(name: str):
+    while True:
+        try:
+            generation, payload = _build(name)
+            with _lock:
+                cached = _memo.get(name)
+                if not cached or cached[0] <= generation:
+                    _memo[name] = (generation, payload)
+        except Exception as e:
+            logger.error(f"Background rebuild of '{name}' failed: {e}", exc_info=True)
+        with _lock:
+            if name not in _dirty:
+                _building.discard(name)
+                return
+            _dirty.discard(name)
+
+
+def _schedule(name: str):
+    """Rebuild `name` in a background thread; coalesces requests made while one runs."""
+    with _lock:
+        if name in _building:
+            _dirty.add(name)
+            return
+        _building.add(name)
+    threading.Thread(target=_rebuild_loop, args=(name,), name=f'stats-{name}', daemon=True).start()
+
+
+def refresh(name: Optional[str] = None):
+    """Start background rebuilds of `name` (default: every registered payload) after a write."""
+    for key in ([name] if name else list(_builders)):
+        _schedule(key)
+
+
+def get(name: str) -> dict:
+    """The materialized payload `name`: current if available, else the last one built."""
+    generation = database.get_table_generation('experiments')
+    if generation < 0:  # generation unavailable: do not cache
+        return _builders[name]()
+    cached = _memo.get(name)
+    if cached and cached[0] == generation:
+        return cached[1]
+    stored = database.get_materialized_stats(name)
+    if stored and (not cached or stored[0] > cached[0]):
+        cached = stored
+        with _lock:
+            _memo[name] = stored
+    if cached:
+        if cached[0] < generation:
+            _schedule(name)
+        return cached[1]
+    # Nothing materialized yet: build once on the request path
+    with _lock:
+        cached = _memo.get(name)
+        if cached:
+            return cached[1]
+        _memo[name] = _build(name)
+        return _memo[name][1]
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+uploads.py
+
+Chunked, resumable uploads and background ingestion of uploaded datasets.
+
+Protocol (offsets are byte positions in the uploaded file):
+  POST /api/uploads            {filename, size, sha256?, frame_interval?} -> {upload_id, offset}
+  PUT  /api/uploads/<id>       body = next chunk, header Upload-Offset: <offset>
+                               optional header Upload-Checksum: sha256 <hex of this chunk>
+  HEAD /api/uploads/<id>       -> Upload-Offset header (resume point after a dropped connection)
+
+The partial file on disk is the source of truth for the offset, so any web process can
+accept the next chunk. Chunks are appended under an exclusive file lock. A chunk whose
+checksum does not match is truncated away and must be resent. Each process keeps a running
+sha256 of the uploads whose chunks it received in order; when it receives the last chunk
+too, the content hash is recorded on completion and ingestion does not re-read the file.
+
+Decoding (ZIP extraction, video frame sampling, multi-page TIFF splitting) is not done in
+the request: ingest_upload runs as the first stage of the analysis job. It records the
+sha256 of the uploaded bytes (the result-cache input key); an upload whose bytes match an
+earlier decoded upload reuses that upload's frames instead of storing a second copy.
+"""
+import os
+import fcntl
+import glob
+import hashlib
+import shutil
+import threading
+import zipfile
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+from PIL import Image, ImageSequence
+from werkzeug.utils import secure_filename
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK = 1024 * 1024
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+MULTIFRAME_EXTENSIONS = ('.tif', '.tiff', '.gif')
+
+# upload id -> (bytes hashed, running sha256 of the file so far), for chunks seen by this process
+_running_digests: Dict[str, Tuple[int, 'hashlib._Hash']] = {}
+_digests_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Upload protocol error; status_code is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def upload_dir(upload_id: str) -> str:
+    return os.path.join(Config.UPLOAD_FOLDER, upload_id)
+
+
+def raw_path(upload: dict) -> str:
+    """Final location of the uploaded file (before ingestion)."""
+    return os.path.join(upload_dir(upload['id']), upload['filename'])
+
+
+def part_path(upload: dict) -> str:
+    return raw_path(upload) + '.part'
+
+
+def current_offset(upload: dict) -> int:
+    if upload['status'] != 'uploading':
+        return upload['size']
+    try:
+        return os.path.getsize(part_path(upload))
+    except OSError:
+        return 0
+
+
+def create_session(upload_id: str, filename: str, size: int, frame_interval: int = 5,
+                   sha256: Optional[str] = None) -> dict:
+    filename = secure_filename(filename or '')
+    if not filename:
+        raise UploadError('A filename is required')
+    if size <= 0:
+        raise UploadError('size must be a positive number of bytes')
+    if size > Config.MAX_UPLOAD_SIZE:
+        raise UploadError(f'Upload exceeds the {Config.MAX_UPLOAD_SIZE} byte limit', 413)
+
+    os.makedirs(upload_dir(upload_id), exist_ok=True)
+    upload = database.create_upload(upload_id, filename, size, frame_interval,
+                                    sha256.lower() if sha256 else None)
+    if upload is None:
+        raise UploadError('Could not create upload session', 500)
+    open(part_path(upload), 'ab').close()
+    return upload
+
+
+def _parse_checksum(header: Optional[str]) -> Optional[str]:
+    if not header:
+        return None
+    algo, _, digest = header.strip().partition(' ')
+    if algo.lower() != 'sha256' or not digest:
+        raise UploadError('Upload-Checksum must be "sha256 <hex digest>"')
+    return digest.strip().lower()
+
+
+def append_chunk(upload: dict, offset: int, stream, length: Optional[int], checksum_header: Optional[str] = None) -> int:
+    """
+    Append one chunk read from `stream` at byte `offset`. Returns the new offset.
+    Marks the upload 'complete' when the last byte has arrived.
+    """
+    if upload['status'] != 'uploading':
+        raise UploadError('Upload is already complete', 409, offset=upload['size'])
+    expected_digest = _parse_checksum(checksum_header)
+
+    path = part_path(upload)
+    with open(path, 'ab') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            start = f.seek(0, os.SEEK_END)
+            if offset != start:
+                raise UploadError('Upload-Offset does not match the bytes received so far', 409, offset=start)
+            if length is not None and start + length > upload['size']:
+                raise UploadError('Chunk runs past the declared upload size', 413, offset=start)
+
+            with _digests_lock:
+                hashed, running = _running_digests.get(upload['id'], (0, None))
+            # Continue the file hash only if this process hashed every byte before this chunk
+            running = hashlib.sha256() if start == 0 else (running.copy() if running and hashed == start else None)
+            digest = hashlib.sha256()
+            written = 0
+            while True:
+                block = stream.read(READ_BLOCK)
+                if not block:
+                    break
+                written += len(block)
+                if start + written > upload['size']:
+                    f.truncate(start)
+                    raise UploadError('Chunk runs past the declared upload size', 413, offset=start)
+                digest.update(block)
+                if running is not None:
+                    running.update(block)
+                f.write(block)
+            f.flush()
+
+            if expected_digest and digest.hexdigest() != expected_digest:
+                f.truncate(start)
+                raise UploadError('Chunk checksum mismatch; resend from Upload-Offset', 460, offset=start)
+            new_offset = start + written
+            with _digests_lock:
+                if running is not None:
+                    _running_digests[upload['id']] = (new_offset, running)
+                else:
+                    _running_digests.pop(upload['id'], None)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    if new_offset == upload['size']:
+        with _digests_lock:
+            _, running = _running_digests.pop(upload['id'], (0, None))
+        os.replace(path, raw_path(upload))
+        if running is not None:
+            database.set_upload_content(upload['id'], running.hexdigest())
+        database.set_upload_status(upload['id'], 'complete')
+    return new_offset
+
+
+def save_stream(stream, path: str) -> str:
+    """Write a file-like object to path, hashing it on the way. Returns the sha256 hex digest."""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for block in iter(lambda: stream.read(READ_BLOCK), b''):
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def has_frames(directory: str) -> bool:
+    with os.scandir(directory) as it:
+        return any(e.is_file() and not e.name.endswith('.part') for e in it)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _flatten_single_subdir(input_dir: str):
+    items = os.listdir(input_dir)
+    if len(items) == 1 and os.path.isdir(os.path.join(input_dir, items[0])) and items[0] != "__MACOSX":
+        sub_dir = os.path.join(input_dir, items[0])
+        for item in os.listdir(sub_dir):
+            shutil.move(os.path.join(sub_dir, item), input_dir)
+        os.rmdir(sub_dir)
+
+
+def ingest_upload(upload: dict, on_frame: Optional[Callable[[int, int], None]] = None) -> dict:
+    """
+    Hash the uploaded file (checking the declared sha256, if any) and decode it into frames
+    in the upload directory: extract ZIPs, sample every `frame_interval`-th video frame,
+    split multi-page TIFF/GIF. If identical bytes were already decoded for another upload,
+    the raw file is dropped and that upload's frames are shared instead.
+    Returns {'items', 'content_sha256', 'source_upload_id'}.
+    """
+    input_dir = upload_dir(upload['id'])
+    path = raw_path(upload)
+    name = upload['filename'].lower()
+    if not os.path.exists(path):
+        raise UploadError(f"Uploaded file {upload['filename']} is missing", 404)
+
+    content_sha256 = upload.get('content_sha256') or file_sha256(path)  # hashed while uploading when possible
+    if upload.get('sha256') and content_sha256 != upload['sha256']:
+        raise UploadError(f"Checksum mismatch for {upload['filename']} (got {content_sha256})", 422)
+
+    source = database.find_ingested_upload(content_sha256, exclude_id=upload['id'])
+    if source and name.endswith(VIDEO_EXTENSIONS) and source['frame_interval'] != upload['frame_interval']:
+        source = None  # same video, different frame sampling
+    if source and os.path.isdir(upload_dir(source['id'])) and has_frames(upload_dir(source['id'])):
+        os.remove(path)
+        database.set_upload_content(upload['id'], content_sha256, source_upload_id=source['id'])
+        logger.info(f"Upload {upload['id']} duplicates {source['id']}; sharing its frames.")
+        return {'items': 0, 'content_sha256': content_sha256, 'source_upload_id': source['id']}
+
+    produced = 0
+    if name.endswith('.zip'):
+        with zipfile.ZipFile(path, 'r') as zip_ref:
+            members = zip_ref.infolist()
+            for i, member in enumerate(members):
+                zip_ref.extract(member, input_dir)
+                if on_frame is not None:
+                    on_frame(i + 1, len(members))
+            produced = len(members)
+        os.remove(path)
+    elif name.endswith(VIDEO_EXTENSIONS):
+        frame_interval = max(1, int(upload.get('frame_interval') or 1))
+        vidcap = cv2.VideoCapture(path)
+        total = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) // frame_interval
+        success, image = vidcap.read()
+        count = 0
+        while success:
+            if count % frame_interval == 0:
+                cv2.imwrite(os.path.join(input_dir, f"frame_{produced:04d}.png"), image)
+                produced += 1
+                if on_frame is not None:
+                    on_frame(produced, max(total, produced))
+            success, image = vidcap.read()
+            count += 1
+        vidcap.release()
+        os.remove(path)
+    elif name.endswith(MULTIFRAME_EXTENSIONS):
+        with Image.open(path) as img:
+            total = getattr(img, 'n_frames', 1)
+            for i, page in enumerate(ImageSequence.Iterator(img)):
+                page.convert('L').save(os.path.join(input_dir, f"frame_{i:04d}.png"))
+                produced = i + 1
+                if on_frame is not None:
+                    on_frame(produced, total)
+        os.remove(path)
+    else:
+        produced = 1  # a single image; leave it in place
+
+    _flatten_single_subdir(input_dir)
+    for stale in glob.glob(os.path.join(input_dir, '*.part')):
+        os.remove(stale)
+    database.set_upload_content(upload['id'], content_sha256)
+    logger.info(f"Ingested upload {upload['id']}: {produced} item(s) from {upload['filename']}")
+    return {'items': produced, 'content_sha256': content_sha256, 'source_upload_id': None}
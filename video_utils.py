@@ -0,0 +1,19 @@
+"""Video Encoding Module
+
+Shared MP4 encoder settings for the analysis video and the trajectory overlay video.
+"""
+import imageio.v2 as imageio
+
+
+def fps_for_interval(time_interval: float) -> int:
+    """Map hours/frame to playback frames per second (1-30 fps)."""
+    return max(1, min(30, int(round(1.0 / max(time_interval, 1e-3)))))
+
+
+def open_video_writer(video_path: str, fps: int):
+    """Open an H.264 MP4 writer. Frames must be RGB uint8 arrays."""
+    return imageio.get_writer(video_path, fps=fps, codec='libx264', quality=8)
+
+
+if __name__ == "__main__":
+    print("Video encoding module loaded!")